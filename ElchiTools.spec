@@ -18,6 +18,11 @@ sys.path.insert(0, project_root)
 sys.path.insert(0, os.path.join(project_root, "src"))
 
 import src.appinfo
+from PyInstaller.utils.hooks import collect_submodules
+from src.Engine.DriverRegistry import CACHE_FILE, discover_drivers
+
+# The frozen build has no driver sources to scan, it ships the driver metadata instead
+discover_drivers(test_mode=True)
 
 version_info = VSVersionInfo(
     ffi=FixedFileInfo(
@@ -57,8 +62,10 @@ block_cipher = None
 a = Analysis(['src/ElchiTools.py'],
              pathex=['.', 'src'],
              binaries=[],
-             datas=[('src/Icons', 'Icons'), ('src/Fonts', 'Fonts'), ('License', 'License'), ('src/Styles', 'Styles')],
-             hiddenimports=['pkg_resources.py2_warn'],
+             datas=[('src/Icons', 'Icons'), ('src/Fonts', 'Fonts'), ('License', 'License'), ('src/Styles', 'Styles'),
+                    (CACHE_FILE, 'src/Drivers')],
+             # Drivers are imported by name when a device is connected, so the analysis cannot find them
+             hiddenimports=['pkg_resources.py2_warn'] + collect_submodules('src.Drivers'),
              hookspath=[],
              runtime_hooks=[],
              excludes=[],
@@ -0,0 +1,309 @@
+"""
+Benchmarks the polling of the engine, so releases can be compared before they go onto the lab machines:
+
+    python -m src.Benchmark --scenario emulated --furnaces 2 --duration 300 --output benchmark.json
+
+Scenarios (a controller and a sensor per furnace):
+    test        the test devices
+    simulated   the simulated furnace and pyrometer, the engine overhead without any serial communication
+    emulated    the Eurotherm 3216 and pyrometer drivers on emulated serial ports (see src.DeviceEmulator, Linux only)
+
+The furnaces log their data as in normal operation. After the warmup, the following is measured (as json):
+    Samples/s       status values delivered with device_status_update (which feeds controller_status_update and
+                    sensor_status_update), per second and role
+    Latency         from the return of the device read to the delivery of its value with device_status_update, in ms
+    Queue depth     pending jobs of the thread pool and of all device pollers, sampled every 100 ms
+    Memory          resident set size and its growth per hour of operation (linear fit, Linux only). Polling runs in
+                    real time, so an hour of operation is an hour of run time; the simulated furnaces run speed times
+                    faster
+    Device I/O      the I/O statistics of the devices (see IOStatistics)
+"""
+import argparse
+import functools
+import inspect
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from PySide6.QtCore import QCoreApplication, QTimer
+
+from src.Engine.Engine import HeaterControlEngine
+from src.Engine.IOStats import LatencyHistogram, io_statistics
+from src.Signals import engine_signals, gui_signals
+import src.appinfo
+
+scenarios = {'test':      {'Controller': 'Test Controller', 'Sensor': 'Test Sensor'},
+             'simulated': {'Controller': 'Simulated Furnace', 'Sensor': 'Simulated Pyrometer'},
+             'emulated':  {'Controller': 'Eurotherm3216', 'Sensor': 'Pyrometer'}}
+
+# Methods the furnaces poll, their results are stamped with the time they were read
+POLLED_METHODS = ('get_process_variable', 'get_working_output', 'get_working_setpoint', 'get_status_block',
+                  'get_sensor_value')
+
+
+class StampedValue(float):
+    """A polled value that knows when it was read (perf_counter)"""
+    read_at = 0.0
+
+
+def stamp(result, read_at):
+    if isinstance(result, dict):
+        return {key: stamp(value, read_at) for key, value in result.items()}
+    if isinstance(result, (int, float)) and not isinstance(result, bool):
+        result = StampedValue(result)
+        result.read_at = read_at
+    return result
+
+
+def stamp_reads(driver):
+    """Make the polled methods (and their coroutine variants) of a driver class return stamped values"""
+    def stamped(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            return stamp(method(*args, **kwargs), time.perf_counter())
+        return wrapper
+
+    def stamped_async(method):
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            return stamp(await method(*args, **kwargs), time.perf_counter())
+        return wrapper
+
+    for name in POLLED_METHODS:
+        if (method := getattr(driver, name, None)) is None or hasattr(method, '__wrapped__'):
+            continue
+        setattr(driver, name, stamped(method))
+        if inspect.iscoroutinefunction(variant := getattr(driver, f'{name}_async', None)):
+            setattr(driver, f'{name}_async', stamped_async(variant))
+
+
+def resident_memory():
+    """Resident set size in bytes, None where it cannot be read"""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def slope(points):
+    """Least squares slope of (x, y) points"""
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance if variance else 0.0
+
+
+def latency_summary(histogram):
+    """Mean, percentiles and maximum of a LatencyHistogram in ms"""
+    if not histogram.count:
+        return None
+    return {'Mean': round(histogram.mean * 1000, 3),
+            **{name: round(histogram.percentile(fraction) * 1000, 3)
+               for name, fraction in (('P50', 0.5), ('P95', 0.95), ('P99', 0.99))},
+            'Max': round(histogram.max * 1000, 3)}
+
+
+class EngineBenchmark:
+    def __init__(self, engine, scenario, furnaces=1, duration=60.0, warmup=10.0, speed=1.0, latency=0.005):
+        self.engine = engine
+        self.scenario = scenario
+        self.furnace_ids = [f'Bench {number}' for number in range(1, furnaces + 1)]
+        self.duration = duration
+        self.warmup = warmup
+        self.speed = speed
+        self.latency = latency
+        self.settings = {'Scenario': scenario, 'Furnaces': furnaces, 'Duration': duration, 'Warmup': warmup,
+                         'Speed': speed, 'Async I/O': engine.async_loop is not None}
+        if scenario == 'emulated':
+            self.settings['Emulated latency'] = latency
+
+        self.emulated_ports = []
+        self.pending_connections = 0
+        self.measuring = False
+        self.start_time = None
+        self.samples = {'Controller': 0, 'Sensor': 0}
+        # Bins 2 % wide from 10 µs up, the percentiles are accurate to 2 %
+        self.latency_histogram = LatencyHistogram.logarithmic(1e-5, 1.02, 820)
+        self.queue_samples = 0
+        self.queue_sums = {'Pool': 0, 'Pollers': 0}
+        self.queue_max = {'Pool': 0, 'Pollers': 0}
+        self.memory = []
+        self.result = None
+
+        self.log_directory = tempfile.mkdtemp(prefix='benchmark_')
+        engine.stream_directory = self.log_directory
+
+        self.queue_timer = QTimer()
+        self.queue_timer.setInterval(100)
+        self.queue_timer.timeout.connect(self.sample_queues)
+        self.memory_timer = QTimer()
+        self.memory_timer.setInterval(1000)
+        self.memory_timer.timeout.connect(self.sample_memory)
+
+        engine_signals.device_connected.connect(self.device_connected)
+        engine_signals.device_status_update.connect(self.status_update)
+        engine_signals.connection_failed.connect(self.connection_failed)
+
+    def start(self):
+        """Connect the devices, the benchmark fails if that goes wrong or it does not finish within the deadline"""
+        # Connecting, warmup and measurement with a generous margin, a benchmark must never hang
+        deadline = self.engine.connect_timeout + self.warmup + self.duration + 30
+        QTimer.singleShot(int(deadline * 1000), functools.partial(self.fail, f'Not finished after {deadline:g} s'))
+
+        devices = scenarios[self.scenario]
+        registries = {role: self.engine.controller_types if role == 'Controller' else self.engine.sensor_types
+                      for role in devices}
+        if missing := [device_type for role, device_type in devices.items() if device_type not in registries[role]]:
+            self.fail(f'Drivers not available: {", ".join(missing)}')
+            return
+        try:
+            for role, device_type in devices.items():
+                stamp_reads(registries[role][device_type].load())
+            for furnace_id in self.furnace_ids:
+                ports = self.device_ports(furnace_id)
+                for role, device_type in devices.items():
+                    self.pending_connections += 1
+                    gui_signals.connect_device.emit(furnace_id, role, device_type, ports[role], 1)
+        except Exception as e:
+            self.fail(f'Could not start: {e}')
+
+    @staticmethod
+    def fail(text):
+        print(f'Benchmark failed: {text}', file=sys.stderr)
+        QCoreApplication.exit(1)
+
+    def device_ports(self, furnace_id):
+        if self.scenario == 'test':
+            return {'Controller': 'COM Test', 'Sensor': 'COM Test'}
+        if self.scenario == 'simulated':
+            from src.Drivers.Simulation import ThermalPlant
+            ThermalPlant.configure(f'SIM {furnace_id}', speed=self.speed)
+            return {'Controller': f'SIM {furnace_id}', 'Sensor': f'SIM {furnace_id}'}
+        from src.DeviceEmulator import emulate, new_plant
+        plant = new_plant('Eurotherm3216', speed=self.speed)
+        ports = {role: emulate(device_type, plant, latency=self.latency)
+                 for role, device_type in scenarios['emulated'].items()}
+        self.emulated_ports += ports.values()
+        return {role: port.port for role, port in ports.items()}
+
+    def connection_failed(self, error):
+        print(f'Connection failed: {error}', file=sys.stderr)
+        QCoreApplication.exit(1)
+
+    def device_connected(self, furnace_id, *_):
+        if furnace_id not in self.furnace_ids:
+            return
+        self.pending_connections -= 1
+        if self.pending_connections:
+            return
+        for furnace_id in self.furnace_ids:
+            gui_signals.furnace_command.emit(furnace_id, 'start_logging', ())
+            gui_signals.furnace_command.emit(furnace_id, 'set_rate', (60.0,))
+            gui_signals.furnace_command.emit(furnace_id, 'set_target_setpoint', (500.0,))
+        QTimer.singleShot(int(self.warmup * 1000), self.begin_measurement)
+
+    def begin_measurement(self):
+        io_statistics.reset()
+        self.measuring = True
+        self.start_time = time.perf_counter()
+        self.sample_memory()
+        self.queue_timer.start()
+        self.memory_timer.start()
+        QTimer.singleShot(int(self.duration * 1000), self.finish)
+
+    def status_update(self, furnace_id, role, status, _runtime):
+        if not self.measuring:
+            return
+        now = time.perf_counter()
+        for value in status.values():
+            self.samples[role] += 1
+            if isinstance(value, StampedValue):
+                self.latency_histogram.add(now - value.read_at)
+
+    def sample_queues(self):
+        depths = self.engine.get_queue_depths()
+        depth = {'Pool': depths.pop('Pool'), 'Pollers': sum(sum(pollers.values()) for pollers in depths.values())}
+        self.queue_samples += 1
+        for key, value in depth.items():
+            self.queue_sums[key] += value
+            self.queue_max[key] = max(self.queue_max[key], value)
+
+    def sample_memory(self):
+        if (rss := resident_memory()) is not None:
+            self.memory.append((time.perf_counter(), rss))
+
+    def finish(self):
+        self.measuring = False
+        self.queue_timer.stop()
+        self.memory_timer.stop()
+        elapsed = time.perf_counter() - self.start_time
+        memory = None
+        if len(self.memory) > 1:
+            memory = {'Start (MB)': round(self.memory[0][1] / 1e6, 2), 'End (MB)': round(self.memory[-1][1] / 1e6, 2),
+                      'Growth (MB/h)': round(slope(self.memory) * 3600 / 1e6, 3)}
+        self.result = {
+            'Benchmark': 'Engine polling',
+            'Version': src.appinfo.APP_VERSION,
+            'Date': datetime.now().strftime('%Y-%m-%dT%H:%M:%S'),
+            'Platform': platform.platform(),
+            'Python': platform.python_version(),
+            'Settings': self.settings,
+            'Results': {
+                'Samples/s': {'Total': round(sum(self.samples.values()) / elapsed, 2),
+                              **{role: round(count / elapsed, 2) for role, count in self.samples.items()}},
+                'Latency': latency_summary(self.latency_histogram),
+                'Queue depth': {key: {'Mean': round(self.queue_sums[key] / self.queue_samples, 3)
+                                      if self.queue_samples else None, 'Max': self.queue_max[key]}
+                                for key in self.queue_sums},
+                'Memory': memory,
+                'Device I/O': io_statistics.report()}}
+        QCoreApplication.quit()
+
+    def close(self):
+        self.engine.shutdown()
+        for port in self.emulated_ports:
+            port.stop()
+        shutil.rmtree(self.log_directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f'Polling benchmark of the {src.appinfo.APP_NAME} engine')
+    parser.add_argument('--scenario', choices=scenarios, default='test')
+    parser.add_argument('--furnaces', type=int, default=1)
+    parser.add_argument('--duration', type=float, default=60.0, help='seconds of measurement')
+    parser.add_argument('--warmup', type=float, default=10.0, help='seconds between connecting and measuring')
+    parser.add_argument('--speed', type=float, default=1.0, help='simulated seconds per second of the furnaces')
+    parser.add_argument('--latency', type=float, default=0.005, help='answer latency of the emulated devices')
+    parser.add_argument('--async_io', action='store_true')
+    parser.add_argument('--output', help='json file for the results, printed if not given')
+    args = parser.parse_args()
+
+    app = QCoreApplication()
+    app.setApplicationName(f'{src.appinfo.APP_NAME}')
+    engine_signals.error.connect(lambda text: print(f'Error: {text}', file=sys.stderr))
+    engine_signals.com_failed.connect(lambda text: print(f'Communication error: {text}', file=sys.stderr))
+
+    engine = HeaterControlEngine(args.scenario != 'emulated', args.async_io)
+    benchmark = EngineBenchmark(engine, args.scenario, args.furnaces, args.duration, args.warmup, args.speed,
+                                args.latency)
+    QTimer.singleShot(0, benchmark.start)
+    exit_code = app.exec()
+    benchmark.close()
+    if exit_code or benchmark.result is None:
+        sys.exit(exit_code or 1)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(benchmark.result, file, indent=2)
+    else:
+        print(json.dumps(benchmark.result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,482 @@
+"""
+Emulates the serial instruments on pseudo-terminals, so the real drivers can be exercised and timed without the
+hardware (Linux and macOS only). Every emulated device gets a pty of its own, whose name is the port for the driver:
+
+    python -m src.DeviceEmulator Eurotherm3216:Furnace Pyrometer:Furnace Tenma --latency 0.005 --drop 0.01
+
+The controllers answer Modbus RTU with the register map of the instrument, the pyrometer and the power supplies their
+ASCII command sets. The process behind them is simulated (see src.Drivers.Simulation), devices given the same plant
+name (after the colon) observe one furnace. Response latency, jitter, dropped and corrupted answers are set per port.
+"""
+import argparse
+import collections
+import os
+import pty
+import random
+import select
+import signal
+import struct
+import threading
+import time
+import tty
+
+import minimalmodbus
+
+from src.Drivers.Modbus import decode_register
+from src.Drivers.Simulation import SimulatedController, SimulatedPowerSupply, ThermalPlant
+import src.appinfo
+
+ILLEGAL_FUNCTION = 1
+ILLEGAL_DATA_ADDRESS = 2
+ILLEGAL_DATA_VALUE = 3
+
+# A 16-bit register holding field / scale with number_of_decimals, like read_register and write_register see it
+Register = collections.namedtuple('Register', 'field decimals signed scale', defaults=(0, False, 1))
+# A 32-bit float in two registers, like read_float and write_float see it
+Float = collections.namedtuple('Float', 'field byteorder', defaults=(minimalmodbus.BYTEORDER_BIG,))
+
+
+def crc16(data):
+    """Modbus RTU checksum, low byte first as it is sent"""
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return struct.pack('<H', crc)
+
+
+def float_to_words(value, byteorder):
+    data = struct.pack('>f', value)
+    if byteorder in (minimalmodbus.BYTEORDER_LITTLE, minimalmodbus.BYTEORDER_LITTLE_SWAP):
+        data = data[::-1]
+    if byteorder in (minimalmodbus.BYTEORDER_BIG_SWAP, minimalmodbus.BYTEORDER_LITTLE_SWAP):
+        data = bytes(data[index ^ 1] for index in range(4))
+    return list(struct.unpack('>HH', data))
+
+
+def words_to_float(words, byteorder):
+    data = struct.pack('>HH', *words)
+    if byteorder in (minimalmodbus.BYTEORDER_BIG_SWAP, minimalmodbus.BYTEORDER_LITTLE_SWAP):
+        data = bytes(data[index ^ 1] for index in range(4))
+    if byteorder in (minimalmodbus.BYTEORDER_LITTLE, minimalmodbus.BYTEORDER_LITTLE_SWAP):
+        data = data[::-1]
+    return struct.unpack('>f', data)[0]
+
+
+class ModbusError(Exception):
+    def __init__(self, code):
+        super().__init__(f'Modbus exception {code}')
+        self.code = code
+
+
+class EmulatedController:
+    """
+    Modbus slave with the register map of a controller, backed by the PID and setpoint ramp of a simulated furnace.
+    Registers map to fields of the controller, memory holds the raw values of registers that are only stored.
+    """
+    registers: dict[int, Register] = {}
+    floats: dict[int, Float] = {}
+    memory: dict[int, int] = {}
+
+    def __init__(self, plant):
+        self.model = SimulatedController(None, plant=plant)
+        # The serial link adds the latency
+        self.model.latency = 0.0
+        self.memory = dict(self.memory)
+        model = self.model
+        self.fields = {
+            'PV':               (self.get_process_variable, None),
+            'Setpoint':         (model.get_target_setpoint, model.set_target_setpoint),
+            'Manual power':     (model.get_manual_output_power, model.set_manual_output_power),
+            'Output':           (model.get_working_output, None),
+            'Working setpoint': (model.get_working_setpoint, None),
+            'Rate':             (model.get_rate, model.set_rate),
+            'Mode':             (lambda: int(model.get_control_mode() == 'Manual'),
+                                 lambda value: model.set_manual_mode() if value else model.set_automatic_mode()),
+            'P':                (model.get_pid_p, model.set_pid_p),
+            'I':                (model.get_pid_i, model.set_pid_i),
+            'D':                (model.get_pid_d, model.set_pid_d),
+            'External PV':      (lambda: model.external_pv or 0, model.update_external_pv)}
+
+    def get_process_variable(self):
+        if self.model.external_pv_mode and self.model.external_pv is not None:
+            return self.model.external_pv
+        return self.model.get_process_variable()
+
+    def request(self, pdu):
+        """Answer the protocol data unit of a request (the frame without address and checksum)"""
+        function = pdu[0]
+        try:
+            if function in (3, 4) and len(pdu) == 5:
+                address, count = struct.unpack('>HH', pdu[1:5])
+                words = self.read(address, count)
+                return struct.pack(f'>BB{count}H', function, 2 * count, *words)
+            if function == 6 and len(pdu) == 5:
+                address, value = struct.unpack('>HH', pdu[1:5])
+                self.write(address, [value])
+                return pdu
+            if function == 16 and len(pdu) >= 6:
+                address, count = struct.unpack('>HH', pdu[1:5])
+                self.write(address, struct.unpack(f'>{count}H', pdu[6:6 + 2 * count]))
+                return pdu[:5]
+            raise ModbusError(ILLEGAL_FUNCTION)
+        except ModbusError as e:
+            return bytes([function | 0x80, e.code])
+        except ValueError:
+            # Rejected by the controller
+            return bytes([function | 0x80, ILLEGAL_DATA_VALUE])
+
+    def read(self, address, count):
+        words = []
+        while len(words) < count:
+            current = address + len(words)
+            if (register := self.registers.get(current)) is not None:
+                value = round(self.fields[register.field][0]() / register.scale * 10 ** register.decimals)
+                if register.signed:
+                    value = min(max(value, -0x8000), 0x7FFF) & 0xFFFF
+                words.append(min(max(value, 0), 0xFFFF))
+            elif (register := self.floats.get(current)) is not None:
+                words += float_to_words(self.fields[register.field][0](), register.byteorder)
+            elif current in self.memory:
+                words.append(self.memory[current])
+            else:
+                raise ModbusError(ILLEGAL_DATA_ADDRESS)
+        return words[:count]
+
+    def write(self, address, values):
+        index = 0
+        while index < len(values):
+            current = address + index
+            if (register := self.registers.get(current)) is not None:
+                self.set_field(register.field, decode_register(values[index], register.decimals, register.signed) *
+                               register.scale)
+                index += 1
+            elif (register := self.floats.get(current)) is not None and index + 1 < len(values):
+                self.set_field(register.field, words_to_float(values[index:index + 2], register.byteorder))
+                index += 2
+            elif current in self.memory:
+                self.memory[current] = values[index]
+                index += 1
+            else:
+                raise ModbusError(ILLEGAL_DATA_ADDRESS)
+
+    def set_field(self, field, value):
+        if (setter := self.fields[field][1]) is None:
+            # Read only
+            raise ModbusError(ILLEGAL_DATA_ADDRESS)
+        setter(value)
+
+
+class EmulatedEurotherm3216(EmulatedController):
+    registers = {1: Register('PV'), 2: Register('Setpoint'), 3: Register('Manual power', 1),
+                 4: Register('Output', 1), 5: Register('Working setpoint'), 6: Register('P', 1), 8: Register('I'),
+                 9: Register('D'), 35: Register('Rate', 1), 203: Register('External PV'), 273: Register('Mode'),
+                 12290: Register('Sensor type')}
+    memory = {26: 0}
+
+    def __init__(self, plant):
+        super().__init__(plant)
+        self.sensor_type = 3
+        self.fields['Sensor type'] = (lambda: self.sensor_type, self.set_sensor_type)
+
+    def set_sensor_type(self, sensor_type):
+        self.sensor_type = sensor_type
+        # Input type 10 is the remote input, written to register 203
+        self.model.set_external_pv_mode(sensor_type == 10)
+
+
+class EmulatedEurotherm2408(EmulatedController):
+    registers = {1: Register('PV'), 2: Register('Setpoint'), 3: Register('Manual power', 1),
+                 4: Register('Output', 1), 5: Register('Working setpoint'), 35: Register('Rate'),
+                 273: Register('Mode')}
+    memory = {23: 0}
+
+
+class EmulatedEurotherm3508(EmulatedController):
+    """Voltage input in V with four decimals, the driver scales everything to mV"""
+    registers = {1: Register('PV', 4, True, 1000), 2: Register('Setpoint', 4, True, 1000),
+                 3: Register('Manual power', 1, True), 4: Register('Output', 1),
+                 5: Register('Working setpoint', 4, True, 1000), 6: Register('P', 1, False, 1000), 8: Register('I'),
+                 9: Register('D'), 35: Register('Rate', 1, True, 1000), 273: Register('Mode')}
+    # Gain scheduling: PID sets 2 and 3, scheduling mode, active set and the set boundaries (floats)
+    memory = {48: 0, 49: 0, 51: 0, 180: 0, 181: 0, 183: 0, 15360: 0, 72: 1, 15361: 0, 15362: 0, 15363: 0}
+
+
+class EmulatedJumoQuantrol(EmulatedController):
+    floats = {0x0031: Float('PV', minimalmodbus.BYTEORDER_LITTLE_SWAP),
+              0x0035: Float('Working setpoint', minimalmodbus.BYTEORDER_LITTLE_SWAP),
+              0x0037: Float('Output', minimalmodbus.BYTEORDER_LITTLE_SWAP),
+              0x004E: Float('Rate', minimalmodbus.BYTEORDER_LITTLE_SWAP),
+              0x3000: Float('P', minimalmodbus.BYTEORDER_LITTLE_SWAP),
+              0x3004: Float('D', minimalmodbus.BYTEORDER_LITTLE_SWAP),
+              0x3006: Float('I', minimalmodbus.BYTEORDER_LITTLE_SWAP),
+              0x3100: Float('Setpoint', minimalmodbus.BYTEORDER_LITTLE_SWAP)}
+    registers = {0x0020: Register('Status'), 0x0047: Register('Command')}
+
+    def __init__(self, plant):
+        super().__init__(plant)
+        self.fields['Status'] = (lambda: (self.model.get_control_mode() == 'Manual') << 12, None)
+        self.fields['Command'] = (lambda: 0, self.command)
+
+    def command(self, bits):
+        if bits & 1 << 2:
+            self.model.set_manual_mode()
+        if bits & 1 << 3:
+            self.model.set_automatic_mode()
+        if bits & 1 << 8:
+            # Restart the ramp from the process value
+            self.model.working_setpoint = self.model.get_process_variable()
+
+
+class EmulatedElchiTherm(EmulatedController):
+    registers = {0: Register('PV', 1), 1: Register('Setpoint', 1), 2: Register('Manual power', 2),
+                 3: Register('Output', 2), 4: Register('Working setpoint', 1), 5: Register('Rate', 1),
+                 6: Register('Mode'), 7: Register('P', 1), 8: Register('I'), 9: Register('D')}
+    # Output enable, thermocouple type (K), thermocouple fault and aiming beam
+    memory = {10: 1, 11: 3, 12: 0, 13: 0}
+
+
+class ModbusProtocol:
+    """Modbus RTU framing for the emulated controllers on one port, by slave address"""
+
+    def __init__(self, slaves):
+        self.slaves = slaves
+        self.buffer = bytearray()
+
+    def receive(self, data):
+        """Take the bytes received, return the answers to the complete requests among them"""
+        self.buffer += data
+        answers = []
+        while len(self.buffer) >= 8:
+            length = 9 + self.buffer[6] if self.buffer[1] == 16 else 8
+            if len(self.buffer) < length:
+                break
+            frame = bytes(self.buffer[:length])
+            del self.buffer[:length]
+            if crc16(frame[:-2]) != frame[-2:]:
+                # A slave ignores a damaged frame and everything up to the next pause on the line
+                self.buffer.clear()
+                break
+            if (slave := self.slaves.get(frame[0])) is not None:
+                answer = bytes([frame[0]]) + slave.request(frame[1:-2])
+                answers.append(answer + crc16(answer))
+        return answers
+
+    def idle(self):
+        """The line has been silent for longer than the gap between two frames"""
+        self.buffer.clear()
+
+
+class AsciiDevice:
+    """Command set of an instrument with a line based ASCII protocol, commands end with terminator"""
+    terminator = b'\r'
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def receive(self, data):
+        self.buffer += data
+        answers = []
+        while (end := self.buffer.find(self.terminator)) >= 0:
+            command = self.buffer[:end].decode(errors='replace').strip().upper()
+            del self.buffer[:end + 1]
+            if (answer := self.command(command)) is not None:
+                answers.append(answer.encode())
+        return answers
+
+    def idle(self):
+        pass
+
+    def command(self, command):
+        """Return the answer to a command, None if there is none"""
+        raise NotImplementedError
+
+
+class EmulatedPyrometer(AsciiDevice):
+    def __init__(self, plant):
+        super().__init__()
+        self.plant = plant
+
+    def command(self, command):
+        if command == 'TEMP':
+            return f'{self.plant.measure("Sample"):.1f} C\r'
+        # Trigger and emissivity settings are not acknowledged
+        return None
+
+
+class EmulatedTenma(AsciiDevice):
+    """Answers are not terminated, the way the supply sends them"""
+    answer_terminator = ''
+
+    def __init__(self, plant):
+        super().__init__()
+        self.supply = SimulatedPowerSupply(None, plant=plant)
+        self.supply.latency = 0.0
+
+    def command(self, command):
+        supply = self.supply
+        # The channel number between command and colon or question mark is ignored, there is only one
+        if command.startswith('VSET') and ':' in command:
+            supply.set_voltage_limit(float(command.split(':')[1]))
+        elif command.startswith('ISET') and ':' in command:
+            supply.set_current_limit(float(command.split(':')[1]))
+        elif command.startswith('OUT'):
+            supply.enable_output() if command.endswith('1') else supply.disable_output()
+        elif command.startswith('VSET'):
+            return f'{supply.get_voltage_limit():05.2f}{self.answer_terminator}'
+        elif command.startswith('ISET'):
+            return f'{supply.get_current_limit():05.3f}{self.answer_terminator}'
+        elif command.startswith('VOUT'):
+            return f'{supply.get_voltage():05.2f}{self.answer_terminator}'
+        elif command.startswith('IOUT'):
+            return f'{supply.get_current():05.3f}{self.answer_terminator}'
+        elif command.startswith('STATUS'):
+            return f'{int(supply.get_limit_mode() == "CC")}{self.answer_terminator}'
+        return None
+
+
+class EmulatedHCS34(AsciiDevice):
+    """Every command is acknowledged with OK, answers come on a line before it"""
+
+    def __init__(self, plant):
+        super().__init__()
+        self.supply = SimulatedPowerSupply(None, plant=plant)
+        self.supply.latency = 0.0
+
+    def command(self, command):
+        supply = self.supply
+        if command.startswith('VOLT') and command[4:].isdigit():
+            supply.set_voltage_limit(int(command[4:]) / 10)
+        elif command.startswith('CURR') and command[4:].isdigit():
+            supply.set_current_limit(int(command[4:]) / 10)
+        elif command == 'GETS':
+            return f'{round(supply.get_voltage_limit() * 10):03d}{round(supply.get_current_limit() * 10):03d}\rOK\r'
+        elif command == 'GETD':
+            voltage, current = supply.get_voltage(), supply.get_current()
+            mode = int(supply.get_limit_mode() == 'CC')
+            return f'{round(voltage * 100):04d}{round(current * 100):04d}{mode}\rOK\r'
+        else:
+            return None
+        return 'OK\r'
+
+
+class VirtualPort(threading.Thread):
+    """
+    Pseudo-terminal pair with an emulated device (or a Modbus bus of them) behind it, drivers open port.
+    Every answer is delayed by latency plus up to jitter seconds, dropped with probability drop and has one bit flipped
+    with probability corrupt.
+    """
+    # Silence on the line that ends a Modbus frame (3.5 characters at 9600 baud, with some margin)
+    frame_gap = 0.005
+
+    def __init__(self, device, latency=0.0, jitter=0.0, drop=0.0, corrupt=0.0, seed=None):
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        super().__init__(name=f'Emulator {self.port}', daemon=True)
+        self.device = device
+        self.latency = latency
+        self.jitter = jitter
+        self.drop = drop
+        self.corrupt = corrupt
+        self.random = random.Random(seed)
+        self.statistics = {'Answers': 0, 'Dropped': 0, 'Corrupted': 0}
+        self.running = True
+
+    def run(self):
+        while self.running:
+            ready, _, _ = select.select([self.master], [], [], self.frame_gap)
+            if not ready:
+                self.device.idle()
+                continue
+            try:
+                data = os.read(self.master, 4096)
+            except OSError:
+                break
+            for answer in self.device.receive(data):
+                self.answer(answer)
+
+    def answer(self, answer):
+        self.statistics['Answers'] += 1
+        if self.random.random() < self.drop:
+            self.statistics['Dropped'] += 1
+            return
+        if self.random.random() < self.corrupt:
+            self.statistics['Corrupted'] += 1
+            answer = bytearray(answer)
+            answer[self.random.randrange(len(answer))] ^= 1 << self.random.randrange(8)
+        time.sleep(self.latency + self.random.uniform(0, self.jitter))
+        os.write(self.master, answer)
+
+    def stop(self):
+        self.running = False
+        self.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+
+emulators = {'Eurotherm3216': EmulatedEurotherm3216, 'Eurotherm2408': EmulatedEurotherm2408,
+             'Eurotherm3508': EmulatedEurotherm3508, 'JumoQuantrol': EmulatedJumoQuantrol,
+             'ElchiTherm': EmulatedElchiTherm, 'Pyrometer': EmulatedPyrometer, 'Tenma': EmulatedTenma,
+             'HCS34': EmulatedHCS34}
+
+
+def new_plant(device_type, **parameters):
+    """A furnace, or a micro heater for the power supplies"""
+    if device_type in ('Tenma', 'HCS34'):
+        parameters = SimulatedPowerSupply.plant_parameters | parameters
+    return ThermalPlant(**parameters)
+
+
+def emulate(device_type, plant=None, slave_address=1, **injection):
+    """
+    Start a virtual port with a device of the given type (a key of emulators) on the given plant, or a new one. The
+    injection arguments are those of VirtualPort.
+    """
+    device = emulators[device_type](plant or new_plant(device_type))
+    if isinstance(device, EmulatedController):
+        device = ModbusProtocol({slave_address: device})
+    port = VirtualPort(device, **injection)
+    port.start()
+    return port
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f'Serial instruments of {src.appinfo.APP_NAME} on pseudo-terminals')
+    parser.add_argument('devices', nargs='+', help=f'device type[:plant name], types: {", ".join(emulators)}')
+    parser.add_argument('--address', type=int, default=1, help='Modbus slave address of the controllers')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds before every answer')
+    parser.add_argument('--jitter', type=float, default=0.0, help='seconds of random latency added on top')
+    parser.add_argument('--drop', type=float, default=0.0, help='probability that an answer is not sent')
+    parser.add_argument('--corrupt', type=float, default=0.0, help='probability that an answer is damaged')
+    parser.add_argument('--speed', type=float, default=1.0, help='simulated seconds per second')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    plants = {}
+    ports = []
+    for spec in args.devices:
+        device_type, _, plant_name = spec.partition(':')
+        if device_type not in emulators:
+            parser.error(f'Unknown device type {device_type}')
+        if (plant := plants.get(plant_name)) is None:
+            plant = new_plant(device_type, speed=args.speed)
+            if plant_name:
+                plants[plant_name] = plant
+        port = emulate(device_type, plant, args.address, latency=args.latency, jitter=args.jitter, drop=args.drop,
+                       corrupt=args.corrupt, seed=args.seed)
+        ports.append((spec, port))
+        print(f'{spec} on {port.port}', flush=True)
+
+    # Run until interrupted or terminated
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: None)
+    signal.pause()
+    for spec, port in ports:
+        port.stop()
+        print(f'{spec}: {port.statistics}')
+
+
+if __name__ == '__main__':
+    main()
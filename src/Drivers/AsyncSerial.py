@@ -0,0 +1,82 @@
+import asyncio
+import contextlib
+import threading
+
+import serial
+
+
+class AsyncSerial:
+    """
+    Non-blocking access to an open pyserial port from an asyncio event loop.
+    Reads only take bytes that have already arrived (polling in_waiting), so waiting for an answer never blocks the
+    event loop and a request can be cancelled or time out at any point. Transactions take the same lock as the
+    blocking methods of the driver, so both can be used on one device side by side.
+    Timeouts are not handled here: wrap the request in asyncio.wait_for. If a transaction is cancelled, the input
+    buffer is discarded at the start of the next transaction, so a late answer cannot be mistaken for the next one.
+    """
+    poll_interval = 0.002
+
+    def __init__(self, port: serial.Serial, lock: threading.Lock):
+        self.serial = port
+        self.lock = lock
+        self.buffer = bytearray()
+        self.dirty = False
+
+    @contextlib.asynccontextmanager
+    async def transaction(self):
+        while not self.lock.acquire(blocking=False):
+            await asyncio.sleep(self.poll_interval)
+        try:
+            if self.dirty:
+                self.serial.reset_input_buffer()
+                self.buffer.clear()
+                self.dirty = False
+            yield self
+        except asyncio.CancelledError:
+            self.dirty = True
+            raise
+        finally:
+            self.lock.release()
+
+    async def write(self, data):
+        # Commands are a few bytes and fit into the driver buffer of the port, so this does not block
+        self.serial.write(data)
+
+    async def _fill(self, idle=None):
+        """
+        Wait until new bytes have arrived and move them into the buffer.
+        Return False if nothing arrived within idle seconds.
+        """
+        waited = 0.0
+        while not (waiting := self.serial.in_waiting):
+            if idle is not None and waited >= idle:
+                return False
+            await asyncio.sleep(self.poll_interval)
+            waited += self.poll_interval
+        self.buffer += self.serial.read(waiting)
+        return True
+
+    async def read(self, size):
+        while len(self.buffer) < size:
+            await self._fill()
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    async def read_until(self, expected=b'\n', size=None, idle=None):
+        """
+        Read up to and including expected, or at most size bytes.
+        For devices that do not terminate their answers, idle ends the answer once the line has been quiet for that
+        many seconds after the first byte.
+        """
+        while (index := self.buffer.find(expected)) < 0 and (size is None or len(self.buffer) < size):
+            if not await self._fill(idle if self.buffer else None):
+                break
+        end = index + len(expected) if index >= 0 else len(self.buffer)
+        end = min(end, size) if size is not None else end
+        data = bytes(self.buffer[:end])
+        del self.buffer[:end]
+        return data
+
+    async def readline(self):
+        return await self.read_until(b'\n')
@@ -22,6 +22,8 @@ class ControllerFeatures(Enum):
     MANUAL_POWER = auto()
     EXT_CONFIG = auto()
     TC_SELECT = auto()
+    STATUS_BLOCK = auto()
+    TC_FAULT = auto()
 
 
 class AbstractController(ABC):
@@ -89,6 +91,20 @@ class AbstractController(ABC):
 
     # Optional methods -------------------------------------------------------------------------------------------------
 
+    def start(self):
+        """
+        Called in the engine thread once the controller is connected. The constructor runs in a connector thread, so
+        drivers create timers and connect to the GUI signals here instead.
+        """
+
+    def get_status_block(self):
+        """
+        Return process variable, working setpoint and working output with a single bus transaction, as a dict keyed
+        'Controller PV', 'Setpoint' and 'Power'
+        """
+        raise NotImplementedError(
+            'Operation {:s} not supported for {:s} yet!'.format('get_status_block', self.__class__.__name__))
+
     def set_manual_output_power(self, output):
         """Set the power output of the controller in percent"""
         raise NotImplementedError(
@@ -265,6 +281,11 @@ class AbstractController(ABC):
         raise NotImplementedError(
             'Operation {:s} not supported for {:s} yet!'.format('get_tc_type', self.__class__.__name__))
 
+    def get_tc_fault(self):
+        """Get the thermocouple fault status, 0 if the thermocouple is fine"""
+        raise NotImplementedError(
+            'Operation {:s} not supported for {:s} yet!'.format('get_tc_fault', self.__class__.__name__))
+
 
 class AbstractSensor(ABC):
     """
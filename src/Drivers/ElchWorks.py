@@ -1,13 +1,14 @@
 import time
 from threading import Lock
 
-import minimalmodbus
 import serial
 
 from src.Drivers.BaseClasses import AbstractController, AbstractSensor, UnitType, ControllerFeatures
+from src.Drivers.Modbus import ModbusBus, decode_register
 
 
 class Thermolino(AbstractSensor):
+    name = 'Thermolino'
     type = UnitType.TEMPERATURE
 
     def __init__(self, _port):
@@ -28,6 +29,7 @@ class Thermolino(AbstractSensor):
 
 
 class Thermoplatino(AbstractSensor):
+    name = 'Thermoplatino'
     type = UnitType.TEMPERATURE
 
     def __init__(self, _port):
@@ -52,21 +54,22 @@ class Thermoplatino(AbstractSensor):
 
 
 class ElchiTherm(AbstractController):
+    name = 'Elchi Heater Controller'
     type = UnitType.TEMPERATURE
     features = {ControllerFeatures.SIMPLE_PID, ControllerFeatures.OUTPUT_ENABLE, ControllerFeatures.MANUAL_POWER,
-                ControllerFeatures.TC_SELECT}
+                ControllerFeatures.TC_SELECT, ControllerFeatures.STATUS_BLOCK, ControllerFeatures.TC_FAULT}
 
     tc_ids = {'B': 0, 'E': 1, 'J': 2, 'K': 3, 'N': 4, 'R': 5, 'S': 6, 'T': 7}
     tc_types = {value: key for key, value in tc_ids.items()}
 
     def __init__(self, _port_name, _slave_address, baudrate=9600):
-        self.instrument = minimalmodbus.Instrument(port=_port_name, slaveaddress=_slave_address)
-        self.instrument.serial.baudrate = baudrate
+        self.bus = ModbusBus.open(_port_name, baudrate)
+        self.instrument = self.bus.instrument(_slave_address)
         time.sleep(2)
-        self.com_lock = Lock()
+        self.com_lock = self.bus.transaction(_slave_address)
 
     def close(self):
-        self.instrument.serial.close()
+        self.bus.close()
 
     def get_process_variable(self):
         """Return the current process variable"""
@@ -102,6 +105,14 @@ class ElchiTherm(AbstractController):
         with self.com_lock:
             return self.instrument.read_register(4, number_of_decimals=1)
 
+    def get_status_block(self):
+        """Read process variable, working output and working setpoint (registers 0 to 4) in one transaction"""
+        with self.com_lock:
+            registers = self.instrument.read_registers(0, 5)
+        return {'Controller PV': decode_register(registers[0], number_of_decimals=1),
+                'Setpoint':      decode_register(registers[4], number_of_decimals=1),
+                'Power':         decode_register(registers[3], number_of_decimals=2)}
+
     def set_rate(self, rate):
         """Set the rate of change for the working setpoint i.e., the heating/cooling rate"""
         with self.com_lock:
@@ -186,8 +197,10 @@ class ElchiTherm(AbstractController):
 
 
 class ElchLaser(ElchiTherm):
+    name = 'Elchi Laser Control'
     features = {ControllerFeatures.AIMING_BEAM, ControllerFeatures.SIMPLE_PID, ControllerFeatures.OUTPUT_ENABLE,
-                ControllerFeatures.MANUAL_POWER, ControllerFeatures.TC_SELECT}
+                ControllerFeatures.MANUAL_POWER, ControllerFeatures.TC_SELECT, ControllerFeatures.STATUS_BLOCK,
+                ControllerFeatures.TC_FAULT}
 
     def enable_aiming_beam(self):
         with self.com_lock:
@@ -1,26 +1,31 @@
-import threading
-
-import minimalmodbus
-
 from src.Drivers.BaseClasses import AbstractController, AbstractSensor, ControllerFeatures, UnitType
+from src.Drivers.Modbus import ModbusBus, decode_register
 
 
 class Eurotherm3216(AbstractController):
     """Instrument class for Eurotherm 3216 process controller."""
+    name = 'Eurotherm3216'
     type = UnitType.TEMPERATURE
-    features = {ControllerFeatures.SIMPLE_PID, ControllerFeatures.MANUAL_POWER}
+    features = {ControllerFeatures.SIMPLE_PID, ControllerFeatures.MANUAL_POWER, ControllerFeatures.STATUS_BLOCK}
 
     def __init__(self, _port_name, _slave_address, baudrate=9600):
-        self.instrument = minimalmodbus.Instrument(_port_name, _slave_address)
-        self.instrument.serial.baudrate = baudrate
-        self.com_lock = threading.Lock()
-        with self.com_lock:
-            self.sensor_type = self.instrument.read_register(12290)
+        self.bus = ModbusBus.open(_port_name, baudrate)
+        self.instrument = self.bus.instrument(_slave_address)
+        self.com_lock = self.bus.transaction(_slave_address)
+        try:
+            with self.com_lock:
+                self.sensor_type = self.instrument.read_register(12290)
+        except Exception:
+            self.bus.close()
+            raise
 
     def close(self):
-        with self.com_lock:
-            self.instrument.write_register(12290, self.sensor_type)
-        self.instrument.serial.close()
+        try:
+            with self.com_lock:
+                self.instrument.write_register(12290, self.sensor_type)
+        finally:
+            # Release the bus even if the controller does not answer, or the port could never be opened again
+            self.bus.close()
 
     def get_process_variable(self):
         """Return the current process variable"""
@@ -56,6 +61,14 @@ class Eurotherm3216(AbstractController):
         with self.com_lock:
             return self.instrument.read_register(5, number_of_decimals=0)
 
+    def get_status_block(self):
+        """Read process variable, working output and working setpoint (registers 1 to 5) in one transaction"""
+        with self.com_lock:
+            registers = self.instrument.read_registers(1, 5)
+        return {'Controller PV': decode_register(registers[0]),
+                'Setpoint':      decode_register(registers[4]),
+                'Power':         decode_register(registers[3], number_of_decimals=1)}
+
     def set_rate(self, rate):
         """Set the rate of change for the working setpoint i.e., the heating/cooling rate"""
         with self.com_lock:
@@ -136,16 +149,17 @@ class Eurotherm3216(AbstractController):
 
 class Eurotherm2408(AbstractController):
     """Instrument class for Eurotherm 2408 process controller."""
+    name = 'Eurotherm2408'
     type = UnitType.TEMPERATURE
-    features = {ControllerFeatures.SIMPLE_PID, ControllerFeatures.MANUAL_POWER}
+    features = {ControllerFeatures.SIMPLE_PID, ControllerFeatures.MANUAL_POWER, ControllerFeatures.STATUS_BLOCK}
 
     def __init__(self, _port_name, _slave_address, baudrate=9600):
-        self.instrument = minimalmodbus.Instrument(_port_name, _slave_address)
-        self.instrument.serial.baudrate = baudrate
-        self.com_lock = threading.Lock()
+        self.bus = ModbusBus.open(_port_name, baudrate)
+        self.instrument = self.bus.instrument(_slave_address)
+        self.com_lock = self.bus.transaction(_slave_address)
 
     def close(self):
-        self.instrument.serial.close()
+        self.bus.close()
 
     def get_process_variable(self):
         """Return the current process variable"""
@@ -171,6 +185,14 @@ class Eurotherm2408(AbstractController):
         with self.com_lock:
             return self.instrument.read_register(5, number_of_decimals=0)
 
+    def get_status_block(self):
+        """Read process variable, working output and working setpoint (registers 1 to 5) in one transaction"""
+        with self.com_lock:
+            registers = self.instrument.read_registers(1, 5)
+        return {'Controller PV': decode_register(registers[0]),
+                'Setpoint':      decode_register(registers[4]),
+                'Power':         decode_register(registers[3], number_of_decimals=1)}
+
     def set_automatic_mode(self):
         """Set controller to automatic mode, also reset and restart the temperature programmer"""
         with self.com_lock:
@@ -220,16 +242,18 @@ class Eurotherm3508(AbstractController):
     * _slave_address (int): slave address in the range 1 to 247
     """
 
+    name = 'Eurotherm3508'
     type = UnitType.VOLTAGE
-    features = {ControllerFeatures.SIMPLE_PID, ControllerFeatures.GAIN_SCHEDULING, ControllerFeatures.MANUAL_POWER}
+    features = {ControllerFeatures.SIMPLE_PID, ControllerFeatures.GAIN_SCHEDULING, ControllerFeatures.MANUAL_POWER,
+                ControllerFeatures.STATUS_BLOCK}
 
     def __init__(self, _port_name, _slave_address, baudrate=9600):
-        self.instrument = minimalmodbus.Instrument(_port_name, _slave_address)
-        self.instrument.serial.baudrate = baudrate
-        self.com_lock = threading.Lock()
+        self.bus = ModbusBus.open(_port_name, baudrate)
+        self.instrument = self.bus.instrument(_slave_address)
+        self.com_lock = self.bus.transaction(_slave_address)
 
     def close(self):
-        self.instrument.serial.close()
+        self.bus.close()
 
     def get_process_variable(self):
         """Return the current process variable"""
@@ -275,6 +299,14 @@ class Eurotherm3508(AbstractController):
         with self.com_lock:
             return self.instrument.read_register(5, number_of_decimals=4, signed=True) * 1000
 
+    def get_status_block(self):
+        """Read process variable, working output and working setpoint (registers 1 to 5) in one transaction"""
+        with self.com_lock:
+            registers = self.instrument.read_registers(1, 5)
+        return {'Controller PV': decode_register(registers[0], number_of_decimals=4, signed=True) * 1000,
+                'Setpoint':      decode_register(registers[4], number_of_decimals=4, signed=True) * 1000,
+                'Power':         decode_register(registers[3], number_of_decimals=1)}
+
     def set_automatic_mode(self):
         """Set controller to automatic mode"""
         with self.com_lock:
@@ -433,15 +465,16 @@ class Eurotherm3508S(AbstractSensor):
         * _port_name (str): port name
         * _slave_address (int): slave address in the range 1 to 247
         """
+    name = 'Eurotherm3508'
     type = UnitType.VOLTAGE
 
     def __init__(self, _port, _slave_address=1, baudrate=9600):
-        self.instrument = minimalmodbus.Instrument(_port, _slave_address)
-        self.instrument.serial.baudrate = baudrate
-        self.com_lock = threading.Lock()
+        self.bus = ModbusBus.open(_port, baudrate)
+        self.instrument = self.bus.instrument(_slave_address)
+        self.com_lock = self.bus.transaction(_slave_address)
 
     def close(self):
-        self.instrument.serial.close()
+        self.bus.close()
 
     def get_sensor_value(self):
         with self.com_lock:
@@ -2,11 +2,14 @@ import threading
 
 from serial import Serial
 
+from src.Drivers.AsyncSerial import AsyncSerial
+
 
 class HCS34:
     def __init__(self, port, baudrate=9600):
         self.serial = Serial(port, baudrate)
         self.com_lock = threading.Lock()
+        self.async_serial = AsyncSerial(self.serial, self.com_lock)
 
     def readline(self):
         return self.serial.read_until(b'\r').rstrip(b'\r')
@@ -92,5 +95,32 @@ class HCS34:
             else:
                 return voltage / current
 
+    async def _query_async(self, string, answer=True):
+        """Send a command, return the answer line (if the command has one) after checking the acknowledgement"""
+        async with self.async_serial.transaction() as port:
+            await port.write(string.encode() + b'\x0D')
+            data = (await port.read_until(b'\r')).rstrip(b'\r').decode() if answer else None
+            ack_answer = (await port.read_until(b'\r')).rstrip(b'\r')
+            assert ack_answer.decode() == 'OK', f'No or invalid response from device! Response {ack_answer}'
+            return data
+
+    async def set_voltage_limit_async(self, voltage):
+        await self._query_async(f'VOLT{int(voltage * 10):03d}', answer=False)
+
+    async def set_current_limit_async(self, current):
+        await self._query_async(f'CURR{int(current * 10):03d}', answer=False)
+
+    async def get_voltage_async(self):
+        return float((await self._query_async('GETD'))[:4]) / 100
+
+    async def get_current_async(self):
+        return float((await self._query_async('GETD'))[4:8]) / 100
+
+    async def get_resistance_async(self):
+        answer = await self._query_async('GETD')
+        voltage = float(answer[:4])
+        current = float(answer[4:8])
+        return -1 if current < 100 else voltage / current
+
     def close(self):
         self.serial.close()
@@ -1,22 +1,21 @@
-import threading
-
 import minimalmodbus
 
 from src.Drivers.BaseClasses import AbstractController, ControllerFeatures, UnitType
+from src.Drivers.Modbus import ModbusBus
 
 
 class JumoQuantrol(AbstractController):
+    name = 'Jumo Quantrol'
     type = UnitType.TEMPERATURE
     features = {ControllerFeatures.SIMPLE_PID}
 
     def __init__(self, _port_name, _slave_address):
-        self.instrument = minimalmodbus.Instrument(_port_name, _slave_address)
-        self.instrument.serial.baudrate = 9600
-        self.instrument.serial.timeout = 0.25
-        self.com_lock = threading.Lock()
+        self.bus = ModbusBus.open(_port_name, 9600)
+        self.instrument = self.bus.instrument(_slave_address)
+        self.com_lock = self.bus.transaction(_slave_address, timeout=0.25)
 
     def close(self):
-        self.instrument.serial.close()
+        self.bus.close()
 
     def get_process_variable(self):
         with self.com_lock:
@@ -40,7 +39,7 @@ class JumoQuantrol(AbstractController):
 
     def get_control_mode(self):
         with self.com_lock:
-            return {0: 'Automatic', 1: 'Manual'}[self.read_register(0x0020) >> 12 & 1]
+            return {0: 'Automatic', 1: 'Manual'}[self.instrument.read_register(0x0020) >> 12 & 1]
 
     def set_manual_mode(self):
         with self.com_lock:
@@ -23,6 +23,7 @@ class Keithley2000(AbstractSensor):
 
 
 class Keithley2000Temp(Keithley2000):
+    name = 'Keithley2000 Temperature'
     type = UnitType.TEMPERATURE
 
     def __init__(self, _port):
@@ -37,6 +38,7 @@ class Keithley2000Temp(Keithley2000):
 
 
 class Keithley2000Volt(Keithley2000):
+    name = 'Keithley2000 Voltage'
     type = UnitType.VOLTAGE
 
     def __init__(self, _port):
@@ -2,10 +2,12 @@ import serial
 import threading
 import functools
 from operator import ixor
+from src.Drivers.AsyncSerial import AsyncSerial
 from src.Drivers.BaseClasses import AbstractSensor, UnitType, SensorFeatures
 
 
 class ME_CTL(AbstractSensor):
+    name = 'Micro Epsilon CTL'
     type = UnitType.TEMPERATURE
     features = {SensorFeatures.AIMING_BEAM}
 
@@ -13,6 +15,7 @@ class ME_CTL(AbstractSensor):
         self.serial = serial.Serial(_port, baudrate=115200, timeout=1.5)
         self.com_lock = threading.Lock()
         self.serial.reset_input_buffer()
+        self.async_serial = AsyncSerial(self.serial, self.com_lock)
         self.switch_aiming_beam(False)
 
     def get_sensor_value(self):
@@ -21,6 +24,11 @@ class ME_CTL(AbstractSensor):
             data = self.serial.read(2)
             return self._bytes_to_temp(data)
 
+    async def get_sensor_value_async(self):
+        async with self.async_serial.transaction() as port:
+            await port.write(b'\x01')
+            return self._bytes_to_temp(await port.read(2))
+
     @staticmethod
     def _bytes_to_temp(data):
         return (int.from_bytes(data, byteorder='big') - 1000) / 10
@@ -35,5 +43,11 @@ class ME_CTL(AbstractSensor):
         self.serial.write(command)
         self.serial.read(1)
 
+    async def switch_aiming_beam_async(self, state):
+        command = b'\xA5\x01' if state else b'\xA5\x00'
+        async with self.async_serial.transaction() as port:
+            await port.write(command + self._checksum(command))
+            await port.read(1)
+
     def close(self):
         self.serial.close()
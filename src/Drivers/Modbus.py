@@ -0,0 +1,109 @@
+import threading
+from collections import deque
+
+import minimalmodbus
+import serial
+
+
+def decode_register(value, number_of_decimals=0, signed=False):
+    """
+    Convert a raw 16-bit register value as returned by Instrument.read_registers into the value read_register would
+    return for the same number_of_decimals and signed arguments
+    """
+    if signed and value >= 0x8000:
+        value -= 0x10000
+    return value / 10 ** number_of_decimals if number_of_decimals else value
+
+
+class BusTransaction:
+    """
+    Context manager that holds the bus for one slave, a drop-in replacement for the com_lock of a driver. The response
+    timeout of the slave applies to the port while the bus is held.
+    """
+
+    def __init__(self, bus, slave_address, timeout):
+        self.bus = bus
+        self.slave_address = slave_address
+        self.timeout = timeout
+
+    def __enter__(self):
+        self.bus.acquire(self.slave_address, self.timeout)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.bus.release(self.slave_address)
+
+
+class ModbusBus:
+    """
+    One RS-485 bus: a single serial port shared by all Modbus slaves that are daisy-chained to it.
+    Drivers get their instrument and lock from the bus instead of opening the port themselves, so several instruments
+    can be connected through one adapter. Transactions are queued per slave address and the bus is granted to the
+    slaves in turn (round robin), so a driver that issues many requests cannot starve the other slaves on the bus.
+    The baudrate is the same for the whole bus, the response timeout is set per slave for each of its transactions.
+    The port is closed when the last driver releases it.
+    """
+    buses: dict[str, 'ModbusBus'] = {}
+    buses_lock = threading.Lock()
+
+    def __init__(self, port, baudrate):
+        self.port = port
+        self.serial = serial.Serial(port=port, baudrate=baudrate, timeout=0.05)
+        self.users = 0
+        self.condition = threading.Condition()
+        self.waiting: dict[int, int] = {}
+        self.turns: deque[int] = deque()
+        self.busy = False
+
+    @classmethod
+    def open(cls, port, baudrate=9600):
+        """Return the bus on the given port, opening the port if no other driver uses it yet"""
+        with cls.buses_lock:
+            if (bus := cls.buses.get(port)) is None:
+                bus = cls.buses[port] = cls(port, baudrate)
+            elif bus.serial.baudrate != baudrate:
+                raise serial.SerialException(f'{port} is already in use at {bus.serial.baudrate} baud!')
+            bus.users += 1
+            return bus
+
+    def close(self):
+        """Release the bus, the port is closed once all drivers using it have released it"""
+        with self.buses_lock:
+            self.users -= 1
+            if self.users > 0:
+                return
+            del self.buses[self.port]
+        with self.condition:
+            self.serial.close()
+
+    def instrument(self, slave_address):
+        return minimalmodbus.Instrument(self.serial, slave_address)
+
+    def transaction(self, slave_address, timeout=0.05):
+        """The com_lock for a slave, timeout is how long the port waits for its answers in seconds"""
+        return BusTransaction(self, slave_address, timeout)
+
+    def acquire(self, slave_address, timeout=None):
+        with self.condition:
+            if slave_address not in self.waiting:
+                self.waiting[slave_address] = 0
+                self.turns.append(slave_address)
+            self.waiting[slave_address] += 1
+            while self.busy or self.turns[0] != slave_address:
+                self.condition.wait()
+            self.busy = True
+        # Only the holder of the bus uses the port, changing the timeout reconfigures it
+        if timeout is not None and self.serial.timeout != timeout:
+            self.serial.timeout = timeout
+
+    def release(self, slave_address):
+        with self.condition:
+            self.busy = False
+            self.turns.popleft()
+            self.waiting[slave_address] -= 1
+            # A slave with further transactions queued gets back in line behind the other waiting slaves
+            if self.waiting[slave_address]:
+                self.turns.append(slave_address)
+            else:
+                del self.waiting[slave_address]
+            self.condition.notify_all()
@@ -1,18 +1,17 @@
-import threading
-
-import minimalmodbus
-
 from src.Drivers.BaseClasses import AbstractController, ControllerFeatures, UnitType
+from src.Drivers.Modbus import ModbusBus
 
 
 class OmegaPt(AbstractController):
+    name = 'Omega Pt'
     type = UnitType.TEMPERATURE
     features = {ControllerFeatures.SIMPLE_PID}
 
     def __init__(self, _port_name, _slave_address):
-        self.instrument = minimalmodbus.Instrument(_port_name, _slave_address)
+        self.bus = ModbusBus.open(_port_name, 19200)
+        self.instrument = self.bus.instrument(_slave_address)
 
-        self.com_lock = threading.Lock()
+        self.com_lock = self.bus.transaction(_slave_address)
 
         # Due to the way the Omega Pt works (no Rate setting, just ramp/soak mode), the driver needs to be aware of
         # setpoint and ramp setting
@@ -30,7 +29,7 @@ class OmegaPt(AbstractController):
         self.instrument.write_register(615, 1)
 
     def close(self):
-        self.instrument.serial.close()
+        self.bus.close()
 
     def adjust_ramp_soak(self):
         current_temp = self.get_process_variable()
@@ -1,9 +1,11 @@
 import serial
 import threading
+from src.Drivers.AsyncSerial import AsyncSerial
 from src.Drivers.BaseClasses import AbstractSensor, UnitType
 
 
 class Pyrometer(AbstractSensor):
+    name = 'Pyrometer'
     type = UnitType.TEMPERATURE
 
     def __init__(self, _port):
@@ -12,6 +14,7 @@ class Pyrometer(AbstractSensor):
         with self.com_lock:
             self.serial.write('TRIG SP OFF\r'.encode())
         self.serial.reset_input_buffer()
+        self.async_serial = AsyncSerial(self.serial, self.com_lock)
 
     def get_sensor_value(self):
         with self.com_lock:
@@ -22,5 +25,11 @@ class Pyrometer(AbstractSensor):
             temp = float(answer.split()[0])
             return temp
 
+    async def get_sensor_value_async(self):
+        async with self.async_serial.transaction() as port:
+            await port.write(b'TEMP\r')
+            answer = (await port.read_until(b'\r', 20)).decode()
+            return float(answer.split()[0])
+
     def close(self):
         self.serial.close()
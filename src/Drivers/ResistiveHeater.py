@@ -1,27 +1,37 @@
 import configparser
 import os
+import threading
 import time
 
-from PySide6.QtCore import QThreadPool, QTimer
-from scipy.stats import linregress
+from PySide6.QtCore import QThread, QThreadPool, QTimer
 
 from src.Drivers.BaseClasses import AbstractController, ControllerFeatures, UnitType
 from src.Drivers.HCS import HCS34
-from src.Drivers.Software_PID import SoftwarePID
+from src.Drivers.Software_PID import ControlLoop, LoopScheduler, SoftwarePID
 from src.Drivers.Tenma import Tenma
 from src.Engine.Worker import Worker
 from src.Signals import engine_signals, gui_signals
 
 
 class ResistiveHeater(AbstractController):
+    """
+    Heater wire driven by a power supply, with the wire resistance as temperature sensor and a software PID.
+    The control loop runs in a thread of its own that owns the periodic communication with the supply: every cycle
+    reads the resistance and sets the current. The process variable reported to the engine is the temperature of the
+    last cycle, so polling does not add traffic on the port. The setters are called from the engine workers, the
+    control state they change is guarded by state_lock, which every cycle holds while it calculates the output.
+    """
     type = UnitType.TEMPERATURE
     features = {ControllerFeatures.SIMPLE_PID, ControllerFeatures.MANUAL_POWER, ControllerFeatures.EXTERNAL_PV,
                 ControllerFeatures.EXT_CONFIG}
+    # Control loop period in ms
+    loop_time = 100
 
     def __init__(self, _port_name, power_supply=None, config_fname=None, *args, **kwargs):
 
         self.config_fname = config_fname
         self.port = _port_name
+        self.state_lock = threading.Lock()
         self.power_supply = power_supply(_port_name)
 
         self.workers = []
@@ -32,7 +42,9 @@ class ResistiveHeater(AbstractController):
         self.target_setpoint = 25
 
         self.smoothed_temperature = 25
+        # Weight of the previous temperature per smoothing_interval seconds, independent of the loop period
         self.smoothing_factor = 0.8
+        self.smoothing_interval = 0.5
 
         self.max_voltage = config['Heater']['U_max']
         self.max_current = config['Heater']['I_max']
@@ -49,11 +61,9 @@ class ResistiveHeater(AbstractController):
 
         self.rate = config['Control']['Rate']
 
-        # Timer for automatic ramping mode
-        self.loop_time = 250
-        self.timer = QTimer()
-        self.timer.timeout.connect(self._control_loop)
-        self.timer.start(self.loop_time)
+        # The control loop runs on a fixed timestep schedule in a thread that is started in start
+        self.scheduler = LoopScheduler(self.loop_time / 1000)
+        self.control_loop: ControlLoop | None = None
 
         # Take heater resistance from the config file
         self.r_cold = config['Heater']['R_cold']
@@ -67,6 +77,13 @@ class ResistiveHeater(AbstractController):
         # Used for ensuring that sensor values arrive at least every 2 seconds in external pv mode
         self.external_pv_mode = False
         self.external_pv = 0
+        self.sentinel_timer: QTimer | None = None
+
+    def start(self):
+        self.control_loop = ControlLoop(self.scheduler, self._control_cycle, f'{self.name} control loop')
+        self.control_loop.start(QThread.Priority.TimeCriticalPriority)
+
+        # The timer has to live in the engine thread, the constructor runs in a connector thread
         self.sentinel_timer = QTimer(singleShot=True)
         self.sentinel_timer.setInterval(2000)
         self.sentinel_timer.timeout.connect(self.sentinel_trip)
@@ -76,46 +93,67 @@ class ResistiveHeater(AbstractController):
         gui_signals.get_calibration_data.connect(self.calibrate)
 
     def close(self):
-        self.timer.stop()
+        if self.control_loop:
+            self.control_loop.stop()
+            self.control_loop = None
+            # Undo start, a heater that was reconnected is replaced by a new instance
+            self.sentinel_timer.stop()
+            self.sentinel_timer.timeout.disconnect(self.sentinel_trip)
+            gui_signals.get_resistive_heater_config.disconnect(self.report_heater_config)
+            gui_signals.set_resistive_heater_config.disconnect(self.update_config)
+            gui_signals.get_calibration_data.disconnect(self.calibrate)
         self.power_supply.close()
 
     def set_external_pv_mode(self, mode):
-        self.external_pv_mode = mode
-        self.working_setpoint = self.external_pv if mode else self.get_process_variable()
-        self.pid_controller.output_sum = 0
-        if self.external_pv_mode:
+        temperature = self.get_process_variable()
+        with self.state_lock:
+            self.external_pv_mode = mode
+            self.working_setpoint = self.external_pv if mode else temperature
+            self.pid_controller.output_sum = 0
+        if mode:
             self.sentinel_timer.start()
         else:
             self.sentinel_timer.stop()
 
     def update_external_pv(self, value):
-        self.external_pv = value
+        with self.state_lock:
+            self.external_pv = value
         if self.external_pv_mode:
             self.sentinel_timer.start()
 
     def sentinel_trip(self):
-        self.external_pv = 0
+        with self.state_lock:
+            self.external_pv = 0
         self.set_external_pv_mode(False)
         engine_signals.error.emit('Did not receive PV value from sensor in time. Reverting to normal control mode!')
 
-    def _control_loop(self):
-        if self.control_mode == 'Manual':
-            self.working_power = self.manual_output_power
-        else:
-            self._working_setpoint_adjust()
-            pv = self.external_pv if self.external_pv_mode else self.smoothed_temperature
-            pid_result = (self.pid_controller.calculate_output(pv, self.working_setpoint) or self.working_power)
+    def _control_cycle(self, dt):
+        """One cycle of the control loop, dt seconds after the previous one: measure, then set the current"""
+        resistance = self.power_supply.get_resistance()
+        # The port is not held up by the lock, only the calculation of the output is
+        with self.state_lock:
+            self._update_temperature(resistance, dt)
+            if self.control_mode == 'Manual':
+                self.working_power = self.manual_output_power
+            else:
+                self._working_setpoint_adjust(dt)
+                pv = self.external_pv if self.external_pv_mode else self.smoothed_temperature
+                pid_result = self.pid_controller.calculate_output(pv, self.working_setpoint, dt)
+
+                self.working_power = max(pid_result, self.min_output)
+            current = self.working_power / 100 * self.max_current
+        self.power_supply.set_current_limit(current)
 
-            self.working_power = max(pid_result, self.min_output)
+    def _update_temperature(self, resistance, dt):
+        if resistance == -1:
+            resistance = self.r_cold
 
-            worker = Worker(lambda: self.power_supply.set_current_limit(self.working_power / 100 * self.max_current))
-            self.workers.append(worker)
-            worker.signals.error.connect(lambda error: engine_signals.error.emit(error))
-            worker.signals.finished.connect(lambda w=worker: self.workers.remove(w))
-            QThreadPool.globalInstance().start(worker)
+        new_temperature = self._temp_from_resistance(resistance)
+        factor = self.smoothing_factor ** (dt / self.smoothing_interval)
+        self.smoothed_temperature = self.smoothed_temperature * factor + new_temperature * (1 - factor)
 
-    def _working_setpoint_adjust(self):
-        increment = self.rate * self.loop_time / 1000 / 60
+    def _working_setpoint_adjust(self, dt):
+        increment = self.rate * dt / 60
         if self.working_setpoint < self.target_setpoint:
             self.working_setpoint = min(self.working_setpoint + increment, self.target_setpoint)
         elif self.working_setpoint > self.target_setpoint:
@@ -131,18 +169,14 @@ class ResistiveHeater(AbstractController):
         return (resistance * self.wire_geometry_factor - self.offset) / self.slope
 
     def get_process_variable(self):
-        resistance = self.power_supply.get_resistance()
-        if resistance == -1:
-            resistance = self.r_cold
-
-        new_temperature = self._temp_from_resistance(resistance)
-        self.smoothed_temperature *= self.smoothing_factor
-        self.smoothed_temperature += new_temperature * (1 - self.smoothing_factor)
-
+        """Smoothed temperature of the last control cycle, a failure of the last cycle is raised here"""
+        if self.control_loop and (error := self.control_loop.error) is not None:
+            raise error
         return self.smoothed_temperature
 
     def set_manual_output_power(self, output):
-        self.manual_output_power = output
+        with self.state_lock:
+            self.manual_output_power = output
 
     def get_working_output(self):
         return self.working_power
@@ -163,32 +197,40 @@ class ResistiveHeater(AbstractController):
         return self.control_mode
 
     def set_target_setpoint(self, setpoint):
-        self.target_setpoint = setpoint
+        with self.state_lock:
+            self.target_setpoint = setpoint
 
     def set_rate(self, rate):
-        self.rate = rate
+        with self.state_lock:
+            self.rate = rate
         self.write_config_to_file()
 
     def set_manual_mode(self):
-        self.manual_output_power = self.working_power
-        self.control_mode = 'Manual'
+        with self.state_lock:
+            self.manual_output_power = self.working_power
+            self.control_mode = 'Manual'
 
     def set_automatic_mode(self):
-        self.working_setpoint = self.get_process_variable()
-        # Reset the error accumulator on each switch to automatic mode to avoid windup
-        self.pid_controller.output_sum = 0
-        self.control_mode = 'Automatic'
+        temperature = self.get_process_variable()
+        with self.state_lock:
+            self.working_setpoint = temperature
+            # Reset the error accumulator on each switch to automatic mode to avoid windup
+            self.pid_controller.output_sum = 0
+            self.control_mode = 'Automatic'
 
     def set_pid_p(self, p):
-        self.pid_controller.pb = p
+        with self.state_lock:
+            self.pid_controller.pb = p
         self.write_config_to_file()
 
     def set_pid_i(self, i):
-        self.pid_controller.ti = i
+        with self.state_lock:
+            self.pid_controller.ti = i
         self.write_config_to_file()
 
     def set_pid_d(self, d):
-        self.pid_controller.td = d
+        with self.state_lock:
+            self.pid_controller.td = d
         self.write_config_to_file()
 
     def get_pid_p(self):
@@ -200,6 +242,10 @@ class ResistiveHeater(AbstractController):
     def get_pid_d(self):
         return self.pid_controller.td
 
+    def get_loop_statistics(self):
+        """Timing of the control loop: actual cycle times, lateness and skipped cycles"""
+        return self.scheduler.statistics()
+
     def write_config_to_file(self):
         config = configparser.ConfigParser()
         config_file_path = os.path.join(directory := os.path.join(os.getenv('APPDATA'), 'ElchWorks', 'ElchiTools'),
@@ -229,7 +275,10 @@ class ResistiveHeater(AbstractController):
                 engine_signals.message.emit(f'No configuration file found for port {self.port}, using defaults!')
         else:
             engine_signals.message.emit('No configuration file found, using defaults!')
+        return self.config_values(config)
 
+    def config_values(self, config):
+        """Heater parameters of this port from a parsed configuration file, defaults for everything missing"""
         return {'PID': {'P': config.getfloat(self.port, 'P', fallback=750),
                         'I': config.getfloat(self.port, 'I', fallback=12),
                         'D': config.getfloat(self.port, 'D', fallback=0)},
@@ -242,11 +291,12 @@ class ResistiveHeater(AbstractController):
                              'Slope':  config.getfloat(self.port, 'Slope', fallback=0.0003)}}
 
     def update_config(self, parameters):
-        self.max_voltage = parameters['maximum voltage']
-        self.max_current = parameters['maximum current']
-        self.r_cold = parameters['cold resistance']
-        self.wire_geometry_factor = 0.2075 / self.r_cold
-        self.min_output = parameters['minimum output']
+        with self.state_lock:
+            self.max_voltage = parameters['maximum voltage']
+            self.max_current = parameters['maximum current']
+            self.r_cold = parameters['cold resistance']
+            self.wire_geometry_factor = 0.2075 / self.r_cold
+            self.min_output = parameters['minimum output']
         self.write_config_to_file()
 
         self.power_supply.set_voltage_limit(self.max_voltage)
@@ -268,6 +318,8 @@ class ResistiveHeater(AbstractController):
                 u.append(self.power_supply.get_voltage())
                 j.append(self.power_supply.get_current())
             self.set_manual_output_power(0)
+            # scipy takes long to import and is only needed here
+            from scipy.stats import linregress
             try:
                 slope, intercept, r_value, p_value, std_err = linregress(j, u)
                 return {'U': u, 'I': j, 'R': slope, 'OS': intercept, 'R2': r_value, 'State': 'Success'}
@@ -282,12 +334,17 @@ class ResistiveHeater(AbstractController):
         QThreadPool.globalInstance().start(worker)
 
     def emergency_stop(self):
-        self.set_manual_mode()
-        self.set_manual_output_power(0)
+        # In one step, so no cycle runs in manual mode with the previous output
+        with self.state_lock:
+            self.manual_output_power = 0
+            self.control_mode = 'Manual'
 
 
 class ResistiveHeaterTenma(ResistiveHeater):
+    name = 'Resistive Heater Tenma'
     features = ResistiveHeater.features | {ControllerFeatures.OUTPUT_ENABLE}
+    # Reading the resistance takes two unterminated answers of at least 50 ms each
+    loop_time = 250
 
     def __init__(self, _port_name, *args, **kwargs):
         super().__init__(_port_name=_port_name, power_supply=Tenma, config_fname='Tenma.ini', *args, **kwargs)
@@ -300,5 +357,7 @@ class ResistiveHeaterTenma(ResistiveHeater):
 
 
 class ResistiveHeaterHCS(ResistiveHeater):
+    name = 'Resistive Heater HCS'
+
     def __init__(self, _port_name, *args, **kwargs):
         super().__init__(_port_name=_port_name, power_supply=HCS34, config_fname='HCS.ini', *args, **kwargs)
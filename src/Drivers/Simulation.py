@@ -0,0 +1,417 @@
+import collections
+import configparser
+import random
+import threading
+import time
+
+from src.Drivers.BaseClasses import AbstractController, AbstractSensor, ControllerFeatures, UnitType
+from src.Drivers.ResistiveHeater import ResistiveHeater
+
+
+class ThermalPlant:
+    """
+    Two-node thermal model of a furnace: a heater (element and thermocouple) with heat capacity heater_capacity (J/K)
+    is heated with the input power (W) after dead_time seconds, and passes heat to the sample and furnace body
+    (sample_capacity) through coupling (W/K), which loses heat to the ambient through loss (W/K). With a sample
+    capacity of 0 the plant is a first-order lag.
+    The plant keeps its own clock, which runs speed times faster than real time and is advanced on every access, so
+    the state is always current without a thread of its own. Controllers attached with attach are executed on the
+    plant clock at a fixed interval, so closed loop behaviour is the same at any speed. step advances the clock
+    without waiting, for simulating days of operation in seconds.
+    Plants are shared by port (see at), so a simulated controller and sensor on the same port observe one furnace.
+    """
+    # Integration step in simulated seconds
+    max_step = 0.25
+    # Parameters of the plants created on first access of a port, see configure
+    configurations = {}
+    plants = {}
+    plants_lock = threading.Lock()
+
+    def __init__(self, max_power=1000.0, heater_capacity=500.0, sample_capacity=2000.0, coupling=20.0, loss=1.0,
+                 ambient=25.0, dead_time=5.0, noise=0.2, speed=1.0, seed=None):
+        self.max_power = max_power
+        self.heater_capacity = heater_capacity
+        self.sample_capacity = sample_capacity
+        self.coupling = coupling
+        self.loss = loss
+        self.ambient = ambient
+        self.dead_time = dead_time
+        self.noise = noise
+        self.speed = speed
+        self.random = random.Random(seed)
+
+        self.time = 0.0
+        self.heater_temperature = ambient
+        self.sample_temperature = ambient
+        self.power = 0.0
+        # Power changes in the dead time window as (plant time, power), the first entry is in effect
+        self.power_changes = collections.deque([(-dead_time, 0.0)])
+        self.controllers = []
+        self.lock = threading.RLock()
+        self.last_update = time.perf_counter()
+
+    @classmethod
+    def configure(cls, port, **parameters):
+        """Set the parameters of the plant of a port, a running plant of that port is replaced"""
+        with cls.plants_lock:
+            cls.configurations[port] = parameters
+            cls.plants.pop(port, None)
+
+    @classmethod
+    def at(cls, port, **defaults):
+        """The plant of a port, created with the configured parameters (or else the given defaults) on first use"""
+        with cls.plants_lock:
+            if port not in cls.plants:
+                cls.plants[port] = cls(**(cls.configurations.get(port) or defaults))
+            return cls.plants[port]
+
+    def attach(self, control, interval):
+        """Call control(plant time) every interval seconds of plant time"""
+        with self.lock:
+            self.controllers.append([control, interval, self.time + interval])
+
+    def detach(self, control):
+        with self.lock:
+            self.controllers = [entry for entry in self.controllers if entry[0] != control]
+
+    def set_power(self, power):
+        """Set the heating power in W, it takes effect after the dead time"""
+        with self.lock:
+            self.advance()
+            self.apply_power(power)
+
+    def apply_power(self, power):
+        """Set the heating power at the current plant time, for controllers running on the plant clock"""
+        with self.lock:
+            self.power = min(max(power, 0.0), self.max_power)
+            self.power_changes.append((self.time, self.power))
+
+    def advance(self):
+        """Bring the plant up to the current time of its clock"""
+        with self.lock:
+            now = time.perf_counter()
+            elapsed, self.last_update = (now - self.last_update) * self.speed, now
+            self.step(elapsed)
+
+    def step(self, duration):
+        """Advance the plant clock by duration seconds, running the attached controllers on the way"""
+        with self.lock:
+            end = self.time + duration
+            while self.time < end:
+                due = min((entry[2] for entry in self.controllers), default=end)
+                self._integrate(min(due, end))
+                for entry in self.controllers:
+                    if entry[2] <= self.time:
+                        entry[2] += entry[1]
+                        entry[0](self.time)
+
+    def _integrate(self, until):
+        while self.time < until:
+            dt = min(until - self.time, self.max_step)
+            while len(self.power_changes) > 1 and self.power_changes[1][0] <= self.time - self.dead_time:
+                self.power_changes.popleft()
+            power = self.power_changes[0][1]
+            if self.sample_capacity:
+                flow = self.coupling * (self.heater_temperature - self.sample_temperature)
+                self.heater_temperature += (power - flow) / self.heater_capacity * dt
+                self.sample_temperature += (flow - self.loss * (self.sample_temperature - self.ambient)) / \
+                    self.sample_capacity * dt
+            else:
+                self.heater_temperature += (power - self.loss * (self.heater_temperature - self.ambient)) / \
+                    self.heater_capacity * dt
+                self.sample_temperature = self.heater_temperature
+            # Land exactly on until, so controllers due then are not missed by a rounding error
+            self.time = self.time + dt if dt == self.max_step else until
+
+    def measure(self, node='Heater', advance=True):
+        """Temperature of the heater or the sample with measurement noise"""
+        with self.lock:
+            if advance:
+                self.advance()
+            value = self.heater_temperature if node == 'Heater' else self.sample_temperature
+            return value + self.random.gauss(0, self.noise) if self.noise else value
+
+
+class SimulatedController(AbstractController):
+    """
+    Controller of a simulated furnace: PID on the heater thermocouple (or the external PV) with a setpoint ramp,
+    executed on the plant clock. Every call takes latency seconds of real time, like a serial transaction would.
+    """
+    name = 'Simulated Furnace'
+    type = UnitType.TEMPERATURE
+    features = {ControllerFeatures.MANUAL_POWER, ControllerFeatures.SIMPLE_PID, ControllerFeatures.STATUS_BLOCK,
+                ControllerFeatures.EXTERNAL_PV}
+    latency = 0.01
+    loop_interval = 0.25
+
+    def __init__(self, _port_name, _slave_address=1, plant=None):
+        self.com_lock = threading.Lock()
+        self.plant = plant or ThermalPlant.at(_port_name)
+
+        self.pb = 40.0
+        self.ti = 400.0
+        self.td = 20.0
+        self.rate = 10.0
+        self.mode = 'Automatic'
+        self.target_setpoint = self.plant.ambient
+        self.working_setpoint = self.plant.ambient
+        self.manual_power = 0.0
+        self.output = 0.0
+        self.output_sum = 0.0
+        self.last_pv = None
+        self.derivative = 0.0
+        self.external_pv_mode = False
+        self.external_pv = None
+        self.plant.attach(self.control, self.loop_interval)
+
+    def control(self, _plant_time):
+        """One cycle of the control loop, called by the plant"""
+        if self.mode == 'Manual':
+            self.output = self.manual_power
+        else:
+            step = self.rate / 60 * self.loop_interval
+            self.working_setpoint += max(-step, min(step, self.target_setpoint - self.working_setpoint))
+            pv = self.external_pv if self.external_pv_mode and self.external_pv is not None else \
+                self.plant.measure('Heater', advance=False)
+            kp = 100 / self.pb
+            error = self.working_setpoint - pv
+            self.output_sum = min(max(self.output_sum + kp / self.ti * self.loop_interval * error, 0.0), 100.0)
+            if self.last_pv is not None:
+                # Derivative on the measurement, filtered with a time constant of td / 8 to keep the noise down
+                raw = (pv - self.last_pv) / self.loop_interval
+                self.derivative += (raw - self.derivative) * self.loop_interval / (self.loop_interval + self.td / 8)
+            derivative = self.derivative
+            self.last_pv = pv
+            self.output = min(max(kp * error + self.output_sum - kp * self.td * derivative, 0.0), 100.0)
+        self.plant.apply_power(self.output / 100 * self.plant.max_power)
+
+    def _transaction(self):
+        time.sleep(self.latency)
+        self.plant.advance()
+
+    def get_process_variable(self):
+        with self.com_lock:
+            self._transaction()
+            return self.plant.measure('Heater')
+
+    def get_working_output(self):
+        with self.com_lock:
+            self._transaction()
+            return self.output
+
+    def get_working_setpoint(self):
+        with self.com_lock:
+            self._transaction()
+            return self.working_setpoint
+
+    def get_status_block(self):
+        with self.com_lock:
+            self._transaction()
+            return {'Controller PV': self.plant.measure('Heater'), 'Setpoint': self.working_setpoint,
+                    'Power': self.output}
+
+    def get_target_setpoint(self):
+        with self.com_lock:
+            self._transaction()
+            return self.target_setpoint
+
+    def set_target_setpoint(self, setpoint):
+        with self.com_lock:
+            self._transaction()
+            self.target_setpoint = setpoint
+
+    def get_rate(self):
+        with self.com_lock:
+            self._transaction()
+            return self.rate
+
+    def set_rate(self, rate):
+        with self.com_lock:
+            self._transaction()
+            self.rate = rate
+
+    def get_control_mode(self):
+        with self.com_lock:
+            self._transaction()
+            return self.mode
+
+    def set_automatic_mode(self):
+        with self.com_lock:
+            self._transaction()
+            # Bumpless transfer: continue from the current output and temperature
+            self.working_setpoint = self.plant.heater_temperature
+            self.output_sum = self.output
+            self.mode = 'Automatic'
+
+    def set_manual_mode(self):
+        with self.com_lock:
+            self._transaction()
+            self.manual_power = self.output
+            self.mode = 'Manual'
+
+    def set_manual_output_power(self, output):
+        with self.com_lock:
+            self._transaction()
+            self.manual_power = min(max(output, 0.0), 100.0)
+
+    def get_manual_output_power(self):
+        with self.com_lock:
+            self._transaction()
+            return self.manual_power
+
+    def get_pid_p(self):
+        return self.pb
+
+    def set_pid_p(self, p):
+        if p <= 0:
+            raise ValueError(f'Proportional band {p} out of range!')
+        self.pb = p
+
+    def get_pid_i(self):
+        return self.ti
+
+    def set_pid_i(self, i):
+        if i <= 0:
+            raise ValueError(f'Integral time {i} out of range!')
+        self.ti = i
+
+    def get_pid_d(self):
+        return self.td
+
+    def set_pid_d(self, d):
+        self.td = d
+
+    def update_external_pv(self, value):
+        self.external_pv = value
+
+    def set_external_pv_mode(self, mode):
+        self.external_pv_mode = mode
+
+    def emergency_stop(self):
+        self.set_manual_mode()
+        self.set_manual_output_power(0)
+
+    def close(self):
+        self.plant.detach(self.control)
+
+
+class SimulatedSensor(AbstractSensor):
+    """Pyrometer looking at the sample of a simulated furnace"""
+    name = 'Simulated Pyrometer'
+    type = UnitType.TEMPERATURE
+    latency = 0.01
+
+    def __init__(self, _port, plant=None):
+        self.com_lock = threading.Lock()
+        self.plant = plant or ThermalPlant.at(_port)
+
+    def get_sensor_value(self):
+        with self.com_lock:
+            time.sleep(self.latency)
+            return self.plant.measure('Sample')
+
+    def close(self):
+        pass
+
+
+class SimulatedPowerSupply:
+    """
+    Stand-in for the Tenma and HCS34 power supplies, driving a heater wire in a simulated micro heater.
+    The wire resistance follows the heater temperature with the calibration the resistive heater assumes by default
+    (R = R_cold * (offset + slope * T) / 0.2075), the supply limits the current like a real one: the output is in
+    constant current mode unless the voltage limit is reached.
+    """
+    latency = 0.01
+    plant_parameters = {'max_power': 200.0, 'heater_capacity': 0.3, 'sample_capacity': 0.0, 'loss': 0.07,
+                        'dead_time': 0.1, 'noise': 0.0}
+
+    def __init__(self, port, r_cold=0.5, offset=0.2, slope=0.0003, plant=None):
+        self.com_lock = threading.Lock()
+        self.plant = plant or ThermalPlant.at(port, **self.plant_parameters)
+        self.r_cold = r_cold
+        self.offset = offset
+        self.slope = slope
+        self.voltage_limit = 0.0
+        self.current_limit = 0.0
+        self.output_enabled = True
+
+    def _output(self):
+        """Voltage and current at the output, after updating the power dissipated in the wire"""
+        time.sleep(self.latency)
+        resistance = self.r_cold * (self.offset + self.slope * self.plant.measure('Heater')) / 0.2075
+        current = min(self.current_limit, self.voltage_limit / resistance) if self.output_enabled else 0.0
+        self.plant.set_power(current ** 2 * resistance)
+        return current * resistance, current
+
+    def set_voltage_limit(self, voltage):
+        with self.com_lock:
+            self.voltage_limit = voltage
+            self._output()
+
+    def set_current_limit(self, current):
+        with self.com_lock:
+            self.current_limit = current
+            self._output()
+
+    def get_voltage_limit(self):
+        with self.com_lock:
+            return self.voltage_limit
+
+    def get_current_limit(self):
+        with self.com_lock:
+            return self.current_limit
+
+    def get_voltage(self):
+        with self.com_lock:
+            return self._output()[0]
+
+    def get_current(self):
+        with self.com_lock:
+            return self._output()[1]
+
+    def get_limit_mode(self):
+        with self.com_lock:
+            voltage, current = self._output()
+            return 'CC' if current >= self.current_limit else 'CV'
+
+    def get_resistance(self):
+        with self.com_lock:
+            voltage, current = self._output()
+            return -1 if current < 0.1 else voltage / current
+
+    def enable_output(self):
+        with self.com_lock:
+            self.output_enabled = True
+            self._output()
+
+    def disable_output(self):
+        with self.com_lock:
+            self.output_enabled = False
+            self._output()
+
+    def close(self):
+        with self.com_lock:
+            self.output_enabled = False
+            self._output()
+
+
+class SimulatedResistiveHeater(ResistiveHeater):
+    """Resistive heater with its software PID driving a simulated power supply, configured with the defaults"""
+    name = 'Simulated Resistive Heater'
+    features = ResistiveHeater.features | {ControllerFeatures.OUTPUT_ENABLE}
+
+    def __init__(self, _port_name, *args, **kwargs):
+        super().__init__(_port_name=_port_name, power_supply=SimulatedPowerSupply, config_fname=None, *args, **kwargs)
+
+    def read_from_config(self):
+        # Never use (or overwrite) the configuration of a real heater
+        return self.config_values(configparser.ConfigParser())
+
+    def write_config_to_file(self):
+        pass
+
+    def enable_output(self):
+        self.power_supply.enable_output()
+
+    def disable_output(self):
+        self.power_supply.disable_output()
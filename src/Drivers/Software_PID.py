@@ -1,45 +1,168 @@
+import math
+import threading
 import time
 
+from PySide6.QtCore import QThread
+
+from src.Engine.Threads import keep_until_finished
+
+
+class LoopScheduler:
+    """
+    Fixed timestep schedule of a control loop on the monotonic clock.
+    Cycle n is due at start + n * interval, so a late cycle shortens the wait for the next one instead of shifting
+    all later cycles: the loop does not drift. Cycles that are missed entirely (a delay of more than one interval) are
+    skipped and counted as overruns rather than run back to back. tick returns the measured time since the previous
+    cycle, which the controller uses instead of the nominal interval.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.next_time = None
+        self.last_time = None
+        self.reset_statistics()
+
+    def start(self, now=None):
+        """Make the first cycle due now"""
+        self.next_time = time.monotonic() if now is None else now
+        self.last_time = None
+
+    def time_to_next(self, now=None):
+        """Seconds until the next cycle is due, 0 if it is due already"""
+        if self.next_time is None:
+            return 0.0
+        return max(self.next_time - (time.monotonic() if now is None else now), 0.0)
+
+    def tick(self, now=None):
+        """Start a cycle if one is due: return the seconds since the previous cycle, None if it is too early"""
+        now = time.monotonic() if now is None else now
+        if self.next_time is None:
+            self.start(now)
+        if now < self.next_time:
+            return None
+        missed = int((now - self.next_time) // self.interval)
+        lateness = now - self.next_time - missed * self.interval
+        self.next_time += (missed + 1) * self.interval
+        dt = now - self.last_time if self.last_time is not None else self.interval
+        self.last_time = now
+        self._record(dt, lateness, missed)
+        return dt
+
+    def reset_statistics(self):
+        self.cycles = 0
+        self.overruns = 0
+        self.dt_mean = 0.0
+        self.dt_m2 = 0.0
+        self.dt_min = math.inf
+        self.dt_max = 0.0
+        self.lateness_sum = 0.0
+        self.lateness_max = 0.0
+
+    def _record(self, dt, lateness, missed):
+        self.cycles += 1
+        self.overruns += missed
+        # Running mean and variance (Welford), the statistics take constant memory however long the loop runs
+        delta = dt - self.dt_mean
+        self.dt_mean += delta / self.cycles
+        self.dt_m2 += delta * (dt - self.dt_mean)
+        self.dt_min = min(self.dt_min, dt)
+        self.dt_max = max(self.dt_max, dt)
+        self.lateness_sum += lateness
+        self.lateness_max = max(self.lateness_max, lateness)
+
+    def statistics(self):
+        """Loop timing since the last reset, times in ms"""
+        if not self.cycles:
+            return {'Interval': self.interval * 1000, 'Cycles': 0, 'Overruns': self.overruns}
+        return {'Interval': self.interval * 1000,
+                'Cycles':   self.cycles,
+                'Overruns': self.overruns,
+                'dt':       {'Mean': round(self.dt_mean * 1000, 3),
+                             'Std':  round(math.sqrt(self.dt_m2 / self.cycles) * 1000, 3),
+                             'Min':  round(self.dt_min * 1000, 3),
+                             'Max':  round(self.dt_max * 1000, 3)},
+                'Lateness': {'Mean': round(self.lateness_sum / self.cycles * 1000, 3),
+                             'Max':  round(self.lateness_max * 1000, 3)}}
+
+
+class ControlLoop(QThread):
+    """
+    Thread that runs cycle(dt) on the schedule of a LoopScheduler. It does nothing but wait for the next cycle and run
+    it, so the timing of the loop does not depend on the load of the engine and GUI threads. An exception raised by a
+    cycle is kept in error until a cycle succeeds again, the loop keeps running.
+    """
+
+    def __init__(self, scheduler, cycle, name='Control loop'):
+        super().__init__()
+        self.setObjectName(name)
+        self.scheduler = scheduler
+        self.cycle = cycle
+        self.error: Exception | None = None
+        self.stop_event = threading.Event()
+
+    def run(self):
+        self.scheduler.start()
+        while not self.stop_event.wait(self.scheduler.time_to_next()):
+            if (dt := self.scheduler.tick()) is None:
+                continue
+            try:
+                self.cycle(dt)
+            except Exception as e:
+                self.error = e
+            else:
+                self.error = None
+
+    def stop(self, timeout=5000):
+        """End the loop after the current cycle, return False if the cycle did not end within the timeout"""
+        self.stop_event.set()
+        if not self.wait(timeout):
+            keep_until_finished(self)
+            return False
+        return True
+
 
 class SoftwarePID:
+    """
+    PID controller with the output in percent, parametrized like the hardware controllers: proportional band pb,
+    integral time ti and derivative time td in seconds. The derivative acts on the process variable, so setpoint steps
+    do not kick the output. The integral and derivative terms use the actual time dt since the previous calculation.
+    """
+
     def __init__(self, pb, ti, td, loop_interval=0.25):
         self.pb = pb
         self.ti = ti
         self.td = td
 
-        self.last_process_variable = 0
+        self.last_process_variable = None
         self.output_sum = 0
 
-        self.interval = loop_interval  # seconds
-        self.last_update = time.time()
+        # Nominal interval in seconds, the actual dt of every cycle comes from the loop scheduler
+        self.interval = loop_interval
 
-    def calculate_output(self, process_variable, setpoint):
-        kp, ki, kd = self._transform_pid_params(self.pb, self.ti, self.td)
+    def calculate_output(self, process_variable, setpoint, dt=None):
+        """Output in percent, dt is the time in seconds since the previous calculation (the interval if not given)"""
+        dt = dt or self.interval
+        kp, ki, kd = self._transform_pid_params(self.pb, self.ti, self.td, dt)
 
-        if now := time.time() - self.last_update > self.interval:
-            error = setpoint - process_variable
-            d_pv = process_variable - self.last_process_variable
+        error = setpoint - process_variable
+        d_pv = process_variable - self.last_process_variable if self.last_process_variable is not None else 0
 
-            self.output_sum += ki * error
-            self.output_sum = self._constrain(self.output_sum)
+        self.output_sum += ki * error
+        self.output_sum = self._constrain(self.output_sum)
 
-            output = error * kp + self.output_sum - d_pv * kd
+        output = error * kp + self.output_sum - d_pv * kd
+        self.last_process_variable = process_variable
 
-            output = self._constrain(output)
-            self.last_process_variable = process_variable
-            self.last_update = now
-
-            return output
-        else:
-            return None
+        return self._constrain(output)
 
     @staticmethod
     def _constrain(value, _min=0, _max=100):
         return max(min(_max, value), _min)
 
-    def _transform_pid_params(self, pb, ti, td):
+    @staticmethod
+    def _transform_pid_params(pb, ti, td, dt):
         kp = 100 / pb
-        ki = kp / ti * self.interval
-        kd = kp * td / self.interval
+        ki = kp / ti * dt
+        kd = kp * td / dt
 
         return kp, ki, kd
@@ -1,12 +1,56 @@
 import threading
+import time
 
 import serial
 
+from src.Drivers.AsyncSerial import AsyncSerial
+
 
 class Tenma:
+    # Answers are not terminated, they end when the supply stops sending for this many seconds
+    answer_idle = 0.05
+
     def __init__(self, port, baudrate=9600):
         self.serial = serial.Serial(port, baudrate=baudrate, timeout=1.5)
         self.com_lock = threading.Lock()
+        self.async_serial = AsyncSerial(self.serial, self.com_lock)
+
+    async def _ask_async(self, port, string):
+        """Send a query within a transaction of the async port and return the answer as a number"""
+        await port.write(string.encode() + b'\x0D')
+        return float((await port.read_until(b'\n', idle=self.answer_idle)).decode())
+
+    async def _query_async(self, string):
+        async with self.async_serial.transaction() as port:
+            return await self._ask_async(port, string)
+
+    def _read_answer(self):
+        """Wait for the answer to start (up to the port timeout), then read until the supply stops sending"""
+        answer = bytearray(self.serial.read(1))
+        if not answer:
+            raise serial.SerialTimeoutException(f'No answer from the power supply on {self.serial.port}')
+        quiet_since = time.perf_counter()
+        while answer and time.perf_counter() - quiet_since < self.answer_idle:
+            if waiting := self.serial.in_waiting:
+                answer += self.serial.read(waiting)
+                quiet_since = time.perf_counter()
+            else:
+                time.sleep(0.002)
+        return answer.decode()
+
+    def _ask(self, string):
+        """Send a query and return the answer, the caller holds the com_lock"""
+        self.serial.write(string.encode())
+        self.serial.write(b'\x0D')
+        return self._read_answer()
+
+    def _query(self, string):
+        with self.com_lock:
+            return self._ask(string)
+
+    async def _command_async(self, string):
+        async with self.async_serial.transaction() as port:
+            await port.write(string.encode() + b'\x0D')
 
     def set_voltage_limit(self, voltage):
         string = f'VSET05:{voltage:.3f}'
@@ -21,62 +65,44 @@ class Tenma:
             self.serial.write(b'\x0D')
 
     def get_voltage_limit(self):
-        string = f'VSET05?'
-        with self.com_lock:
-            self.serial.write(string.encode())
-            self.serial.write(b'\x0D')
-            answer = self.serial.readline()
-            return float(answer.decode())
+        return float(self._query('VSET05?'))
 
     def get_current_limit(self):
-        string = f'ISET05?'
-        with self.com_lock:
-            self.serial.write(string.encode())
-            self.serial.write(b'\x0D')
-            answer = self.serial.readline()
-            return float(answer.decode())
+        return float(self._query('ISET05?'))
 
     def get_voltage(self):
-        string = f'VOUT05?'
-        with self.com_lock:
-            self.serial.write(string.encode())
-            self.serial.write(b'\x0D')
-            answer = self.serial.readline()
-            return float(answer.decode())
+        return float(self._query('VOUT05?'))
 
     def get_current(self):
-        string = f'IOUT05?'
-        with self.com_lock:
-            self.serial.write(string.encode())
-            self.serial.write(b'\x0D')
-            answer = self.serial.readline()
-            return float(answer.decode())
+        return float(self._query('IOUT05?'))
 
     def get_limit_mode(self):
-        string = f'STATUS05?'
-        with self.com_lock:
-            self.serial.write(string.encode())
-            self.serial.write(b'\x0D')
-            answer = self.serial.readline()
-            return 'CV' if answer.decode()[-1] == '0' else 'CC'
+        return 'CV' if self._query('STATUS05?')[-1] == '0' else 'CC'
 
     def get_resistance(self):
-        string_c = f'IOUT05?'
-        string_v = f'VOUT05?'
+        # Current and voltage in one transaction, so no other request gets between the two readings
         with self.com_lock:
-            self.serial.write(string_c.encode())
-            self.serial.write(b'\x0D')
-            answer_c = self.serial.readline()
-            self.serial.write(string_v.encode())
-            self.serial.write(b'\x0D')
-            answer_v = self.serial.readline()
+            current = float(self._ask('IOUT05?'))
+            voltage = float(self._ask('VOUT05?'))
+        return -1 if current < 0.1 else voltage / current
 
-            voltage = float(answer_v.decode())
-            current = float(answer_c.decode())
-            if current < 0.1:
-                return -1
-            else:
-                return voltage / current
+    async def set_voltage_limit_async(self, voltage):
+        await self._command_async(f'VSET05:{voltage:.3f}')
+
+    async def set_current_limit_async(self, current):
+        await self._command_async(f'ISET05:{current:.3f}')
+
+    async def get_voltage_async(self):
+        return await self._query_async('VOUT05?')
+
+    async def get_current_async(self):
+        return await self._query_async('IOUT05?')
+
+    async def get_resistance_async(self):
+        async with self.async_serial.transaction() as port:
+            current = await self._ask_async(port, 'IOUT05?')
+            voltage = await self._ask_async(port, 'VOUT05?')
+        return -1 if current < 0.1 else voltage / current
 
     def enable_output(self):
         string = f'OUT05:1'
@@ -1,3 +1,4 @@
+import asyncio
 import random
 import threading
 import time
@@ -9,6 +10,7 @@ from src.Drivers.BaseClasses import AbstractController, AbstractSensor, Controll
 
 class TestSensor(AbstractSensor):
     """Mock Sensor to test engine to GUI connection"""
+    name = 'Test Sensor'
     type = UnitType.TEMPERATURE
 
     def __init__(self, *args, **kwargs):
@@ -21,12 +23,17 @@ class TestSensor(AbstractSensor):
             time.sleep(0.01)
             return time.time() % 60
 
+    async def get_sensor_value_async(self):
+        await asyncio.sleep(0.01)
+        return time.time() % 60
+
     def close(self):
         print('Test Sensor disconnected!')
 
 
 class ExtendedTestSensor(TestSensor):
     """ Mock Sensor to test engine to GUI connection Supports all optional sensor features"""
+    name = 'Extended Test Sensor'
     features = {SensorFeatures.TC_SELECT, SensorFeatures.AIMING_BEAM}
 
     def __init__(self, *args, **kwargs):
@@ -72,8 +79,9 @@ class TestController(AbstractController):
     PID is mocked; the process variable always approaches the target setpoint asymptotically
     """
 
+    name = 'Test Controller'
     type = UnitType.TEMPERATURE
-    features = {ControllerFeatures.MANUAL_POWER, ControllerFeatures.SIMPLE_PID}
+    features = {ControllerFeatures.MANUAL_POWER, ControllerFeatures.SIMPLE_PID, ControllerFeatures.STATUS_BLOCK}
 
     def __init__(self, *args, **kwargs):
         self.com_lock = threading.Lock()
@@ -184,8 +192,13 @@ class TestController(AbstractController):
     def get_working_output(self):
         return self.manual_power * (1 + 0.2 * random.random())
 
+    def get_status_block(self):
+        return {'Controller PV': self.get_process_variable(), 'Setpoint': self.get_working_setpoint(),
+                'Power': self.get_working_output()}
+
 
 class ExtendedTestController(TestController):
+    name = 'Extended Test Controller'
     features = {ControllerFeatures.MANUAL_POWER, ControllerFeatures.OUTPUT_ENABLE, ControllerFeatures.GAIN_SCHEDULING,
                 ControllerFeatures.TC_SELECT, ControllerFeatures.AIMING_BEAM}
 
@@ -330,6 +343,8 @@ class ExtendedTestController(TestController):
 
 
 class FaultyTestController(TestController):
+    name = 'Faulty Test Controller'
+
     def _faulty_reading(self, function):
         """ 5 % chance of simulated serial failure"""
         if random.random() < 0.05:
@@ -353,3 +368,6 @@ class FaultyTestController(TestController):
 
     def get_rate(self):
         return self._faulty_reading(super().get_rate())
+
+    def get_status_block(self):
+        return self._faulty_reading(super().get_status_block())
@@ -0,0 +1,136 @@
+"""
+Runs the engine without the GUI, for unattended logging and programmer runs.
+Devices, logging and setpoint programs are configured in an ini file, e.g.:
+
+    [Engine]
+    Units = Temperature
+    Stream directory = Logs
+    # Seconds to wait for a device to answer when connecting
+    Connect timeout = 10
+    # Optional, quit after this many seconds
+    Runtime = 43200
+    # Optional, write the latency and error statistics of all device calls to this file (.json or .csv) on exit
+    IO report = io_report.json
+
+    [Furnace Default]
+    Controller = Eurotherm3216
+    Controller port = COM3
+    Slave address = 1
+    Sensor = Pyrometer
+    Sensor port = COM4
+    External PV = no
+    Log = yes
+    # Segments separated by ';', each as rate (°C/min) / setpoint (°C) / hold (min)
+    Program = 5/300/30; 10/800/120
+
+Every [Furnace <id>] section sets up one furnace. The engine messages are printed to the console; stop with Ctrl+C.
+"""
+import argparse
+import configparser
+import signal
+import sys
+from datetime import datetime
+
+from PySide6.QtCore import QCoreApplication, QTimer
+
+from src.Drivers.BaseClasses import UnitType
+from src.Engine.Engine import HeaterControlEngine
+from src.Signals import engine_signals, gui_signals
+import src.appinfo
+
+
+def parse_program(text):
+    """Parse segments given as 'rate/setpoint/hold; ...' into the program format of the setpoint programmer"""
+    program = {}
+    for segment, entry in enumerate(part for part in text.split(';') if part.strip()):
+        rate, setpoint, hold = (float(value) for value in entry.split('/'))
+        program[segment] = {'Rate': rate, 'Setpoint': setpoint, 'Hold': hold}
+    return program
+
+
+def print_message(kind, text):
+    print(f'{datetime.now().strftime("%Y-%m-%dT%H:%M:%S")} {kind}: {text}', flush=True)
+
+
+def configure(engine, config):
+    settings = config['Engine'] if config.has_section('Engine') else {}
+    unit_type = {'temperature': UnitType.TEMPERATURE, 'voltage': UnitType.VOLTAGE}[
+        settings.get('Units', 'Temperature').lower()]
+    gui_signals.set_units.emit(unit_type)
+    engine.stream_directory = settings.get('Stream directory', engine.stream_directory)
+    engine.connect_timeout = float(settings.get('Connect timeout', engine.connect_timeout))
+
+    for section in config.sections():
+        if not section.startswith('Furnace '):
+            continue
+        furnace_id = section.removeprefix('Furnace ').strip()
+        furnace = config[section]
+        if 'Controller' in furnace:
+            gui_signals.connect_device.emit(furnace_id, 'Controller', furnace['Controller'],
+                                            furnace['Controller port'], furnace.getint('Slave address', 1))
+        if 'Sensor' in furnace:
+            gui_signals.connect_device.emit(furnace_id, 'Sensor', furnace['Sensor'], furnace['Sensor port'], 0)
+        if furnace.getboolean('External PV', False):
+            gui_signals.furnace_command.emit(furnace_id, 'set_external_pv_mode', (True,))
+        if furnace.getboolean('Log', True):
+            gui_signals.furnace_command.emit(furnace_id, 'start_logging', ())
+        if program := furnace.get('Program'):
+            gui_signals.furnace_command.emit(furnace_id, 'start_programmer', (parse_program(program),))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f'{src.appinfo.APP_NAME} without GUI')
+    parser.add_argument('config', help='ini file with the devices, logging and programs to run')
+    parser.add_argument('--test_mode', action='store_true')
+    parser.add_argument('--async_io', action='store_true')
+    args = parser.parse_args()
+
+    config = configparser.ConfigParser()
+    if not config.read(args.config):
+        sys.exit(f'Could not read configuration file {args.config}')
+
+    app = QCoreApplication()
+    app.setApplicationName(f'{src.appinfo.APP_NAME}')
+
+    engine_signals.message.connect(lambda text: print_message('Message', text))
+    engine_signals.error.connect(lambda text: print_message('Error', text))
+    engine_signals.com_failed.connect(lambda text: print_message('Communication error', text))
+    engine_signals.non_imp.connect(lambda text: print_message('Not implemented', text))
+    engine_signals.connection_failed.connect(lambda e: print_message('Connection failed', e))
+    # A device that could not be connected fails the run, so supervisors and cron jobs see it in the exit status
+    connection_failures = []
+    engine_signals.connection_failed.connect(connection_failures.append)
+    engine_signals.connection_progress.connect(
+        lambda furnace_id, role, text: print_message(furnace_id, f'{role}: {text}'))
+    engine_signals.device_connected.connect(
+        lambda furnace_id, role, device_type, port, _: print_message(furnace_id, f'{device_type} connected on {port}'))
+    engine_signals.ports_changed.connect(
+        lambda added, removed: [print_message('Port', f'{port} added') for port in added] +
+        [print_message('Port', f'{port} removed') for port in removed])
+    engine_signals.program_segment_started.connect(
+        lambda furnace_id, kind, segment: print_message(furnace_id, f'{kind} of segment {segment} started'))
+
+    engine = HeaterControlEngine(args.test_mode, args.async_io)
+    app.aboutToQuit.connect(engine.shutdown)
+    if config.has_section('Engine') and (io_report := config['Engine'].get('IO report')):
+        app.aboutToQuit.connect(lambda: engine.export_io_statistics(io_report))
+    configure(engine, config)
+
+    # Qt blocks the Python signal handlers while it waits for events, the timer lets them run regularly
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+    interrupt_timer = QTimer()
+    interrupt_timer.timeout.connect(lambda: None)
+    interrupt_timer.start(200)
+
+    if config.has_section('Engine') and (runtime := config['Engine'].getfloat('Runtime')):
+        QTimer.singleShot(int(runtime * 1000), app.quit)
+
+    status = app.exec()
+    return status or int(bool(connection_failures))
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except Exception as e:
+        sys.exit(f'Error: {e}')
@@ -1,4 +1,9 @@
+import time
+
+startup_begin = time.perf_counter()
+
 import argparse
+from PySide6.QtCore import QTimer
 from PySide6.QtGui import QIcon
 from PySide6.QtWidgets import QApplication
 
@@ -7,19 +12,35 @@ from src.Engine.Engine import HeaterControlEngine
 import src.appinfo
 
 
+def report_startup(phases):
+    """Print how long each phase of the startup took, the phases are (name, perf_counter time at its end)"""
+    previous = startup_begin
+    parts = []
+    for name, end in phases:
+        parts.append(f'{name} {end - previous:.2f} s')
+        previous = end
+    print(f'Started in {previous - startup_begin:.2f} s ({", ".join(parts)})')
+
+
 def main():
+    phases = [('imports', time.perf_counter())]
     parser = argparse.ArgumentParser()
     parser.add_argument("--test_mode", action="store_true")
+    parser.add_argument("--async_io", action="store_true")
     args = parser.parse_args()
 
     app = QApplication()
     app.setApplicationName(f"{src.appinfo.APP_NAME}")
     app.setApplicationDisplayName(f"{src.appinfo.APP_NAME}")
     app.setWindowIcon(QIcon('Icons/Logo.ico'))
-    engine = HeaterControlEngine(args.test_mode)
+    engine = HeaterControlEngine(args.test_mode, args.async_io)
+    phases.append(('engine', time.perf_counter()))
     gui = ElchMainWindow()
+    phases.append(('window', time.perf_counter()))
     app.aboutToQuit.connect(engine.shutdown)
     gui.show()
+    # Runs once the event loop has drawn the window for the first time
+    QTimer.singleShot(0, lambda: report_startup(phases + [('first paint', time.perf_counter())]))
     app.exec()
 
 
@@ -0,0 +1,51 @@
+import asyncio
+import threading
+
+from PySide6.QtCore import QThread
+
+from src.Engine.Threads import keep_until_finished
+
+
+class AsyncLoop(QThread):
+    """
+    Thread running the asyncio event loop that executes the asynchronous device requests of all devices.
+    Coroutines are handed over with submit from any thread, results reach the Qt side through the signals of the
+    caller, which are queued to the thread of the receiver as usual.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.setObjectName('Async I/O loop')
+        self.loop = asyncio.new_event_loop()
+        self.started_event = threading.Event()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self.started_event.set)
+        self.loop.run_forever()
+        # Cancel what is still outstanding so no coroutine is left half-way through a transaction
+        pending = asyncio.all_tasks(self.loop)
+        for task in pending:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        self.loop.close()
+
+    def start(self, *args, **kwargs):
+        super().start(*args, **kwargs)
+        self.started_event.wait()
+
+    def stop(self, timeout=2000):
+        """End the loop, return False if it did not end within the timeout"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        if not self.wait(timeout):
+            keep_until_finished(self)
+            return False
+        return True
+
+    def submit(self, coroutine, timeout=None):
+        """
+        Schedule a coroutine on the loop, return a concurrent.futures.Future for its result.
+        With a timeout (in seconds) the request is cancelled and the future raises TimeoutError when it takes longer.
+        Cancelling the future cancels the request.
+        """
+        return asyncio.run_coroutine_threadsafe(asyncio.wait_for(coroutine, timeout), self.loop)
@@ -0,0 +1,32 @@
+from PySide6.QtCore import QObject, QThread, Signal
+
+
+class ConnectorSignals(QObject):
+    connected = Signal(object)
+    failed = Signal(object)
+
+
+class DeviceConnector(QThread):
+    """
+    Thread that imports and constructs a driver, so the wait for the port to open and the device to answer does not
+    block the engine. A driver constructor cannot be interrupted: when the furnace gives up on a connection, the thread
+    still runs until the constructor returns and the device it created is closed again by the furnace.
+    """
+
+    def __init__(self, role, device_type, port, create, reconnect=False):
+        super().__init__()
+        self.setObjectName(f'{device_type} connector')
+        self.role = role
+        self.device_type = device_type
+        self.port = port
+        self.create = create
+        self.reconnect = reconnect
+        self.signals = ConnectorSignals()
+
+    def run(self):
+        try:
+            device = self.create()
+        except Exception as e:
+            self.signals.failed.emit(e)
+        else:
+            self.signals.connected.emit(device)
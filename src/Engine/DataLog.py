@@ -0,0 +1,118 @@
+import math
+
+import numpy as np
+
+
+class TimeSeries:
+    """
+    Compact store for one logged channel: unix timestamps as float64 and values as float32.
+    Samples are written into preallocated chunks of fixed size, a new chunk is only allocated when the last one is
+    full, so appending never copies existing data. With a retention window (in seconds), chunks that only hold samples
+    older than the window are released when a new chunk is started.
+    """
+    chunk_size = 8192
+
+    def __init__(self, retention=None):
+        self.retention = retention
+        self.chunks: list[tuple[np.ndarray, np.ndarray]] = []
+        self.fill = self.chunk_size
+
+    def __len__(self):
+        return (len(self.chunks) - 1) * self.chunk_size + self.fill if self.chunks else 0
+
+    def append(self, timestamp, value):
+        if self.fill == self.chunk_size:
+            if self.retention is not None:
+                self._expire(timestamp)
+            self.chunks.append((np.empty(self.chunk_size, dtype=np.float64),
+                                np.empty(self.chunk_size, dtype=np.float32)))
+            self.fill = 0
+        timestamps, values = self.chunks[-1]
+        timestamps[self.fill] = timestamp
+        try:
+            values[self.fill] = value
+        except (TypeError, ValueError):
+            values[self.fill] = math.nan
+        self.fill += 1
+
+    def _expire(self, now):
+        while self.chunks and self.chunks[0][0][-1] < now - self.retention:
+            self.chunks.pop(0)
+
+    def arrays(self):
+        """Return copies of all retained timestamps and values as two contiguous arrays"""
+        if not self.chunks:
+            return np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float32)
+        timestamps = np.concatenate([chunk[0] for chunk in self.chunks[:-1]] + [self.chunks[-1][0][:self.fill]])
+        values = np.concatenate([chunk[1] for chunk in self.chunks[:-1]] + [self.chunks[-1][1][:self.fill]])
+        if self.retention is not None:
+            keep = timestamps >= timestamps[-1] - self.retention
+            timestamps, values = timestamps[keep], values[keep]
+        return timestamps, values
+
+    def clear(self):
+        self.chunks = []
+        self.fill = self.chunk_size
+
+
+class DataLog:
+    """Time series store for all logged channels"""
+
+    def __init__(self, channels, retention=None):
+        self.series = {channel: TimeSeries(retention) for channel in channels}
+
+    def __getitem__(self, channel):
+        return self.series[channel]
+
+    def __contains__(self, channel):
+        return channel in self.series
+
+    def items(self):
+        return self.series.items()
+
+    def append(self, channel, timestamp, value):
+        self.series[channel].append(timestamp, value)
+
+    def clear(self):
+        for series in self.series.values():
+            series.clear()
+
+    def align(self, channels, bin_width=1.0, fill='none'):
+        """
+        Align the given channels on a common time base of bins of bin_width seconds.
+        Returns the bin start times and one array per channel holding the last value sampled within each bin. Only
+        bins that contain at least one sample of any channel are returned. Bins without a sample of a channel are NaN
+        with fill 'none', hold the previous value of that channel with fill 'last', or the value of the sample closest
+        to the bin centre with fill 'nearest'.
+        """
+        if fill not in ('none', 'last', 'nearest'):
+            raise ValueError(f'Unknown fill policy {fill}!')
+
+        samples = {}
+        for channel in channels:
+            timestamps, values = self.series[channel].arrays()
+            order = np.argsort(timestamps, kind='stable')
+            timestamps, values = timestamps[order], values[order]
+            samples[channel] = (timestamps, values, np.floor(timestamps / bin_width).astype(np.int64))
+        bins = np.unique(np.concatenate([sample[2] for sample in samples.values()]))
+
+        aligned = {}
+        for channel, (timestamps, values, sample_bins) in samples.items():
+            column = np.full(len(bins), np.nan)
+            if len(timestamps):
+                # Only the last sample of each bin is kept
+                last = np.append(sample_bins[1:] != sample_bins[:-1], True)
+                column[np.searchsorted(bins, sample_bins[last])] = values[last]
+
+                if fill == 'last':
+                    index = np.maximum.accumulate(np.where(np.isnan(column), 0, np.arange(len(column))))
+                    column = column[index]
+                elif fill == 'nearest' and (missing := np.isnan(column)).any():
+                    centres = (bins[missing] + 0.5) * bin_width
+                    right = np.clip(np.searchsorted(timestamps, centres), 0, len(timestamps) - 1)
+                    left = np.clip(right - 1, 0, len(timestamps) - 1)
+                    closer_left = np.abs(centres - timestamps[left]) < np.abs(timestamps[right] - centres)
+                    column[missing] = values[np.where(closer_left, left, right)]
+            aligned[channel] = column
+
+        return bins * bin_width, aligned
@@ -0,0 +1,248 @@
+import ast
+import importlib
+import importlib.metadata
+import json
+import os
+import time
+
+from src.Drivers import BaseClasses
+from src.Drivers.BaseClasses import AbstractController, AbstractSensor, ControllerFeatures, SensorFeatures, UnitType
+
+DRIVER_PACKAGE = 'src.Drivers'
+DRIVER_DIRECTORY = os.path.dirname(BaseClasses.__file__)
+# Metadata of all drivers, rebuilt for modules that changed since. The frozen build ships it instead of the sources.
+CACHE_FILE = os.path.join(DRIVER_DIRECTORY, 'drivers.json')
+# Packages can add drivers by declaring entry points in this group, e.g.
+#   [project.entry-points."heatercontrol.drivers"]
+#   my_furnace = "my_package.drivers:MyFurnaceController"
+ENTRY_POINT_GROUP = 'heatercontrol.drivers'
+# Mock and simulated devices, only registered in test mode
+TEST_MODULES = ('TestDevices', 'Simulation')
+
+
+class DriverEntry:
+    """
+    Where to find a driver class, and the metadata the engine needs before the driver is used.
+    The driver module is only imported when the driver is loaded, usually on connect, so the drivers (and the
+    libraries they depend on) that are not used in a session are never imported.
+    """
+
+    def __init__(self, module, class_name, type: UnitType, features=frozenset()):
+        self.module = module
+        self.class_name = class_name
+        self.type = type
+        self.features = features
+        self.driver = None
+        self.load_time = None
+
+    def load(self):
+        """Import the driver module if necessary and return the driver class"""
+        if self.driver is None:
+            start = time.perf_counter()
+            self.driver = getattr(importlib.import_module(self.module), self.class_name)
+            self.load_time = time.perf_counter() - start
+        return self.driver
+
+
+def load_times(*registries):
+    """Import time in seconds of every driver loaded so far"""
+    return {name: entry.load_time for registry in registries for name, entry in registry.items()
+            if entry.load_time is not None}
+
+
+def _class_attributes(node: ast.ClassDef):
+    """The name, type and features assigned in the body of a class, as source expressions"""
+    attributes = {}
+    for statement in node.body:
+        if isinstance(statement, ast.Assign) and len(statement.targets) == 1 and \
+                isinstance(target := statement.targets[0], ast.Name) and target.id in ('name', 'type', 'features'):
+            attributes[target.id] = statement.value
+    return attributes
+
+
+def scan_module(path):
+    """
+    Collect the classes of a driver module without importing it: base class names, and name, type and features
+    as far as they are given as literals, enum members, or (for features) unions of sets and parent features
+    """
+    with open(path, encoding='utf-8') as file:
+        tree = ast.parse(file.read(), filename=path)
+    classes = {}
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        attributes = _class_attributes(node)
+        info = {'bases': [base.id if isinstance(base, ast.Name) else ast.unparse(base) for base in node.bases]}
+        if isinstance(name := attributes.get('name'), ast.Constant) and isinstance(name.value, str):
+            info['name'] = name.value
+        if isinstance(unit := attributes.get('type'), ast.Attribute):
+            info['type'] = unit.attr
+        elif isinstance(unit, ast.Constant) and unit.value is None:
+            info['type'] = None
+        if 'features' in attributes:
+            info['features'] = _features(attributes['features'])
+        classes[node.name] = info
+    return classes
+
+
+def _features(node):
+    """Features as a list of member names, with {'inherit': class name} for features taken over from a class"""
+    match node:
+        case ast.Set(elts=elements) | ast.List(elts=elements) | ast.Tuple(elts=elements):
+            return [element.attr for element in elements if isinstance(element, ast.Attribute)]
+        case ast.Call(func=ast.Name(id='set' | 'frozenset'), args=[]):
+            return []
+        case ast.BinOp(left=left, op=ast.BitOr(), right=right):
+            return _features(left) + _features(right)
+        case ast.Attribute(value=ast.Name(id=parent), attr='features'):
+            return [{'inherit': parent}]
+    return []
+
+
+def _resolve(class_name, classes, key, default):
+    """Look up an attribute of a class, following its base classes"""
+    info = classes.get(class_name)
+    if info is None:
+        return default
+    if key in info:
+        value = info[key]
+        if key == 'features':
+            resolved = []
+            for feature in value:
+                resolved += _resolve(feature['inherit'], classes, key, []) if isinstance(feature, dict) else [feature]
+            return resolved
+        return value
+    for base in info['bases']:
+        if (value := _resolve(base, classes, key, None)) is not None:
+            return value
+    return default
+
+
+def _role(class_name, classes):
+    if class_name == 'AbstractController':
+        return 'Controller'
+    if class_name == 'AbstractSensor':
+        return 'Sensor'
+    for base in classes.get(class_name, {}).get('bases', []):
+        if role := _role(base, classes):
+            return role
+    return None
+
+
+def _read_cache(cache_file):
+    try:
+        with open(cache_file, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {'modules': {}, 'entry points': {}}
+
+
+def _write_cache(cache_file, cache):
+    try:
+        with open(cache_file, 'w', encoding='utf-8') as file:
+            json.dump(cache, file, indent=1)
+    except OSError:
+        # A read-only installation simply scans again on the next start
+        pass
+
+
+def _scan_directory(directory, cache, errors):
+    """
+    Scan all driver modules that changed since they were cached, return the classes of all modules. Modules that
+    cannot be parsed are left out of the cache, so they are scanned again once fixed, and added to errors.
+    """
+    if not os.path.isdir(directory) or not any(filename.endswith('.py') for filename in os.listdir(directory)):
+        # Frozen build without sources: rely on the metadata shipped with it
+        return {module: entry['classes'] for module, entry in cache['modules'].items()}, False
+
+    modules = {}
+    changed = False
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.py') or filename.startswith('_'):
+            continue
+        module = filename.removesuffix('.py')
+        stat = os.stat(path := os.path.join(directory, filename))
+        cached = cache['modules'].get(module)
+        if not cached or cached['mtime'] != stat.st_mtime or cached['size'] != stat.st_size:
+            try:
+                cached = {'mtime': stat.st_mtime, 'size': stat.st_size, 'classes': scan_module(path)}
+            except (SyntaxError, UnicodeDecodeError, OSError) as e:
+                errors[module] = e
+                continue
+            cache['modules'][module] = cached
+            changed = True
+        modules[module] = cached['classes']
+    if set(cache['modules']) - set(modules):
+        cache['modules'] = {module: cache['modules'][module] for module in modules}
+        changed = True
+    return modules, changed
+
+
+def _entry_point_drivers(cache, errors):
+    """Drivers of installed packages. Their metadata is cached per package version, so they are imported only once."""
+    drivers = []
+    changed = False
+    seen = set()
+    for entry_point in importlib.metadata.entry_points(group=ENTRY_POINT_GROUP):
+        version = entry_point.dist.version if entry_point.dist else ''
+        key = f'{entry_point.value}@{version}'
+        seen.add(key)
+        if (info := cache['entry points'].get(key)) is None:
+            try:
+                driver = entry_point.load()
+            except Exception as e:
+                errors[entry_point.value] = e
+                continue
+            role = 'Controller' if issubclass(driver, AbstractController) else \
+                'Sensor' if issubclass(driver, AbstractSensor) else None
+            if role is None:
+                continue
+            info = {'name': getattr(driver, 'name', entry_point.name), 'role': role,
+                    'type': driver.type.name if getattr(driver, 'type', None) else None,
+                    'features': [feature.name for feature in driver.features]}
+            cache['entry points'][key] = info
+            changed = True
+        module, _, class_name = entry_point.value.partition(':')
+        drivers.append((info['role'], info['name'], module, class_name, info['type'], info['features']))
+    if set(cache['entry points']) - seen:
+        cache['entry points'] = {key: info for key, info in cache['entry points'].items() if key in seen}
+        changed = True
+    return drivers, changed
+
+
+def discover_drivers(test_mode=False, directory=DRIVER_DIRECTORY, cache_file=CACHE_FILE, errors=None):
+    """
+    Build the controller and sensor registries from the driver modules in the driver directory and from the entry
+    points of installed packages, without importing any driver whose metadata is cached.
+    A driver class is registered under its name attribute, which it has to define itself (so subclasses do not
+    appear twice). The drivers of the test device and simulation modules are only registered in test mode.
+    Modules and entry points whose drivers could not be registered are added to errors (name -> exception).
+    """
+    errors = {} if errors is None else errors
+    cache = _read_cache(cache_file)
+    cache.setdefault('modules', {})
+    cache.setdefault('entry points', {})
+    modules, changed = _scan_directory(directory, cache, errors)
+
+    classes = {name: info for module_classes in modules.values() for name, info in module_classes.items()}
+    drivers = []
+    for module, module_classes in modules.items():
+        if module in TEST_MODULES and not test_mode:
+            continue
+        for class_name, info in module_classes.items():
+            if 'name' not in info or not (role := _role(class_name, classes)):
+                continue
+            drivers.append((role, info['name'], f'{DRIVER_PACKAGE}.{module}', class_name,
+                            _resolve(class_name, classes, 'type', None), _resolve(class_name, classes, 'features', [])))
+
+    plugins, plugins_changed = _entry_point_drivers(cache, errors)
+    if changed or plugins_changed:
+        _write_cache(cache_file, cache)
+
+    registries = {'Controller': {}, 'Sensor': {}}
+    feature_types = {'Controller': ControllerFeatures, 'Sensor': SensorFeatures}
+    for role, name, module, class_name, unit, features in drivers + plugins:
+        registries[role][name] = DriverEntry(module, class_name, UnitType[unit] if unit else None,
+                                             frozenset(feature_types[role][feature] for feature in features
+                                                       if feature in feature_types[role].__members__))
+    return registries['Controller'], registries['Sensor']
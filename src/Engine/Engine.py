@@ -1,98 +1,155 @@
-import math
-from datetime import datetime, timezone
-from typing import Type
+import functools
+import time
 
-import serial.tools.list_ports
-from minimalmodbus import NoResponseError
 from PySide6.QtCore import QObject, QThreadPool, QTimer
-from serial import SerialException
-
-from src.Drivers.BaseClasses import AbstractController, AbstractSensor, ControllerFeatures, SensorFeatures, UnitType
-from src.Drivers.ElchWorks import ElchiTherm, ElchLaser, Thermolino, Thermoplatino
-from src.Drivers.Eurotherms import Eurotherm2408, Eurotherm3216, Eurotherm3508, Eurotherm3508S
-from src.Drivers.Jumo import JumoQuantrol
-from src.Drivers.Keithly import Keithley2000Temp, Keithley2000Volt
-from src.Drivers.MicroEpsilon import ME_CTL
-from src.Drivers.Omega import OmegaPt
-from src.Drivers.Pyrometer import Pyrometer
-from src.Drivers.ResistiveHeater import ResistiveHeaterHCS, ResistiveHeaterTenma
-from src.Drivers.TestDevices import ExtendedTestController, ExtendedTestSensor, FaultyTestController, TestController, \
-    TestSensor
-from src.Engine.SetProg import SetpointProgrammer
+
+from src.Drivers.BaseClasses import ControllerFeatures, SensorFeatures, UnitType
+from src.Engine.AsyncLoop import AsyncLoop
+from src.Engine.DriverRegistry import discover_drivers
+from src.Engine.Furnace import Furnace
+from src.Engine.IOStats import io_statistics
+from src.Engine.PortScanner import PortScanner
 from src.Engine.Worker import Worker
 from src.Signals import engine_signals, gui_signals
 
 
 class HeaterControlEngine(QObject):
-    sensor: AbstractSensor | None = None
-    controller: AbstractController | None = None
-    programmer: SetpointProgrammer | None = None
+    """
+    Manages any number of furnaces, each with its own controller, sensor, polling, log and programmer.
+    The GUI operates the default furnace through the unkeyed gui and engine signals, further furnaces are created on
+    demand and driven with connect_device, disconnect_device and furnace_command.
+    """
 
-    def __init__(self, test_mode=False):
+    def __init__(self, test_mode=False, async_io=False):
         super().__init__()
         self.test_mode = test_mode
-        self.available_ports = {port[0]: port[1] for port in serial.tools.list_ports.comports()}
-        self.controller_types: dict[str, Type[AbstractController]] = {'Eurotherm2408':           Eurotherm2408,
-                                                                      'Eurotherm3216':           Eurotherm3216,
-                                                                      'Eurotherm3508':           Eurotherm3508,
-                                                                      'Omega Pt':                OmegaPt,
-                                                                      'Jumo Quantrol':           JumoQuantrol,
-                                                                      'Elchi Laser Control':     ElchLaser,
-                                                                      'Elchi Heater Controller': ElchiTherm,
-                                                                      'Resistive Heater Tenma':  ResistiveHeaterTenma,
-                                                                      'Resistive Heater HCS':    ResistiveHeaterHCS}
-        self.sensor_types: dict[str, Type[AbstractSensor]] = {'Pyrometer':                Pyrometer,
-                                                              'Micro Epsilon CTL':        ME_CTL,
-                                                              'Thermolino':               Thermolino,
-                                                              'Thermoplatino':            Thermoplatino,
-                                                              'Keithley2000 Temperature': Keithley2000Temp,
-                                                              'Keithley2000 Voltage':     Keithley2000Volt,
-                                                              'Eurotherm3508':            Eurotherm3508S, }
+        # Ports are enumerated in the background, available_ports holds the last result
+        self.available_ports = {}
+        # Drivers are discovered from their sources (or cached metadata) and only imported when a device is connected
+        driver_errors = {}
+        self.controller_types, self.sensor_types = discover_drivers(test_mode, errors=driver_errors)
+        # Reported once the event loop runs, so the GUI that is created after the engine gets the messages as well
+        for module, error in driver_errors.items():
+            QTimer.singleShot(0, functools.partial(engine_signals.error.emit,
+                                                   f'Drivers of {module} not available: {error}'))
 
         if test_mode:
-            self.sensor_types['Test Sensor'] = TestSensor
-            self.sensor_types['Extended Test Sensor']: ExtendedTestSensor
-            self.controller_types['Test Controller'] = TestController
-            self.controller_types['Extended Test Controller'] = ExtendedTestController
-            self.controller_types['Faulty Test Controller'] = FaultyTestController
             self.available_ports['COM Test'] = 'Test Port'
+        self.port_scanner = PortScanner()
+        self.port_scanner.signals.changed.connect(self.update_available_ports)
+        self.port_scanner.signals.error.connect(engine_signals.error.emit)
+        self.port_scanner.start()
 
         self.controller_slave_address = 1
-
-        self.is_logging = False
-        self.log_start_time = None
-        self.data = {'Sensor PV': [], 'Controller PV': [], 'Setpoint': [], 'Power': []}
+        # Seconds to wait for a device to answer when connecting
+        self.connect_timeout = 10.0
+        # Close and reopen devices that stopped answering, see LinkSupervisor for the thresholds
+        self.auto_reconnect = True
+
+        # Retention window of the in-memory logs in seconds, None keeps all samples
+        self.log_retention = None
+        # Logged samples are also streamed to a file in this directory as they arrive
+        self.stream_directory = 'Logs'
+        # Time base of exported logs in seconds and how bins without a sample are filled ('none', 'last', 'nearest')
+        self.export_bin_width = 1.0
+        self.export_fill = 'none'
 
         self.unit_type = UnitType.TEMPERATURE
         self.units = {UnitType.TEMPERATURE: '°C', UnitType.VOLTAGE: 'mV'}
 
+        # Polling period in ms and priority (lower values are served first) of every periodically read quantity,
+        # each furnace starts out with a copy of this schedule
+        self.polling_schedule = {'Sensor PV':     {'Period': 250, 'Priority': 0},
+                                 'External PV':   {'Period': 1000, 'Priority': 0},
+                                 'Controller PV': {'Period': 500, 'Priority': 1},
+                                 'Power':         {'Period': 1000, 'Priority': 2},
+                                 'Setpoint':      {'Period': 2000, 'Priority': 3},
+                                 'TC Fault':      {'Period': 5000, 'Priority': 4}}
+
+        self.pool = QThreadPool()
+        self.workers = []
+        self.queue_depths = {}
+
+        # Optionally, devices whose drivers offer coroutines are polled on one shared asyncio loop instead of a thread
+        # per device, every request is cancelled after async_timeout seconds
+        self.async_timeout = 2.0
+        self.async_loop: AsyncLoop | None = None
+        if async_io:
+            self.async_loop = AsyncLoop()
+            self.async_loop.start()
+
+        self.default_furnace_id = 'Default'
+        self.furnaces: dict[str, Furnace] = {}
+        self.get_furnace(self.default_furnace_id)
+
         gui_signals.shutdown.connect(self.shutdown)
         gui_signals.set_units.connect(self.set_units)
         gui_signals.request_ports.connect(self.refresh_available_ports)
         gui_signals.connect_controller.connect(self.add_controller)
         gui_signals.connect_sensor.connect(self.add_sensor)
-        gui_signals.set_external_pv_mode.connect(self.set_external_pv_mode)
-
-        gui_signals.export_log.connect(self.export_log)
-        gui_signals.start_log.connect(self.start_logging)
-        gui_signals.clear_log.connect(self.clear_log)
-
+        gui_signals.disconnect_controller.connect(self.remove_controller)
+        gui_signals.disconnect_sensor.connect(self.remove_sensor)
+        gui_signals.set_external_pv_mode.connect(lambda mode: self.default_furnace.set_external_pv_mode(mode))
+        gui_signals.emergency_shutdown.connect(self.emergency_shutdown)
+
+        gui_signals.export_log.connect(lambda filepath: self.default_furnace.export_log(filepath))
+        gui_signals.start_log.connect(lambda: self.default_furnace.start_logging())
+        gui_signals.clear_log.connect(lambda: self.default_furnace.clear_log())
+        gui_signals.set_export_options.connect(self.set_export_options)
+        gui_signals.set_polling_period.connect(lambda key, period: self.default_furnace.set_polling_period(key, period))
+
+        gui_signals.export_io_statistics.connect(self.export_io_statistics)
+        gui_signals.reset_io_statistics.connect(io_statistics.reset)
+
+        gui_signals.connect_device.connect(self.connect_device)
+        gui_signals.disconnect_device.connect(self.disconnect_device)
+        gui_signals.furnace_command.connect(self.run_furnace_command)
+
+        engine_signals.device_connected.connect(self.forward_device_connected)
+        engine_signals.device_disconnected.connect(self.forward_device_disconnected)
+        engine_signals.device_status_update.connect(self.forward_status_update)
+        engine_signals.device_parameters_update.connect(self.forward_parameters_update)
+        engine_signals.program_segment_started.connect(self.forward_program_segment)
+
+        # The refresh timer only checks which reads are due, the actual polling rates are set by the schedules
         self.refresh_timer = QTimer()
-        self.refresh_timer.setInterval(1000)
+        self.refresh_timer.setInterval(50)
         self.refresh_timer.setSingleShot(False)
         self.refresh_timer.timeout.connect(self.refresh_status)
         self.refresh_timer.start()
 
-        self.start_ext_timer = QTimer()
-        self.external_pv_timer = QTimer()
-        self.external_pv_timer.setInterval(1000)
-        self.external_pv_timer.setSingleShot(False)
-        self.external_pv_timer.timeout.connect(self.transfer_external_pv)
+        # The I/O statistics are reported every five seconds, as long as there were new calls
+        self.io_calls_reported = 0
+        self.io_report_timer = QTimer()
+        self.io_report_timer.setInterval(5000)
+        self.io_report_timer.timeout.connect(self.report_io_statistics)
+        self.io_report_timer.start()
 
-        self.programmer = None
+    @property
+    def default_furnace(self):
+        return self.furnaces[self.default_furnace_id]
 
-        self.pool = QThreadPool()
-        self.workers = []
+    @property
+    def controller(self):
+        return self.default_furnace.controller
+
+    @property
+    def sensor(self):
+        return self.default_furnace.sensor
+
+    @property
+    def programmer(self):
+        return self.default_furnace.programmer
+
+    @property
+    def data(self):
+        return self.default_furnace.data
+
+    def get_furnace(self, furnace_id):
+        """Return the furnace with the given id, creating it on first use"""
+        if furnace_id not in self.furnaces:
+            self.furnaces[furnace_id] = Furnace(self, furnace_id)
+        return self.furnaces[furnace_id]
 
     def set_units(self, unit_type):
         self.unit_type = unit_type
@@ -101,12 +158,13 @@ class HeaterControlEngine(QObject):
     def shutdown(self):
         engine_signals.message.emit('Shutting down!')
         self.refresh_timer.stop()
-        self.external_pv_timer.stop()
+        self.io_report_timer.stop()
+        self.port_scanner.stop()
         self.pool.waitForDone(2000)
-        if self.sensor:
-            self.remove_sensor()
-        if self.controller:
-            self.remove_controller()
+        for furnace in self.furnaces.values():
+            furnace.shutdown()
+        if self.async_loop:
+            self.async_loop.stop()
 
     def report_devices(self):
         utype = self.unit_type
@@ -115,153 +173,175 @@ class HeaterControlEngine(QObject):
         engine_signals.available_devices.emit(devices)
 
     def refresh_available_ports(self):
-        self.available_ports = {port[0]: port[1] for port in serial.tools.list_ports.comports()}
+        """Answer with the cached ports right away, a background scan reports any change afterwards"""
+        engine_signals.available_ports.emit(self.available_ports)
+        self.port_scanner.rescan()
+
+    def update_available_ports(self, ports, added, removed):
+        self.available_ports = dict(ports)
         if self.test_mode:
             self.available_ports['COM Test'] = 'Test Port'
+        engine_signals.ports_changed.emit(added, removed)
         engine_signals.available_ports.emit(self.available_ports)
 
-    def add_sensor(self, sensor_type, sensor_port):
-        try:
-            self.sensor = self.sensor_types[sensor_type](_port=sensor_port)
-        except SerialException as e:
-            engine_signals.connection_failed.emit(e)
+    def connect_device(self, furnace_id, role, device_type, port, slave_address):
+        furnace = self.get_furnace(furnace_id)
+        if role == 'Controller':
+            furnace.add_controller(device_type, port, slave_address)
+        elif role == 'Sensor':
+            furnace.add_sensor(device_type, port)
         else:
-            engine_signals.sensor_connected.emit(sensor_type, sensor_port, self.sensor_types[sensor_type].features)
-            gui_signals.disconnect_sensor.connect(self.remove_sensor)
-            gui_signals.connect_sensor.disconnect()
-            if SensorFeatures.AIMING_BEAM in self.sensor_types[sensor_type].features:
-                gui_signals.switch_sensor_aiming_beam.connect(self.switch_sensor_aiming_beam)
-            if SensorFeatures.TC_SELECT in self.sensor_types[sensor_type].features:
-                gui_signals.set_sensor_tc.connect(self.set_sensor_tc)
-                self.get_sensor_tc()
-            self.get_sensor_status()
+            engine_signals.error.emit(f'Unknown device role {role}!')
 
-    def remove_sensor(self):
-        gui_signals.disconnect_sensor.disconnect(self.remove_sensor)
-        gui_signals.connect_sensor.connect(self.add_sensor)
-        if SensorFeatures.AIMING_BEAM in self.sensor.features:
-            gui_signals.switch_sensor_aiming_beam.disconnect(self.switch_sensor_aiming_beam)
-        if SensorFeatures.TC_SELECT in self.sensor.features:
-            gui_signals.set_sensor_tc.disconnect(self.set_sensor_tc)
-        try:
-            self.sensor.close()
-        except SerialException as e:
-            engine_signals.connection_failed.emit(f'Error when closing sensor: {e}')
+    def disconnect_device(self, furnace_id, role):
+        if not (furnace := self.furnaces.get(furnace_id)):
+            engine_signals.error.emit(f'Unknown furnace {furnace_id}!')
+            return
+        furnace.remove_controller() if role == 'Controller' else furnace.remove_sensor()
+
+    def run_furnace_command(self, furnace_id, command, args):
+        if not (furnace := self.furnaces.get(furnace_id)):
+            engine_signals.error.emit(f'Unknown furnace {furnace_id}!')
+        elif command not in Furnace.commands:
+            engine_signals.error.emit(f'Unknown furnace command {command}!')
+        elif command not in ('start_logging', 'clear_log', 'export_log', 'set_polling_period', 'stop_programmer',
+                             'skip_program_segment') and not (furnace.controller or furnace.sensor):
+            engine_signals.error.emit(f'{furnace_id}: No device connected!')
         else:
-            engine_signals.sensor_disconnected.emit()
-        finally:
-            self.sensor = None
+            getattr(furnace, command)(*(args or ()))
 
-    def add_controller(self, controller_type, controller_port):
-        try:
-            self.controller = self.controller_types[controller_type](_port_name=controller_port,
-                                                                     _slave_address=self.controller_slave_address)
-        except (SerialException, NoResponseError) as e:
-            engine_signals.connection_failed.emit(e)
-        else:
-            engine_signals.controller_connected.emit(controller_type, controller_port,
-                                                     self.controller_types[controller_type].features)
-
-            gui_signals.disconnect_controller.connect(self.remove_controller)
-            gui_signals.connect_controller.disconnect()
-            # Mandatory signals all controllers must support
-            gui_signals.emergency_shutdown.connect(self.emergency_shutdown)
-            gui_signals.set_target_setpoint.connect(self.set_target_setpoint)
-            gui_signals.set_rate.connect(self.set_rate)
-            gui_signals.set_control_mode.connect(self.set_control_mode)
-            gui_signals.refresh_parameters.connect(self.get_controller_parameters)
-            gui_signals.start_program.connect(self.start_programmer)
-            # Optional functionality
-
-            if ControllerFeatures.OUTPUT_ENABLE in self.controller_types[controller_type].features:
-                gui_signals.enable_output.connect(self.toggle_output_enable)
-            if ControllerFeatures.EXTERNAL_PV in self.controller_types[controller_type].features:
-                gui_signals.set_external_pv_mode.connect(self.set_external_pv_mode)
-            if ControllerFeatures.AIMING_BEAM in self.controller_types[controller_type].features:
-                gui_signals.toggle_aiming.connect(self.toggle_aiming_beam)
-            if ControllerFeatures.MANUAL_POWER in self.controller_types[controller_type].features:
-                gui_signals.set_manual_output_power.connect(self.set_manual_output_power)
-            if ControllerFeatures.TC_SELECT in self.controller_types[controller_type].features:
-                gui_signals.set_heater_tc.connect(self.set_controller_tc)
-                gui_signals.refresh_parameters.connect(self.get_controller_tc)
-                self.get_controller_tc()
-            if ControllerFeatures.GAIN_SCHEDULING in self.controller_types[controller_type].features:
-                gui_signals.set_pid_parameters.connect(self.set_extended_pid)
-                gui_signals.refresh_pid.connect(self.get_extended_pid)
-                self.get_extended_pid()
-            elif ControllerFeatures.SIMPLE_PID in self.controller_types[controller_type].features:
-                gui_signals.set_pid_parameters.connect(self.set_pid_parameters)
-                gui_signals.refresh_pid.connect(self.get_pid_parameters)
-                self.get_pid_parameters()
-
-            self.get_controller_parameters()
+    def add_sensor(self, sensor_type, sensor_port):
+        self.default_furnace.add_sensor(sensor_type, sensor_port)
 
-    def remove_controller(self):
-        gui_signals.disconnect_controller.disconnect(self.remove_controller)
-        # Mandatory signals all controllers must support
-        gui_signals.set_target_setpoint.disconnect(self.set_target_setpoint)
-        gui_signals.set_rate.disconnect(self.set_rate)
-        gui_signals.set_control_mode.disconnect(self.set_control_mode)
-        gui_signals.refresh_parameters.disconnect(self.get_controller_parameters)
-        gui_signals.emergency_shutdown.disconnect(self.emergency_shutdown)
-        gui_signals.start_program.disconnect(self.start_programmer)
-        # Optional functionality
-        if ControllerFeatures.OUTPUT_ENABLE in self.controller.features:
-            gui_signals.enable_output.disconnect(self.toggle_output_enable)
-        if ControllerFeatures.EXTERNAL_PV in self.controller.features:
-            gui_signals.set_external_pv_mode.disconnect(self.set_external_pv_mode)
-        if ControllerFeatures.AIMING_BEAM in self.controller.features:
-            gui_signals.toggle_aiming.disconnect(self.toggle_aiming_beam)
-        if ControllerFeatures.MANUAL_POWER in self.controller.features:
-            gui_signals.set_manual_output_power.disconnect(self.set_manual_output_power)
-        if ControllerFeatures.TC_SELECT in self.controller.features:
-            gui_signals.set_heater_tc.disconnect(self.set_controller_tc)
-        if ControllerFeatures.GAIN_SCHEDULING in self.controller.features:
-            gui_signals.set_pid_parameters.disconnect(self.set_extended_pid)
-            gui_signals.refresh_pid.disconnect(self.get_extended_pid)
-        elif ControllerFeatures.SIMPLE_PID in self.controller.features:
-            gui_signals.set_pid_parameters.disconnect(self.set_pid_parameters)
-            gui_signals.refresh_pid.disconnect(self.get_pid_parameters)
+    def remove_sensor(self):
+        self.default_furnace.remove_sensor()
 
-        try:
-            self.controller.close()
-        except SerialException as e:
-            engine_signals.connection_failed.emit(f'Error when closing controller: {e}')
-        else:
-            engine_signals.controller_disconnected.emit()
-        finally:
-            self.controller = None
-            gui_signals.connect_controller.connect(self.add_controller)
+    def add_controller(self, controller_type, controller_port, slave_address):
+        self.default_furnace.add_controller(controller_type, controller_port, slave_address)
 
-    def set_sensor_tc(self, tc):
-        self.device_io(self.sensor.set_sensor_tc(tc))
+    def remove_controller(self):
+        self.default_furnace.remove_controller()
 
-    def get_sensor_tc(self):
-        self.device_io(self.sensor.get_sensor_tc,
-                       callbacks=[lambda result: engine_signals.sensor_tc_update.emit(result)])
+    def emergency_shutdown(self):
+        """The emergency stop of the GUI stops the controllers of all furnaces"""
+        for furnace in self.furnaces.values():
+            if furnace.controller:
+                furnace.emergency_shutdown()
 
-    def set_external_pv_mode(self, mode):
-        if not self.controller or not self.sensor:
-            engine_signals.error.emit('Cannot set external PV mode without a controller and a sensor connected.')
+    def forward_device_connected(self, furnace_id, role, device_type, port, features):
+        if furnace_id != self.default_furnace_id:
             return
-        if mode:
-            self.transfer_external_pv()
-            self.external_pv_timer.start()
-            engine_signals.message.emit('External PV mode activated!')
+        if role == 'Sensor':
+            self.connect_gui_sensor(self.default_furnace)
+            engine_signals.sensor_connected.emit(device_type, port, features)
         else:
-            self.external_pv_timer.stop()
-            engine_signals.message.emit('External PV mode deactivated!')
-        # Delay before switching modes to allow time for the first sensor value to be transmitted
-        self.start_ext_timer.setInterval(1000)
-        self.start_ext_timer.setSingleShot(True)
-        self.start_ext_timer.timeout.connect(lambda: self.controller.set_external_pv_mode(mode))
-        self.start_ext_timer.start()
-
-    def transfer_external_pv(self):
-        if not self.controller or not self.sensor:
-            engine_signals.error.emit('Cannot transfer external PV without a controller and a sensor connected.')
+            self.connect_gui_controller(self.default_furnace)
+            engine_signals.controller_connected.emit(device_type, port, features)
+
+    def forward_device_disconnected(self, furnace_id, role):
+        if furnace_id != self.default_furnace_id:
             return
-        self.device_io(self.sensor.get_sensor_value, callbacks=[lambda res: self.controller.update_external_pv(res)])
+        if role == 'Sensor':
+            self.disconnect_gui_sensor(self.default_furnace)
+            engine_signals.sensor_disconnected.emit()
+        else:
+            self.disconnect_gui_controller(self.default_furnace)
+            engine_signals.controller_disconnected.emit()
+
+    def forward_status_update(self, furnace_id, role, status, runtime):
+        if furnace_id == self.default_furnace_id:
+            signal = engine_signals.sensor_status_update if role == 'Sensor' else engine_signals.controller_status_update
+            signal.emit(status, runtime)
+
+    def forward_parameters_update(self, furnace_id, kind, values):
+        if furnace_id != self.default_furnace_id:
+            return
+        match kind:
+            case 'Controller':
+                engine_signals.controller_parameters_update.emit(values)
+            case 'PID':
+                engine_signals.pid_parameters_update.emit(values)
+            case 'Sensor TC':
+                engine_signals.sensor_tc_update.emit(values)
+            case 'Heater TC':
+                engine_signals.heater_tc_update.emit(values)
+            case 'TC Fault':
+                engine_signals.heater_tc_fault_update.emit(values)
+
+    def forward_program_segment(self, furnace_id, kind, segment):
+        if furnace_id == self.default_furnace_id:
+            signal = engine_signals.ramp_segment_started if kind == 'Ramp' else engine_signals.hold_segment_started
+            signal.emit(segment)
+
+    @staticmethod
+    def connect_gui_sensor(furnace):
+        if SensorFeatures.AIMING_BEAM in furnace.sensor.features:
+            gui_signals.switch_sensor_aiming_beam.connect(furnace.switch_sensor_aiming_beam)
+        if SensorFeatures.TC_SELECT in furnace.sensor.features:
+            gui_signals.set_sensor_tc.connect(furnace.set_sensor_tc)
+
+    @staticmethod
+    def disconnect_gui_sensor(furnace):
+        if SensorFeatures.AIMING_BEAM in furnace.sensor.features:
+            gui_signals.switch_sensor_aiming_beam.disconnect(furnace.switch_sensor_aiming_beam)
+        if SensorFeatures.TC_SELECT in furnace.sensor.features:
+            gui_signals.set_sensor_tc.disconnect(furnace.set_sensor_tc)
+
+    @staticmethod
+    def connect_gui_controller(furnace):
+        features = furnace.controller.features
+        # Mandatory signals all controllers must support
+        gui_signals.set_target_setpoint.connect(furnace.set_target_setpoint)
+        gui_signals.set_rate.connect(furnace.set_rate)
+        gui_signals.set_control_mode.connect(furnace.set_control_mode)
+        gui_signals.refresh_parameters.connect(furnace.get_controller_parameters)
+        gui_signals.start_program.connect(furnace.start_programmer)
+        gui_signals.skip_program.connect(furnace.skip_program_segment)
+        gui_signals.stop_program.connect(furnace.stop_programmer)
+        # Optional functionality
+        if ControllerFeatures.OUTPUT_ENABLE in features:
+            gui_signals.enable_output.connect(furnace.toggle_output_enable)
+        if ControllerFeatures.AIMING_BEAM in features:
+            gui_signals.toggle_aiming.connect(furnace.toggle_aiming_beam)
+        if ControllerFeatures.MANUAL_POWER in features:
+            gui_signals.set_manual_output_power.connect(furnace.set_manual_output_power)
+        if ControllerFeatures.TC_SELECT in features:
+            gui_signals.set_heater_tc.connect(furnace.set_controller_tc)
+            gui_signals.refresh_parameters.connect(furnace.get_controller_tc)
+        if ControllerFeatures.GAIN_SCHEDULING in features:
+            gui_signals.set_pid_parameters.connect(furnace.set_extended_pid)
+            gui_signals.refresh_pid.connect(furnace.get_extended_pid)
+        elif ControllerFeatures.SIMPLE_PID in features:
+            gui_signals.set_pid_parameters.connect(furnace.set_pid_parameters)
+            gui_signals.refresh_pid.connect(furnace.get_pid_parameters)
+
+    @staticmethod
+    def disconnect_gui_controller(furnace):
+        features = furnace.controller.features
+        # Mandatory signals all controllers must support
+        gui_signals.set_target_setpoint.disconnect(furnace.set_target_setpoint)
+        gui_signals.set_rate.disconnect(furnace.set_rate)
+        gui_signals.set_control_mode.disconnect(furnace.set_control_mode)
+        gui_signals.refresh_parameters.disconnect(furnace.get_controller_parameters)
+        gui_signals.start_program.disconnect(furnace.start_programmer)
+        gui_signals.skip_program.disconnect(furnace.skip_program_segment)
+        gui_signals.stop_program.disconnect(furnace.stop_programmer)
+        # Optional functionality
+        if ControllerFeatures.OUTPUT_ENABLE in features:
+            gui_signals.enable_output.disconnect(furnace.toggle_output_enable)
+        if ControllerFeatures.AIMING_BEAM in features:
+            gui_signals.toggle_aiming.disconnect(furnace.toggle_aiming_beam)
+        if ControllerFeatures.MANUAL_POWER in features:
+            gui_signals.set_manual_output_power.disconnect(furnace.set_manual_output_power)
+        if ControllerFeatures.TC_SELECT in features:
+            gui_signals.set_heater_tc.disconnect(furnace.set_controller_tc)
+            gui_signals.refresh_parameters.disconnect(furnace.get_controller_tc)
+        if ControllerFeatures.GAIN_SCHEDULING in features:
+            gui_signals.set_pid_parameters.disconnect(furnace.set_extended_pid)
+            gui_signals.refresh_pid.disconnect(furnace.get_extended_pid)
+        elif ControllerFeatures.SIMPLE_PID in features:
+            gui_signals.set_pid_parameters.disconnect(furnace.set_pid_parameters)
+            gui_signals.refresh_pid.disconnect(furnace.get_pid_parameters)
 
     def device_io(self, function, callbacks=None, *args, **kwargs):
         """
@@ -279,7 +359,7 @@ class HeaterControlEngine(QObject):
             *args: Variable-length argument list for the function being executed.
             **kwargs: Arbitrary keyword arguments for the function being executed.
         """
-        self.workers.append(worker := Worker(function, *args, **kwargs))
+        self.workers.append(worker := Worker(io_statistics.call, function, args, kwargs, time.perf_counter()))
         for callback in callbacks if callbacks else []:
             worker.signals.over.connect(callback)
         worker.signals.finished.connect(lambda w=worker: self.workers.remove(w))
@@ -289,164 +369,38 @@ class HeaterControlEngine(QObject):
         self.pool.start(worker)
 
     def refresh_status(self):
-        if self.sensor:
-            self.get_sensor_status()
-        if self.controller:
-            self.get_controller_status()
-
-    def set_controller_tc(self, tc):
-        self.device_io(self.controller.set_tc_type, None, tc)
-
-    def get_controller_tc(self):
-        self.device_io(self.controller.get_tc_type,
-                       callbacks=[lambda result: engine_signals.heater_tc_update.emit(result)])
-
-    def get_sensor_status(self):
-        runtime = (datetime.now() - self.log_start_time).total_seconds() if self.log_start_time else 0.0
-        callbacks = [lambda result: engine_signals.sensor_status_update.emit({'Sensor PV': result}, runtime)]
-        if self.is_logging:
-            callbacks.append(lambda result: self.add_log_data_point(data={'Sensor PV': result}))
-        self.device_io(self.sensor.get_sensor_value, callbacks=callbacks)
-
-    def switch_sensor_aiming_beam(self, state):
-        self.device_io(self.sensor.switch_aiming_beam, None, state)
-
-    def emergency_shutdown(self):
-        self.device_io(self.controller.emergency_stop)
-
-    def get_controller_status(self):
-        runtime = (datetime.now() - self.log_start_time).total_seconds() if self.log_start_time else 0.0
-        for parameter, function in {'Controller PV': self.controller.get_process_variable,
-                                    'Setpoint':      self.controller.get_working_setpoint,
-                                    'Power':         self.controller.get_working_output}.items():
-            callbacks = [lambda result, _param=parameter: engine_signals.controller_status_update.emit({_param: result},
-                                                                                                       runtime)]
-            if self.is_logging:
-                callbacks.append(lambda result, _param=parameter: self.add_log_data_point(data={_param: result}))
-            self.device_io(function, callbacks=callbacks)
-
-    def get_controller_parameters(self):
-        for parameter, function in {'Setpoint': self.controller.get_target_setpoint,
-                                    'Power':    self.controller.get_manual_output_power,
-                                    'Rate':     self.controller.get_rate,
-                                    'Mode':     self.controller.get_control_mode}.items():
-            self.device_io(function, callbacks=[
-                lambda result, _param=parameter: engine_signals.controller_parameters_update.emit({_param: result})])
-
-    def set_control_mode(self, mode):
-        function = self.controller.set_manual_mode if mode == 'Manual' else self.controller.set_automatic_mode
-        self.device_io(function, None)
-
-    def set_target_setpoint(self, setpoint):
-        self.device_io(self.controller.set_target_setpoint, None, setpoint)
-
-    def set_manual_output_power(self, power):
-        self.device_io(self.controller.set_manual_output_power, None, power)
-
-    def set_rate(self, rate):
-        self.device_io(self.controller.set_rate, None, rate)
-
-    def get_pid_parameters(self):
-        for parameter, function in {'P1': self.controller.get_pid_p, 'I1': self.controller.get_pid_i,
-                                    'D1': self.controller.get_pid_d}.items():
-            self.device_io(function, callbacks=[
-                lambda result, _param=parameter: engine_signals.pid_parameters_update.emit({_param: result})])
-
-    def set_pid_parameters(self, parameter, value):
-        function = {'P1': self.controller.set_pid_p, 'I1': self.controller.set_pid_i, 'D1': self.controller.set_pid_d}[
-            parameter]
-        self.device_io(function, None, value)
-
-    def get_extended_pid(self):
-        for parameter, function in {'P1':  self.controller.get_pid_p, 'P2': self.controller.get_pid_p2,
-                                    'P3':  self.controller.get_pid_p3, 'I1': self.controller.get_pid_i,
-                                    'I2':  self.controller.get_pid_i2, 'I3': self.controller.get_pid_i3,
-                                    'D1':  self.controller.get_pid_d, 'D2': self.controller.get_pid_d2,
-                                    'D3':  self.controller.get_pid_d3, 'B23': self.controller.get_boundary_23,
-                                    'B12': self.controller.get_boundary_12, 'AS': self.controller.get_active_set,
-                                    'GS':  self.controller.get_gain_scheduling}.items():
-            self.device_io(function, callbacks=[
-                lambda result, _param=parameter: engine_signals.pid_parameters_update.emit({_param: result})])
-
-    def set_extended_pid(self, parameter, value):
-        function = {'P1':  self.controller.set_pid_p, 'P2': self.controller.set_pid_p2,
-                    'P3':  self.controller.set_pid_p3, 'I1': self.controller.set_pid_i,
-                    'I2':  self.controller.set_pid_i2, 'I3': self.controller.set_pid_i3,
-                    'D1':  self.controller.set_pid_d, 'D2': self.controller.set_pid_d2,
-                    'D3':  self.controller.set_pid_d3, 'B23': self.controller.set_boundary_23,
-                    'B12': self.controller.set_boundary_12, 'GS': self.controller.set_gain_scheduling,
-                    'AS':  self.controller.set_active_set}[parameter]
-        self.device_io(function, None, value)
-
-    def toggle_output_enable(self, state):
-        function = self.controller.enable_output if state else self.controller.disable_output
-        self.device_io(function)
-
-    def toggle_aiming_beam(self, state):
-        function = self.controller.enable_aiming_beam if state else self.controller.disable_aiming_beam
-        self.device_io(function)
-
-    def start_programmer(self, program):
-        if self.programmer:
-            self.programmer.timer.stop()
-        self.programmer = SetpointProgrammer(program, self)
-        gui_signals.skip_program.connect(self.skip_program_segment)
-        gui_signals.stop_program.connect(self.stop_programmer)
-
-    def stop_programmer(self):
-        if self.programmer:
-            self.programmer.timer.stop()
-            self.programmer = None
-
-    def skip_program_segment(self):
-        if self.programmer:
-            self.programmer.current_segment += 1
-            self.programmer.start_ramp()
-
-    def start_logging(self):
-        self.is_logging = True
-        self.log_start_time = datetime.now() if not self.log_start_time else self.log_start_time
-
-    def clear_log(self):
-        self.is_logging = False
-        self.log_start_time = None
-        self.data = {'Sensor PV': [], 'Controller PV': [], 'Setpoint': [], 'Power': []}
-
-    def export_log(self, filepath):
-        """
-        Tedious data aligning: The timestamps of the 4 separate data series (time -> value) are rounded to whole seconds
-        and transferred into one dict (time -> 4 values), to align the 4 data series. This dict is then used to generate
-         a csv file.
-        """
-
-        def _work():
-            sorted_data = {}
-            for parameter, series in self.data.items():
-                for time, value in series:
-                    timestamp = int(time.timestamp())
-                    if timestamp not in sorted_data.keys():
-                        sorted_data[timestamp] = {parameter: value}
-                    else:
-                        sorted_data[timestamp].update({parameter: value})
-
-            unit = self.units[self.unit_type]
-
-            with open(filepath, 'w+') as file:
-                file.write(
-                    'UTC, Unix timestamp (s), Process Variable ({:s}), Output Power (%), Sensor Value ({:s})\n'.format(
-                        unit, unit))
-                for timestamp, datapoint in sorted_data.items():
-                    timestring = datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
-                    power = datapoint['Power'] if 'Power' in datapoint.keys() else math.nan
-                    controller_pv = datapoint['Controller PV'] if 'Controller PV' in datapoint.keys() else math.nan
-                    sensor_pv = datapoint['Sensor PV'] if 'Sensor PV' in datapoint.keys() else math.nan
-                    file.write(
-                        '{:s}, {:d}, {:.1f}, {:.1f}, {:.1f}\n'.format(timestring, timestamp, controller_pv, power,
-                                                                      sensor_pv))
-
-        worker = Worker(_work)
-        self.pool.start(worker)
+        for furnace in self.furnaces.values():
+            furnace.refresh_status()
+        self.report_queue_depths()
+
+    def get_queue_depths(self):
+        """Number of pending jobs per device poller of every furnace, and of one-off jobs in the thread pool"""
+        depths = {furnace_id: furnace.get_queue_depths() for furnace_id, furnace in self.furnaces.items()}
+        depths['Pool'] = len(self.workers)
+        return depths
+
+    def report_queue_depths(self):
+        if (depths := self.get_queue_depths()) != self.queue_depths:
+            self.queue_depths = depths
+            engine_signals.queue_depth_update.emit(depths)
+
+    def report_io_statistics(self):
+        if (calls := io_statistics.calls) != self.io_calls_reported:
+            self.io_calls_reported = calls
+            engine_signals.io_statistics_update.emit(io_statistics.report())
+
+    @staticmethod
+    def export_io_statistics(filepath):
+        try:
+            io_statistics.export(filepath)
+        except OSError as e:
+            engine_signals.error.emit(f'Could not export I/O statistics: {e}')
+        else:
+            engine_signals.message.emit(f'I/O statistics exported to {filepath}')
 
-    def add_log_data_point(self, data):
-        for parameter, value in data.items():
-            self.data[parameter].append((datetime.now(), value))
+    def set_export_options(self, bin_width, fill):
+        if bin_width <= 0 or fill not in ('none', 'last', 'nearest'):
+            engine_signals.error.emit(f'Invalid export options: bin width {bin_width} s, fill {fill}!')
+            return
+        self.export_bin_width = bin_width
+        self.export_fill = fill
@@ -0,0 +1,608 @@
+import copy
+import functools
+import os
+import time
+from datetime import datetime
+
+from PySide6.QtCore import QObject, QTimer
+
+from src.Drivers.BaseClasses import AbstractController, AbstractSensor, ControllerFeatures, SensorFeatures
+from src.Engine.Connector import DeviceConnector
+from src.Engine.DataLog import DataLog
+from src.Engine.IOStats import io_statistics
+from src.Engine.LogWriter import StreamingLogWriter, csv_header, csv_rows, write_npz
+from src.Engine.Poller import AsyncPoller, DevicePoller, supports_async
+from src.Engine.Scheduler import PollingScheduler
+from src.Engine.SetProg import SetpointProgrammer
+from src.Engine.Supervisor import LinkSupervisor
+from src.Engine.Worker import Worker
+from src.Signals import engine_signals
+
+
+class Furnace(QObject):
+    """
+    One furnace: a controller and a sensor (either may be absent) with their own polling threads and schedule, data
+    log and setpoint programmer, so several furnaces can be run side by side from one engine.
+    All results are emitted on the engine signals keyed by the furnace id.
+    """
+    # Commands that may be sent to a furnace by name with gui_signals.furnace_command
+    commands = {'set_target_setpoint', 'set_rate', 'set_control_mode', 'set_manual_output_power', 'toggle_output_enable',
+                'toggle_aiming_beam', 'set_controller_tc', 'get_controller_tc', 'set_sensor_tc', 'get_sensor_tc',
+                'switch_sensor_aiming_beam', 'set_external_pv_mode', 'get_controller_parameters',
+                'get_pid_parameters', 'set_pid_parameters', 'get_extended_pid', 'set_extended_pid',
+                'emergency_shutdown', 'start_programmer', 'stop_programmer', 'skip_program_segment', 'start_logging',
+                'clear_log', 'export_log', 'set_polling_period'}
+
+    def __init__(self, engine, furnace_id):
+        super().__init__()
+        self.engine = engine
+        self.id = furnace_id
+
+        self.sensor: AbstractSensor | None = None
+        self.controller: AbstractController | None = None
+        self.programmer: SetpointProgrammer | None = None
+        # Connections in progress by role, and all connector threads that have not finished yet
+        self.connecting: dict[str, DeviceConnector] = {}
+        self.connectors: set[DeviceConnector] = set()
+        # Type, port and driver arguments of the devices, for reconnecting after the link was lost
+        self.device_settings: dict[str, tuple] = {}
+        self.links: dict[str, LinkSupervisor] = {}
+        # Last known setpoint, rate, mode and power of the controller, restored after a reconnect
+        self.controller_state = {}
+        self.resume_external_pv = False
+
+        self.polling_schedule = copy.deepcopy(engine.polling_schedule)
+        self.scheduler = PollingScheduler()
+        self.pollers: dict[str, DevicePoller | AsyncPoller] = {}
+
+        self.is_logging = False
+        self.log_start_time = None
+        self.data = DataLog(['Sensor PV', 'Controller PV', 'Setpoint', 'Power'], retention=engine.log_retention)
+        self.log_writer: StreamingLogWriter | None = None
+
+        self.external_pv_mode = False
+
+    def tag(self, text):
+        """Prefix messages of all but the default furnace with the furnace id"""
+        return text if self.id == self.engine.default_furnace_id else f'{self.id}: {text}'
+
+    def shutdown(self):
+        self.stop_programmer()
+        self.close_log_writer()
+        self.connecting.clear()
+        if self.sensor:
+            self.remove_sensor()
+        if self.controller:
+            self.remove_controller()
+        for connector in list(self.connectors):
+            connector.wait(2000)
+
+    def connect_device(self, role, device_type, port, **kwargs):
+        """
+        Construct the driver in a connector thread. The furnace gives up after the connect timeout of the engine, a
+        device that is connected only afterwards is closed again.
+        """
+        if (self.sensor if role == 'Sensor' else self.controller) or role in self.connecting:
+            engine_signals.error.emit(self.tag(f'A {role.lower()} is already connected!'))
+            return
+        self.device_settings[role] = (device_type, port, kwargs)
+        self.start_connector(role)
+
+    def start_connector(self, role, reconnect=False):
+        device_type, port, kwargs = self.device_settings[role]
+        if (entry := (self.engine.sensor_types if role == 'Sensor' else
+                      self.engine.controller_types).get(device_type)) is None:
+            engine_signals.connection_progress.emit(self.id, role, 'Connection failed')
+            engine_signals.connection_failed.emit(ValueError(self.tag(f'Unknown {role.lower()} type {device_type}!')))
+            return
+        connector = DeviceConnector(role, device_type, port, lambda: entry.load()(**kwargs), reconnect)
+        connector.signals.connected.connect(functools.partial(self.device_created, connector))
+        connector.signals.failed.connect(functools.partial(self.connection_failed, connector))
+        connector.finished.connect(functools.partial(self.connectors.discard, connector))
+        self.connecting[role] = connector
+        self.connectors.add(connector)
+        engine_signals.connection_progress.emit(
+            self.id, role, f'{"Reconnecting" if reconnect else "Connecting"} {device_type} on {port}')
+        connector.start()
+        QTimer.singleShot(int(self.engine.connect_timeout * 1000), functools.partial(self.connection_timeout, connector))
+
+    def cancel_connection(self, role):
+        if self.connecting.pop(role, None):
+            engine_signals.connection_progress.emit(self.id, role, 'Connection cancelled')
+
+    def device_created(self, connector, device):
+        if self.connecting.get(connector.role) is not connector:
+            # Timed out or cancelled in the meantime
+            try:
+                device.close()
+            except Exception as e:
+                engine_signals.error.emit(self.tag(f'Error when closing abandoned {connector.device_type}: {e}'))
+            return
+        del self.connecting[connector.role]
+        io_statistics.register(device, f'{self.id} {connector.role} ({connector.device_type})')
+        if connector.reconnect:
+            self.resume_device(connector.role, device)
+            return
+        engine_signals.connection_progress.emit(self.id, connector.role, 'Connected')
+        if connector.role == 'Sensor':
+            self.sensor = device
+            self.sensor_connected(connector.device_type, connector.port)
+        else:
+            self.controller = device
+            self.controller_connected(connector.device_type, connector.port)
+
+    def connection_failed(self, connector, error):
+        if self.connecting.get(connector.role) is connector:
+            del self.connecting[connector.role]
+            if connector.reconnect:
+                engine_signals.connection_progress.emit(self.id, connector.role, f'Reconnect failed: {error}')
+                self.schedule_reconnect(connector.role)
+                return
+            engine_signals.connection_progress.emit(self.id, connector.role, 'Connection failed')
+            engine_signals.connection_failed.emit(error)
+
+    def connection_timeout(self, connector):
+        if self.connecting.get(connector.role) is connector:
+            del self.connecting[connector.role]
+            engine_signals.connection_progress.emit(self.id, connector.role, 'Connection timed out')
+            if connector.reconnect:
+                self.schedule_reconnect(connector.role)
+                return
+            engine_signals.connection_failed.emit(TimeoutError(self.tag(
+                f'{connector.device_type} on {connector.port} did not answer within {self.engine.connect_timeout} s')))
+
+    def is_offline(self, role):
+        """True while the link to the device is lost and it is being reconnected"""
+        return (link := self.links.get(role)) is not None and link.lost
+
+    def poll_succeeded(self, role, *_):
+        if link := self.links.get(role):
+            link.success()
+
+    def poll_failed(self, role, *_):
+        if self.engine.auto_reconnect and (link := self.links.get(role)) and link.failure():
+            self.link_lost(role)
+
+    def link_lost(self, role):
+        """
+        Close a device that stopped answering and try to open it again. Log, programmer and the furnace settings are
+        kept, the programmer pauses until the controller is back.
+        """
+        engine_signals.error.emit(self.tag(f'{role} is not answering, trying to reconnect!'))
+        engine_signals.connection_progress.emit(self.id, role, 'Link lost')
+        if self.external_pv_mode:
+            self.resume_external_pv = True
+            if role == 'Sensor' and not self.is_offline('Controller'):
+                self.set_external_pv_mode(False)
+            else:
+                self.set_external_pv_tasks(False)
+        self.stop_poller(role)
+        try:
+            (self.sensor if role == 'Sensor' else self.controller).close()
+        except Exception:
+            # The port is most likely gone already
+            pass
+        self.schedule_reconnect(role)
+
+    def schedule_reconnect(self, role):
+        link = self.links[role]
+        delay = link.next_delay()
+        engine_signals.connection_progress.emit(self.id, role, f'Next reconnect attempt in {delay:g} s')
+        QTimer.singleShot(int(delay * 1000), functools.partial(self.reconnect, role, link))
+
+    def reconnect(self, role, link):
+        # The device may have been disconnected or connected anew in the meantime
+        if self.links.get(role) is link and link.lost and role not in self.connecting:
+            self.start_connector(role, reconnect=True)
+
+    def resume_device(self, role, device):
+        """Take a reconnected device back into operation and restore the state of the controller"""
+        self.links[role].reset()
+        if role == 'Sensor':
+            self.sensor = device
+            self.start_poller('Sensor', self.update_sensor_status)
+            self.schedule_polling('Sensor', {'Sensor PV': self.sensor.get_sensor_value})
+        else:
+            self.controller = device
+            self.controller.start()
+            self.start_poller('Controller', self.update_controller_status)
+            self.schedule_controller_polling()
+            self.restore_controller_state()
+        engine_signals.connection_progress.emit(self.id, role, 'Reconnected')
+        engine_signals.message.emit(self.tag(f'{role} reconnected!'))
+        if self.resume_external_pv and self.sensor and self.controller and \
+                not self.is_offline('Sensor') and not self.is_offline('Controller'):
+            self.resume_external_pv = False
+            self.set_external_pv_mode(True)
+
+    def track_controller_state(self, **state):
+        self.controller_state.update(state)
+
+    def restore_controller_state(self):
+        """Write the last known mode, rate, setpoint and manual power to the controller, in this order"""
+        state = dict(self.controller_state)
+        controller = self.controller
+
+        def restore():
+            if mode := state.get('Mode'):
+                controller.set_manual_mode() if mode == 'Manual' else controller.set_automatic_mode()
+            for parameter, function in (('Rate', controller.set_rate), ('Setpoint', controller.set_target_setpoint),
+                                        ('Power', controller.set_manual_output_power)):
+                if parameter in state and not (parameter == 'Power' and mode == 'Automatic'):
+                    try:
+                        function(state[parameter])
+                    except NotImplementedError:
+                        pass
+
+        self.engine.device_io(restore)
+
+    def add_sensor(self, sensor_type, sensor_port):
+        self.connect_device('Sensor', sensor_type, sensor_port, _port=sensor_port)
+
+    def sensor_connected(self, sensor_type, sensor_port):
+        self.links['Sensor'] = LinkSupervisor()
+        self.start_poller('Sensor', self.update_sensor_status)
+        self.schedule_polling('Sensor', {'Sensor PV': self.sensor.get_sensor_value})
+        engine_signals.device_connected.emit(self.id, 'Sensor', sensor_type, sensor_port, self.sensor.features)
+        if SensorFeatures.TC_SELECT in self.sensor.features:
+            self.get_sensor_tc()
+
+    def remove_sensor(self):
+        if not self.sensor:
+            self.cancel_connection('Sensor')
+            return
+        self.cancel_connection('Sensor')
+        link = self.links.pop('Sensor', None)
+        self.stop_poller('Sensor')
+        self.set_external_pv_tasks(False)
+        self.resume_external_pv = False
+        try:
+            # A lost device has been closed already
+            if not (link and link.lost):
+                self.sensor.close()
+        except Exception as e:
+            engine_signals.error.emit(self.tag(f'Error when closing sensor: {e}'))
+        finally:
+            # Unwire the GUI whether or not the device closed cleanly, it is gone either way
+            engine_signals.device_disconnected.emit(self.id, 'Sensor')
+            self.sensor = None
+
+    def add_controller(self, controller_type, controller_port, slave_address=None):
+        slave_address = self.engine.controller_slave_address if slave_address is None else slave_address
+        self.connect_device('Controller', controller_type, controller_port, _port_name=controller_port,
+                            _slave_address=slave_address)
+
+    def controller_connected(self, controller_type, controller_port):
+        self.links['Controller'] = LinkSupervisor()
+        self.controller.start()
+        self.start_poller('Controller', self.update_controller_status)
+        self.schedule_controller_polling()
+        engine_signals.device_connected.emit(self.id, 'Controller', controller_type, controller_port,
+                                             self.controller.features)
+
+        features = self.controller.features
+        if ControllerFeatures.TC_SELECT in features:
+            self.get_controller_tc()
+        if ControllerFeatures.GAIN_SCHEDULING in features:
+            self.get_extended_pid()
+        elif ControllerFeatures.SIMPLE_PID in features:
+            self.get_pid_parameters()
+        self.get_controller_parameters()
+
+    def remove_controller(self):
+        if not self.controller:
+            self.cancel_connection('Controller')
+            return
+        self.cancel_connection('Controller')
+        link = self.links.pop('Controller', None)
+        self.stop_poller('Controller')
+        self.stop_programmer()
+        self.set_external_pv_tasks(False)
+        self.resume_external_pv = False
+        self.controller_state.clear()
+        try:
+            if not (link and link.lost):
+                self.controller.close()
+        except Exception as e:
+            engine_signals.error.emit(self.tag(f'Error when closing controller: {e}'))
+        finally:
+            # Unwire the GUI whether or not the device closed cleanly, it is gone either way
+            engine_signals.device_disconnected.emit(self.id, 'Controller')
+            self.controller = None
+
+    def set_sensor_tc(self, tc):
+        self.engine.device_io(self.sensor.set_sensor_tc, None, tc)
+
+    def get_sensor_tc(self):
+        self.engine.device_io(self.sensor.get_sensor_tc, callbacks=[
+            lambda result: engine_signals.device_parameters_update.emit(self.id, 'Sensor TC', result)])
+
+    def set_external_pv_mode(self, mode):
+        if not self.controller or not self.sensor:
+            engine_signals.error.emit(
+                self.tag('Cannot set external PV mode without a controller and a sensor connected.'))
+            return
+        self.set_external_pv_tasks(mode)
+        engine_signals.message.emit(self.tag(f'External PV mode {"activated" if mode else "deactivated"}!'))
+        # Delay before switching modes to allow time for the first sensor value to be transmitted
+        controller = self.controller
+        QTimer.singleShot(1000, lambda: controller.set_external_pv_mode(mode) if controller is self.controller
+                          else None)
+
+    def set_external_pv_tasks(self, mode):
+        """Start or stop forwarding the sensor value to the controller"""
+        self.external_pv_mode = mode
+        if mode:
+            self.schedule_polling('Sensor', {'External PV': self.sensor.get_sensor_value})
+        else:
+            self.scheduler.remove_task('Sensor', 'External PV')
+
+    def start_poller(self, name, result_handler):
+        """
+        Start the poller that executes the periodic reads of a freshly connected device: a long-lived thread, or
+        requests on the shared asyncio loop if it is enabled and the driver supports it
+        """
+        device = self.sensor if name == 'Sensor' else self.controller
+        if self.engine.async_loop and supports_async(device):
+            poller = AsyncPoller(f'{self.id} {name}', self.engine.async_loop, self.engine.async_timeout)
+        else:
+            poller = DevicePoller(f'{self.id} {name}')
+        self.pollers[name] = poller
+        poller.signals.over.connect(result_handler)
+        poller.signals.over.connect(functools.partial(self.poll_succeeded, name))
+        poller.signals.con_fail.connect(lambda function_name, e: engine_signals.com_failed.emit(
+            self.tag(f'Communication error during {function_name}: {e}')))
+        poller.signals.con_fail.connect(functools.partial(self.poll_failed, name))
+        poller.signals.imp_fail.connect(lambda e: engine_signals.non_imp.emit(self.tag(f'{e}')))
+        poller.signals.error.connect(lambda e: engine_signals.error.emit(self.tag(f'{e}')))
+        poller.start()
+
+    def stop_poller(self, name):
+        self.scheduler.remove_device(name)
+        if poller := self.pollers.pop(name, None):
+            poller.stop()
+
+    def schedule_polling(self, device, functions):
+        for key, function in functions.items():
+            self.scheduler.add_task(device, key, function, self.polling_schedule[key]['Period'] / 1000,
+                                    self.polling_schedule[key]['Priority'])
+
+    def schedule_controller_polling(self):
+        features = self.controller.features
+        # Controllers that expose their status registers as one contiguous block are read in a single transaction,
+        # at the rate of the fastest of the three quantities
+        if ControllerFeatures.STATUS_BLOCK in features:
+            schedule = [self.polling_schedule[key] for key in ('Controller PV', 'Setpoint', 'Power')]
+            self.scheduler.add_task('Controller', 'Controller Status', self.controller.get_status_block,
+                                    min(entry['Period'] for entry in schedule) / 1000,
+                                    min(entry['Priority'] for entry in schedule))
+        else:
+            self.schedule_polling('Controller', {'Controller PV': self.controller.get_process_variable,
+                                                 'Setpoint':      self.controller.get_working_setpoint,
+                                                 'Power':         self.controller.get_working_output})
+        if ControllerFeatures.TC_FAULT in features:
+            self.schedule_polling('Controller', {'TC Fault': self.controller.get_tc_fault})
+
+    def set_polling_period(self, key, period):
+        """Change the polling period (in ms) of one quantity"""
+        if key not in self.polling_schedule:
+            engine_signals.error.emit(self.tag(f'Cannot set polling period of unknown quantity {key}!'))
+            return
+        self.polling_schedule[key]['Period'] = period
+        self.scheduler.set_period(key, period / 1000)
+        if self.controller and key in ('Controller PV', 'Setpoint', 'Power'):
+            self.scheduler.remove_device('Controller')
+            self.schedule_controller_polling()
+
+    def get_runtime(self):
+        return (datetime.now() - self.log_start_time).total_seconds() if self.log_start_time else 0.0
+
+    def refresh_status(self):
+        for task in self.scheduler.due_tasks():
+            self.pollers[task.device].submit(task.key, task.function, priority=task.priority)
+
+    def get_queue_depths(self):
+        return {name: poller.queue_depth for name, poller in self.pollers.items()}
+
+    def set_controller_tc(self, tc):
+        self.engine.device_io(self.controller.set_tc_type, None, tc)
+
+    def get_controller_tc(self):
+        self.engine.device_io(self.controller.get_tc_type, callbacks=[
+            lambda result: engine_signals.device_parameters_update.emit(self.id, 'Heater TC', result)])
+
+    def update_sensor_status(self, key, result):
+        if key == 'External PV':
+            if self.controller:
+                self.controller.update_external_pv(result)
+            return
+        engine_signals.device_status_update.emit(self.id, 'Sensor', {key: result}, self.get_runtime())
+        if self.is_logging:
+            self.add_log_data_point(data={key: result})
+
+    def switch_sensor_aiming_beam(self, state):
+        self.engine.device_io(self.sensor.switch_aiming_beam, None, state)
+
+    def emergency_shutdown(self):
+        self.engine.device_io(self.controller.emergency_stop)
+
+    def update_controller_status(self, key, result):
+        if key == 'TC Fault':
+            engine_signals.device_parameters_update.emit(self.id, 'TC Fault', result)
+            return
+        status = result if key == 'Controller Status' else {key: result}
+        engine_signals.device_status_update.emit(self.id, 'Controller', status, self.get_runtime())
+        if self.is_logging:
+            self.add_log_data_point(data=status)
+
+    def get_controller_parameters(self):
+        for parameter, function in {'Setpoint': self.controller.get_target_setpoint,
+                                    'Power':    self.controller.get_manual_output_power,
+                                    'Rate':     self.controller.get_rate,
+                                    'Mode':     self.controller.get_control_mode}.items():
+            self.engine.device_io(function, callbacks=[
+                lambda result, _param=parameter: engine_signals.device_parameters_update.emit(
+                    self.id, 'Controller', {_param: result}),
+                # The mode is read as a device specific value, so it is only tracked when it is set
+                lambda result, _param=parameter: self.track_controller_state(**{_param: result})
+                if _param != 'Mode' else None])
+
+    def set_control_mode(self, mode):
+        self.track_controller_state(Mode=mode)
+        function = self.controller.set_manual_mode if mode == 'Manual' else self.controller.set_automatic_mode
+        self.engine.device_io(function, None)
+
+    def set_target_setpoint(self, setpoint):
+        self.track_controller_state(Setpoint=setpoint)
+        self.engine.device_io(self.controller.set_target_setpoint, None, setpoint)
+
+    def set_manual_output_power(self, power):
+        self.track_controller_state(Power=power)
+        self.engine.device_io(self.controller.set_manual_output_power, None, power)
+
+    def set_rate(self, rate):
+        self.track_controller_state(Rate=rate)
+        self.engine.device_io(self.controller.set_rate, None, rate)
+
+    def get_pid_parameters(self):
+        for parameter, function in {'P1': self.controller.get_pid_p, 'I1': self.controller.get_pid_i,
+                                    'D1': self.controller.get_pid_d}.items():
+            self.engine.device_io(function, callbacks=[
+                lambda result, _param=parameter: engine_signals.device_parameters_update.emit(
+                    self.id, 'PID', {_param: result})])
+
+    def set_pid_parameters(self, parameter, value):
+        function = {'P1': self.controller.set_pid_p, 'I1': self.controller.set_pid_i, 'D1': self.controller.set_pid_d}[
+            parameter]
+        self.engine.device_io(function, None, value)
+
+    def get_extended_pid(self):
+        for parameter, function in {'P1':  self.controller.get_pid_p, 'P2': self.controller.get_pid_p2,
+                                    'P3':  self.controller.get_pid_p3, 'I1': self.controller.get_pid_i,
+                                    'I2':  self.controller.get_pid_i2, 'I3': self.controller.get_pid_i3,
+                                    'D1':  self.controller.get_pid_d, 'D2': self.controller.get_pid_d2,
+                                    'D3':  self.controller.get_pid_d3, 'B23': self.controller.get_boundary_23,
+                                    'B12': self.controller.get_boundary_12, 'AS': self.controller.get_active_set,
+                                    'GS':  self.controller.get_gain_scheduling}.items():
+            self.engine.device_io(function, callbacks=[
+                lambda result, _param=parameter: engine_signals.device_parameters_update.emit(
+                    self.id, 'PID', {_param: result})])
+
+    def set_extended_pid(self, parameter, value):
+        function = {'P1':  self.controller.set_pid_p, 'P2': self.controller.set_pid_p2,
+                    'P3':  self.controller.set_pid_p3, 'I1': self.controller.set_pid_i,
+                    'I2':  self.controller.set_pid_i2, 'I3': self.controller.set_pid_i3,
+                    'D1':  self.controller.set_pid_d, 'D2': self.controller.set_pid_d2,
+                    'D3':  self.controller.set_pid_d3, 'B23': self.controller.set_boundary_23,
+                    'B12': self.controller.set_boundary_12, 'GS': self.controller.set_gain_scheduling,
+                    'AS':  self.controller.set_active_set}[parameter]
+        self.engine.device_io(function, None, value)
+
+    def toggle_output_enable(self, state):
+        function = self.controller.enable_output if state else self.controller.disable_output
+        self.engine.device_io(function)
+
+    def toggle_aiming_beam(self, state):
+        function = self.controller.enable_aiming_beam if state else self.controller.disable_aiming_beam
+        self.engine.device_io(function)
+
+    def start_programmer(self, program):
+        if not self.controller:
+            engine_signals.error.emit(self.tag('Cannot start a program without a controller connected.'))
+            return
+        self.stop_programmer()
+        self.programmer = SetpointProgrammer(program, self)
+
+    def stop_programmer(self):
+        if self.programmer:
+            self.programmer.stop()
+            self.programmer = None
+
+    def skip_program_segment(self):
+        if self.programmer and not self.is_offline('Controller'):
+            self.programmer.current_segment += 1
+            self.programmer.start_ramp()
+
+    def start_logging(self):
+        self.is_logging = True
+        self.log_start_time = datetime.now() if not self.log_start_time else self.log_start_time
+        if not self.log_writer:
+            self.open_log_writer()
+
+    def clear_log(self):
+        self.is_logging = False
+        self.log_start_time = None
+        self.close_log_writer()
+        self.data.clear()
+
+    def open_log_writer(self):
+        timestring = self.log_start_time.strftime('%Y-%m-%dT%H-%M-%S')
+        filename = f'Log_{timestring}.csv' if self.id == self.engine.default_furnace_id else \
+            f'Log_{self.id}_{timestring}.csv'
+        try:
+            os.makedirs(self.engine.stream_directory, exist_ok=True)
+            self.log_writer = StreamingLogWriter(os.path.join(self.engine.stream_directory, filename),
+                                                 self.engine.units[self.engine.unit_type])
+        except OSError as e:
+            engine_signals.error.emit(self.tag(f'Could not open log file, data is only kept in memory: {e}'))
+        else:
+            engine_signals.message.emit(self.tag(f'Streaming log data to {self.log_writer.filepath}'))
+
+    def close_log_writer(self):
+        if self.log_writer:
+            try:
+                self.log_writer.close()
+            except OSError as e:
+                engine_signals.error.emit(self.tag(f'Error when closing log file: {e}'))
+            self.log_writer = None
+
+    def export_log(self, filepath):
+        """
+        The format is chosen by the file extension: .npz saves the raw samples of all channels to a binary NumPy
+        archive, anything else exports a csv file.
+        While logging with the default export options, the streamed log file already holds the aligned data and is
+        simply copied. Otherwise, the 4 separate data series (time -> value) are aligned on a common time base of
+        export_bin_width seconds and the columns are formatted in bulk.
+        """
+        unit = self.engine.units[self.engine.unit_type]
+
+        if filepath.lower().endswith('.npz'):
+            units = {'Sensor PV': unit, 'Controller PV': unit, 'Setpoint': unit, 'Power': '%'}
+            worker = Worker(write_npz, filepath, self.data, units)
+            worker.signals.error.connect(
+                lambda e: engine_signals.error.emit(self.tag(f'Error when exporting log file: {e}')))
+            self.engine.pool.start(worker)
+            return
+
+        bin_width = self.engine.export_bin_width
+        fill = self.engine.export_fill
+
+        if self.log_writer and bin_width == 1 and fill == 'none':
+            worker = Worker(self.log_writer.export, filepath)
+            worker.signals.error.connect(
+                lambda e: engine_signals.error.emit(self.tag(f'Error when exporting log file: {e}')))
+            self.engine.pool.start(worker)
+            return
+
+        def _work():
+            timestamps, aligned = self.data.align(['Controller PV', 'Power', 'Sensor PV'], bin_width, fill)
+            with open(filepath, 'w+') as file:
+                file.write(csv_header(unit))
+                file.write(csv_rows(timestamps, aligned['Controller PV'], aligned['Power'], aligned['Sensor PV'],
+                                    bin_width))
+
+        worker = Worker(_work)
+        worker.signals.error.connect(
+            lambda e: engine_signals.error.emit(self.tag(f'Error when exporting log file: {e}')))
+        self.engine.pool.start(worker)
+
+    def add_log_data_point(self, data):
+        timestamp = time.time()
+        for parameter, value in data.items():
+            self.data.append(parameter, timestamp, value)
+        if self.log_writer:
+            try:
+                self.log_writer.add(timestamp, data)
+            except OSError as e:
+                engine_signals.error.emit(self.tag(f'Error when writing log file, data is only kept in memory: {e}'))
+                self.log_writer = None
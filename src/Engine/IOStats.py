@@ -0,0 +1,214 @@
+import asyncio
+import bisect
+import csv
+import json
+import threading
+import time
+import weakref
+
+from minimalmodbus import NoResponseError
+from serial import SerialTimeoutException
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+class TimedLock:
+    """
+    Wraps the com_lock of a driver (a lock or a bus transaction) and adds the time spent waiting for it to the
+    statistics of the call that is executing in the current thread
+    """
+
+    def __init__(self, lock, statistics):
+        self.lock = lock
+        self.statistics = statistics
+
+    def __enter__(self):
+        start = time.perf_counter()
+        result = self.lock.__enter__()
+        self.statistics.local.lock_wait = getattr(self.statistics.local, 'lock_wait', 0.0) + \
+            time.perf_counter() - start
+        return result
+
+    def __exit__(self, *exc_info):
+        return self.lock.__exit__(*exc_info)
+
+
+class LatencyHistogram:
+    """
+    Latencies counted in bins with fixed upper edges in seconds, the last bin is open, so memory use is constant however
+    many are added. A percentile is the upper edge of the bin it falls into, at most the maximum latency.
+    """
+
+    def __init__(self, edges):
+        self.edges = edges
+        self.counts = [0] * (len(edges) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    @classmethod
+    def logarithmic(cls, low, ratio, bins):
+        """Bins that are a factor ratio wide from low up, percentiles are accurate to that factor"""
+        return cls(tuple(low * ratio ** index for index in range(bins - 1)))
+
+    def add(self, latency):
+        self.counts[bisect.bisect_left(self.edges, latency)] += 1
+        self.count += 1
+        self.sum += latency
+        self.max = max(self.max, latency)
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def percentile(self, fraction):
+        count = 0
+        for index, bin_count in enumerate(self.counts):
+            count += bin_count
+            if count >= fraction * self.count:
+                break
+        # Beyond the last edge, the maximum is the best bound there is
+        return min(self.edges[index], self.max) if index < len(self.edges) else self.max
+
+
+class MethodStatistics:
+    def __init__(self, edges):
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.latency = LatencyHistogram(edges)
+        self.queue_wait_sum = 0.0
+        self.queue_wait_max = 0.0
+        self.lock_wait_sum = 0.0
+        self.lock_wait_max = 0.0
+        self.lock_waits = 0
+
+
+class IOStatistics:
+    """
+    Latency, queue wait, lock wait, error and timeout statistics of all device calls, per device and method.
+    Calls are recorded by the workers and pollers that execute them. Latencies are kept in a LatencyHistogram, so
+    recording costs the same no matter how long a session runs.
+    """
+    # Upper bin edges in seconds, the last bin is open
+    edges = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.methods: dict[tuple[str, str], MethodStatistics] = {}
+        self.labels = weakref.WeakKeyDictionary()
+        self.local = threading.local()
+        self.since = time.time()
+
+    def register(self, device, label):
+        """Name the device in the report, and measure how long its calls wait for the com_lock"""
+        self.labels[device] = label
+        if (lock := getattr(device, 'com_lock', None)) is not None and not isinstance(lock, TimedLock):
+            device.com_lock = TimedLock(lock, self)
+
+    def device_label(self, function):
+        if (device := getattr(function, '__self__', None)) is None:
+            return 'Other'
+        return self.labels.get(device, type(device).__name__)
+
+    def call(self, function, args=(), kwargs=None, submitted=None):
+        """Execute a blocking device call that was queued at the perf_counter time submitted, and record it"""
+        self.local.lock_wait = 0.0
+        start = time.perf_counter()
+        queue_wait = start - submitted if submitted is not None else 0.0
+        try:
+            result = function(*args, **(kwargs or {}))
+        except Exception as ex:
+            self.record(function, time.perf_counter() - start, queue_wait, self.local.lock_wait, ex)
+            raise
+        self.record(function, time.perf_counter() - start, queue_wait, self.local.lock_wait)
+        return result
+
+    async def call_async(self, coroutine, function, submitted):
+        """Await a device request on the asyncio loop and record it, lock waits are not measured here"""
+        start = time.perf_counter()
+        try:
+            result = await coroutine
+        except (Exception, asyncio.CancelledError) as ex:
+            self.record(function, time.perf_counter() - start, start - submitted, None, ex)
+            raise
+        self.record(function, time.perf_counter() - start, start - submitted)
+        return result
+
+    def record(self, function, latency, queue_wait=0.0, lock_wait=None, exception=None):
+        if isinstance(exception, NotImplementedError):
+            # Nothing was sent to the device
+            return
+        key = (self.device_label(function), getattr(function, '__name__', str(function)))
+        with self.lock:
+            if (entry := self.methods.get(key)) is None:
+                entry = self.methods[key] = MethodStatistics(self.edges)
+            entry.calls += 1
+            if isinstance(exception, (NoResponseError, SerialTimeoutException, TimeoutError,
+                                      asyncio.CancelledError)):
+                entry.timeouts += 1
+            elif exception is not None:
+                entry.errors += 1
+            entry.latency.add(latency)
+            entry.queue_wait_sum += queue_wait
+            entry.queue_wait_max = max(entry.queue_wait_max, queue_wait)
+            if lock_wait is not None:
+                entry.lock_waits += 1
+                entry.lock_wait_sum += lock_wait
+                entry.lock_wait_max = max(entry.lock_wait_max, lock_wait)
+
+    def reset(self):
+        with self.lock:
+            self.methods.clear()
+            self.since = time.time()
+
+    @property
+    def calls(self):
+        with self.lock:
+            return sum(entry.calls for entry in self.methods.values())
+
+    def report(self):
+        """Statistics per device and method, times in ms"""
+        labels = [f'<{edge * 1000:g} ms' for edge in self.edges] + [f'>{self.edges[-1] * 1000:g} ms']
+        report = {}
+        with self.lock:
+            for (device, method), entry in sorted(self.methods.items()):
+                report.setdefault(device, {})[method] = {
+                    'Calls': entry.calls,
+                    'Errors': entry.errors,
+                    'Timeouts': entry.timeouts,
+                    'Latency': {'Mean': _ms(entry.latency.mean),
+                                'P50': _ms(entry.latency.percentile(0.5)),
+                                'P95': _ms(entry.latency.percentile(0.95)),
+                                'Max': _ms(entry.latency.max)},
+                    'Queue wait': {'Mean': _ms(entry.queue_wait_sum / entry.calls),
+                                   'Max': _ms(entry.queue_wait_max)},
+                    'Lock wait': {'Mean': _ms(entry.lock_wait_sum / entry.lock_waits) if entry.lock_waits else None,
+                                  'Max': _ms(entry.lock_wait_max) if entry.lock_waits else None},
+                    'Histogram': dict(zip(labels, entry.latency.counts))}
+        return report
+
+    def export(self, filepath):
+        """Write the report as json, or as one csv row per device and method if the file name ends with .csv"""
+        report = self.report()
+        if filepath.lower().endswith('.csv'):
+            with open(filepath, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                writer.writerow(['Device', 'Method', 'Calls', 'Errors', 'Timeouts', 'Latency mean (ms)',
+                                 'Latency P50 (ms)', 'Latency P95 (ms)', 'Latency max (ms)', 'Queue wait mean (ms)',
+                                 'Queue wait max (ms)', 'Lock wait mean (ms)', 'Lock wait max (ms)'])
+                for device, methods in report.items():
+                    for method, entry in methods.items():
+                        writer.writerow([device, method, entry['Calls'], entry['Errors'], entry['Timeouts'],
+                                         *entry['Latency'].values(), *entry['Queue wait'].values(),
+                                         *entry['Lock wait'].values()])
+        else:
+            with open(filepath, 'w', encoding='utf-8') as file:
+                json.dump({'Since': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.since)),
+                           'Devices': report}, file, indent=2)
+
+
+# All device calls of the application are recorded here
+io_statistics = IOStatistics()
@@ -0,0 +1,127 @@
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+
+def csv_header(unit):
+    return 'UTC, Unix timestamp (s), Process Variable ({:s}), Output Power (%), Sensor Value ({:s})\n'.format(unit, unit)
+
+
+def csv_row(timestamp, controller_pv, power, sensor_pv):
+    timestring = datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+    return '{:s}, {:d}, {:.1f}, {:.1f}, {:.1f}\n'.format(timestring, timestamp, controller_pv, power, sensor_pv)
+
+
+def csv_rows(timestamps, controller_pv, power, sensor_pv, bin_width=1.0):
+    """Format whole columns of aligned data at once, with millisecond resolution for sub-second bins"""
+    if not len(timestamps):
+        return ''
+    whole_seconds = bin_width >= 1 and float(bin_width).is_integer()
+    timestrings = np.datetime_as_string(np.round(timestamps * 1000).astype('datetime64[ms]'),
+                                        unit='s' if whole_seconds else 'ms')
+    columns = [timestrings, np.char.mod('%d' if whole_seconds else '%.3f', timestamps),
+               np.char.mod('%.1f', controller_pv), np.char.mod('%.1f', power), np.char.mod('%.1f', sensor_pv)]
+    rows = columns[0]
+    for column in columns[1:]:
+        rows = np.char.add(np.char.add(rows, ', '), column)
+    return '\n'.join(rows.tolist()) + '\n'
+
+
+def write_npz(filepath, data, units):
+    """
+    Save the raw samples of every channel at full resolution to an uncompressed NumPy archive.
+    The archive holds the arrays 'channels' and 'units' describing the channels, and '<channel>.time' (unix timestamps,
+    float64) and '<channel>.value' (float32) for every channel.
+    """
+    arrays = {'channels': np.array(list(units.keys())), 'units': np.array(list(units.values()))}
+    for channel in units:
+        arrays[f'{channel}.time'], arrays[f'{channel}.value'] = data[channel].arrays()
+    with open(filepath, 'wb') as file:
+        np.savez(file, **arrays)
+
+
+class StreamingLogWriter:
+    """
+    Appends logged samples to a csv file while logging is running, so a crash does not lose the data and exporting
+    the log is a plain file copy.
+    The file has the same column layout as the exported log. Samples are aligned to whole seconds (the last value
+    within a second wins); a row is complete once a sample of a later second arrives. Complete rows are buffered and
+    written every flush_rows rows or flush_interval seconds, whichever comes first. Exporting may run in another
+    thread than logging.
+    """
+
+    def __init__(self, filepath, unit, flush_rows=60, flush_interval=10):
+        self.filepath = filepath
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+
+        self.file = open(filepath, 'w')
+        self.file.write(csv_header(unit))
+        self.file.flush()
+
+        self.buffer = []
+        self.last_flush = time.monotonic()
+        self.row_time = None
+        self.row = {}
+        self.lock = threading.Lock()
+
+    def add(self, timestamp, data):
+        second = int(timestamp)
+        with self.lock:
+            if self.row_time is not None and second != self.row_time:
+                self._complete_row()
+            self.row_time = second
+            for parameter, value in data.items():
+                try:
+                    self.row[parameter] = float(value)
+                except (TypeError, ValueError):
+                    self.row[parameter] = math.nan
+
+    def _current_row(self):
+        return csv_row(self.row_time, self.row.get('Controller PV', math.nan), self.row.get('Power', math.nan),
+                       self.row.get('Sensor PV', math.nan))
+
+    def _complete_row(self):
+        self.buffer.append(self._current_row())
+        self.row = {}
+        if len(self.buffer) >= self.flush_rows or time.monotonic() - self.last_flush > self.flush_interval:
+            self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        self.file.write(''.join(self.buffer))
+        self.file.flush()
+        self.buffer = []
+        self.last_flush = time.monotonic()
+
+    def export(self, filepath):
+        """
+        Copy the log to filepath, with the row of the current second that is still being accumulated, so the copy
+        holds every sample logged so far. The row stays open in the log itself, later samples of that second may
+        still change it. Only flushing holds up logging, the file is copied afterwards: rows are only ever appended,
+        so the part written up to then does not change.
+        """
+        with self.lock:
+            self._flush()
+            size = self.file.tell()
+            row = self._current_row() if self.row else ''
+        with open(self.filepath, 'rb') as source, open(filepath, 'wb') as target:
+            while size > 0 and (chunk := source.read(min(size, 1 << 20))):
+                target.write(chunk)
+                size -= len(chunk)
+            # Written like the text mode log file writes its rows
+            target.write(row.replace('\n', os.linesep).encode())
+
+    def close(self):
+        with self.lock:
+            if self.row_time is not None:
+                self._complete_row()
+            self._flush()
+            self.file.close()
@@ -0,0 +1,186 @@
+import asyncio
+import concurrent.futures
+import functools
+import inspect
+import itertools
+import math
+import queue
+import threading
+import time
+
+from PySide6.QtCore import QObject, QThread, Signal
+from minimalmodbus import ModbusException
+from serial import SerialException
+
+from src.Engine.IOStats import io_statistics
+from src.Engine.Threads import keep_until_finished
+
+
+class PollerSignals(QObject):
+    over = Signal(str, object)
+    con_fail = Signal(str, str)
+    imp_fail = Signal(str)
+    error = Signal(str)
+
+
+class DevicePoller(QThread):
+    """
+    Long-lived thread that executes the periodic reads of one device.
+    Jobs are queued with submit and executed in order of priority (lower values first, equal priorities in order of
+    submission), the result of each job is emitted together with the key it was submitted under.
+    One poller lives as long as its device is connected, so periodic reads do not allocate a new runnable and signal
+    object for every single register read.
+    A job whose key is still pending is not queued a second time, so a slow or unresponsive device cannot make the
+    backlog of periodic reads grow without bound.
+    """
+
+    def __init__(self, name):
+        super().__init__()
+        self.setObjectName(f'{name} poller')
+        self.jobs = queue.PriorityQueue()
+        self.sequence = itertools.count()
+        self.pending = set()
+        self.pending_lock = threading.Lock()
+        self.coalesced = 0
+        self.signals = PollerSignals()
+        self.running = False
+
+    def submit(self, key, function, *args, priority=0, **kwargs):
+        """Queue a job, return False if a job with the same key is still pending and the new one was dropped"""
+        with self.pending_lock:
+            if key in self.pending:
+                self.coalesced += 1
+                return False
+            self.pending.add(key)
+        self.jobs.put((priority, next(self.sequence), (key, function, args, kwargs, time.perf_counter())))
+        return True
+
+    @property
+    def queue_depth(self):
+        """Number of jobs that are queued or currently executing"""
+        with self.pending_lock:
+            return len(self.pending)
+
+    def start(self, *args, **kwargs):
+        self.running = True
+        super().start(*args, **kwargs)
+
+    def stop(self, timeout=2000):
+        """
+        Discard pending jobs, wait for the current job to finish and end the thread. Return False if the job did not
+        finish within the timeout, the thread then ends on its own once it returns.
+        """
+        self.running = False
+        self.jobs.put((-math.inf, next(self.sequence), None))
+        if not self.wait(timeout):
+            keep_until_finished(self)
+            return False
+        return True
+
+    def run(self):
+        while self.running:
+            if (job := self.jobs.get()[2]) is None:
+                break
+            key, function, args, kwargs, submitted = job
+            try:
+                result = io_statistics.call(function, args, kwargs, submitted)
+            except (SerialException, ModbusException) as ser_ex:
+                self.signals.con_fail.emit(function.__name__, f'Serial communication failed: {ser_ex}')
+            except NotImplementedError as imp_ex:
+                self.signals.imp_fail.emit(f'{imp_ex}')
+            except Exception as ex:
+                self.signals.error.emit(f'Error: {ex}')
+            else:
+                if self.running:
+                    self.signals.over.emit(key, result)
+            finally:
+                with self.pending_lock:
+                    self.pending.discard(key)
+
+
+def supports_async(device):
+    """Whether a driver offers coroutine alternatives (<method>_async) to its blocking methods"""
+    return any(name.endswith('_async') and inspect.iscoroutinefunction(getattr(type(device), name))
+               for name in dir(type(device)))
+
+
+def async_variant(function):
+    """Return the coroutine function a driver offers as alternative to a blocking method, None if there is none"""
+    variant = getattr(getattr(function, '__self__', None), f'{function.__name__}_async', None)
+    return variant if inspect.iscoroutinefunction(variant) else None
+
+
+class AsyncPoller(QObject):
+    """
+    Executes the periodic reads of one device on the shared asyncio loop instead of a thread of its own.
+    Offers the same interface as DevicePoller: jobs with a pending key are dropped, results are emitted with their key.
+    Drivers that provide a <method>_async coroutine are read without blocking a thread, other methods run in the
+    default executor of the loop. Every request is cancelled after timeout seconds. Jobs are started right away, the
+    priority is only accepted for compatibility, as there is no queue to order.
+    """
+
+    def __init__(self, name, async_loop, timeout=2.0):
+        super().__init__()
+        self.setObjectName(f'{name} poller')
+        self.async_loop = async_loop
+        self.timeout = timeout
+        self.pending: dict[str, concurrent.futures.Future] = {}
+        self.pending_lock = threading.Lock()
+        self.coalesced = 0
+        self.signals = PollerSignals()
+        self.running = False
+
+    def submit(self, key, function, *args, priority=0, **kwargs):
+        with self.pending_lock:
+            if key in self.pending:
+                self.coalesced += 1
+                return False
+            submitted = time.perf_counter()
+            if variant := async_variant(function):
+                coroutine = io_statistics.call_async(variant(*args, **kwargs), function, submitted)
+            else:
+                coroutine = self._run_blocking(function, args, kwargs, submitted)
+            future = self.async_loop.submit(coroutine, self.timeout)
+            self.pending[key] = future
+        future.add_done_callback(lambda done, _key=key, _name=function.__name__: self._done(_key, _name, done))
+        return True
+
+    @staticmethod
+    async def _run_blocking(function, args, kwargs, submitted):
+        return await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(io_statistics.call, function, args, kwargs, submitted))
+
+    def _done(self, key, function_name, future):
+        with self.pending_lock:
+            self.pending.pop(key, None)
+        if future.cancelled() or not self.running:
+            return
+        try:
+            result = future.result()
+        except TimeoutError:
+            self.signals.con_fail.emit(function_name, f'No answer within {self.timeout} s')
+        except (SerialException, ModbusException) as ser_ex:
+            self.signals.con_fail.emit(function_name, f'Serial communication failed: {ser_ex}')
+        except NotImplementedError as imp_ex:
+            self.signals.imp_fail.emit(f'{imp_ex}')
+        except Exception as ex:
+            self.signals.error.emit(f'Error: {ex}')
+        else:
+            self.signals.over.emit(key, result)
+
+    @property
+    def queue_depth(self):
+        with self.pending_lock:
+            return len(self.pending)
+
+    def start(self):
+        self.running = True
+
+    def stop(self, timeout=2000):
+        """Cancel all outstanding requests"""
+        self.running = False
+        with self.pending_lock:
+            futures = list(self.pending.values())
+        for future in futures:
+            future.cancel()
+        concurrent.futures.wait(futures, timeout / 1000)
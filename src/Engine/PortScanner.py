@@ -0,0 +1,55 @@
+import threading
+
+import serial.tools.list_ports
+from PySide6.QtCore import QObject, QThread, Signal
+
+
+class PortScannerSignals(QObject):
+    # All ports, added ports (port: description), removed ports
+    changed = Signal(dict, dict, list)
+    error = Signal(str)
+
+
+class PortScanner(QThread):
+    """
+    Background thread that enumerates the serial ports periodically, or immediately on request with rescan.
+    Enumerating can take a long time on machines with many (virtual) ports, so it is never done in the GUI thread;
+    the last result is kept in ports and changed is only emitted when ports were plugged in or removed.
+    """
+
+    def __init__(self, interval=2.0):
+        super().__init__()
+        self.setObjectName('Port scanner')
+        self.interval = interval
+        self.ports = {}
+        self.signals = PortScannerSignals()
+        self.wake = threading.Event()
+        self.running = False
+
+    def start(self, *args, **kwargs):
+        self.running = True
+        super().start(*args, **kwargs)
+
+    def stop(self, timeout=2000):
+        self.running = False
+        self.wake.set()
+        self.wait(timeout)
+
+    def rescan(self):
+        """Scan again right away instead of at the end of the current interval"""
+        self.wake.set()
+
+    def run(self):
+        while self.running:
+            self.wake.clear()
+            try:
+                ports = {port.device: port.description for port in serial.tools.list_ports.comports()}
+            except Exception as ex:
+                self.signals.error.emit(f'Port enumeration failed: {ex}')
+            else:
+                if ports != self.ports:
+                    added = {port: description for port, description in ports.items() if port not in self.ports}
+                    removed = [port for port in self.ports if port not in ports]
+                    self.ports = ports
+                    self.signals.changed.emit(ports, added, removed)
+            self.wake.wait(self.interval)
@@ -0,0 +1,50 @@
+import time
+
+
+class PollTask:
+    """A quantity that is read periodically from one device"""
+
+    def __init__(self, device, key, function, period, priority):
+        self.device = device
+        self.key = key
+        self.function = function
+        self.period = period  # seconds
+        self.priority = priority
+        self.next_due = 0.0
+
+
+class PollingScheduler:
+    """
+    Keeps track of when each polled quantity is due next.
+    Every quantity has its own period, so fast-changing values can be sampled often while slow-moving ones only use
+    a fraction of the serial bandwidth. When several tasks are due at once, they are returned in order of priority
+    (lower values first). Periods that were missed are skipped rather than caught up in a burst.
+    """
+
+    def __init__(self):
+        self.tasks: dict[tuple[str, str], PollTask] = {}
+
+    def add_task(self, device, key, function, period, priority=0):
+        self.tasks[(device, key)] = PollTask(device, key, function, period, priority)
+
+    def remove_task(self, device, key):
+        self.tasks.pop((device, key), None)
+
+    def remove_device(self, device):
+        for task_id in [task_id for task_id in self.tasks if task_id[0] == device]:
+            del self.tasks[task_id]
+
+    def set_period(self, key, period):
+        for task in self.tasks.values():
+            if task.key == key:
+                task.next_due = min(task.next_due, time.monotonic() + period)
+                task.period = period
+
+    def due_tasks(self, now=None):
+        now = time.monotonic() if now is None else now
+        due = [task for task in self.tasks.values() if task.next_due <= now]
+        for task in due:
+            task.next_due += task.period
+            if task.next_due <= now:
+                task.next_due = now + task.period
+        return sorted(due, key=lambda task: task.priority)
@@ -6,8 +6,8 @@ from src.Signals import engine_signals
 
 
 class SetpointProgrammer:
-    def __init__(self, segments, engine):
-        self.engine = engine
+    def __init__(self, segments, furnace):
+        self.furnace = furnace
         self.segments = segments
         self.is_ramping = False
         self.current_segment = 0
@@ -15,15 +15,22 @@ class SetpointProgrammer:
         self.hold_endtime = int(time.time())
 
         self.working_setpoint = 0
-        engine_signals.controller_status_update.connect(self.set_working_setpoint)
+        engine_signals.device_status_update.connect(self.set_working_setpoint)
 
         self.timer = QTimer()
         self.timer.timeout.connect(self.execute)
         self.timer.start(1000)
 
-        engine.set_control_mode('Automatic')
+        furnace.set_control_mode('Automatic')
+
+    def stop(self):
+        self.timer.stop()
+        engine_signals.device_status_update.disconnect(self.set_working_setpoint)
 
     def execute(self):
+        # Pause while the link to the controller is lost, the hold time keeps running
+        if self.furnace.is_offline('Controller'):
+            return
         if self.is_ramping:
             # Check if the working setpoint of the controller has reached the target setpoint, then switch to hold
             if abs(self.working_setpoint - self.segments[self.current_segment].get('Setpoint')) < 0.1:
@@ -35,20 +42,24 @@ class SetpointProgrammer:
                 self.current_segment += 1
                 self.start_ramp()
 
-    def set_working_setpoint(self, status_values):
+    def set_working_setpoint(self, furnace_id, role, status_values):
+        if furnace_id != self.furnace.id:
+            return
         assert isinstance(status_values, dict), 'Illegal data type received: {:s}'.format(str(type(status_values)))
         if 'Setpoint' in status_values.keys():
             self.working_setpoint = status_values['Setpoint']
 
     def start_ramp(self):
         self.is_ramping = True
-        self.engine.controller.set_rate(self.segments[self.current_segment].get('Rate'))
-        self.engine.controller.set_target_setpoint(self.segments[self.current_segment].get('Setpoint'))
-        engine_signals.ramp_segment_started.emit(self.current_segment)
+        self.furnace.track_controller_state(Rate=self.segments[self.current_segment].get('Rate'),
+                                            Setpoint=self.segments[self.current_segment].get('Setpoint'))
+        self.furnace.controller.set_rate(self.segments[self.current_segment].get('Rate'))
+        self.furnace.controller.set_target_setpoint(self.segments[self.current_segment].get('Setpoint'))
+        engine_signals.program_segment_started.emit(self.furnace.id, 'Ramp', self.current_segment)
 
     def start_hold(self, hold_time):
         self.is_ramping = False
         self.hold_start_time = int(time.time())
         self.hold_endtime = self.hold_start_time + hold_time * 60
 
-        engine_signals.hold_segment_started.emit(self.current_segment)
+        engine_signals.program_segment_started.emit(self.furnace.id, 'Hold', self.current_segment)
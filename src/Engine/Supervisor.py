@@ -0,0 +1,35 @@
+class LinkSupervisor:
+    """
+    Keeps track of the communication with one device: after failure_threshold consecutive failed polls the link
+    counts as lost, and the attempts to reconnect are spaced out with exponential backoff.
+    """
+    failure_threshold = 5
+    initial_delay = 1.0
+    max_delay = 30.0
+
+    def __init__(self):
+        self.failures = 0
+        self.attempts = 0
+        self.lost = False
+
+    def success(self):
+        self.failures = 0
+
+    def failure(self):
+        """Count a failed poll, return True if the link has just been lost"""
+        self.failures += 1
+        if not self.lost and self.failures >= self.failure_threshold:
+            self.lost = True
+            return True
+        return False
+
+    def next_delay(self):
+        """Seconds to wait before the next reconnect attempt"""
+        delay = min(self.initial_delay * 2 ** self.attempts, self.max_delay)
+        self.attempts += 1
+        return delay
+
+    def reset(self):
+        self.failures = 0
+        self.attempts = 0
+        self.lost = False
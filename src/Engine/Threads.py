@@ -0,0 +1,25 @@
+import functools
+
+from PySide6.QtCore import Qt
+
+# Threads that were stopped but are still running, referenced here until they have finished
+_stopping = set()
+
+
+def keep_until_finished(thread):
+    """
+    Keep a reference to a thread that did not end within the timeout of its stop, e.g. because a driver call is
+    blocked on a dead link, so the thread is not garbage collected (and the application aborted) while it still runs.
+    The reference is dropped in the thread the QThread object lives in once the thread has finished.
+    """
+    _stopping.add(thread)
+    thread.finished.connect(functools.partial(_release, thread), Qt.ConnectionType.QueuedConnection)
+    if thread.isFinished():
+        # Finished before the connection was made
+        _release(thread)
+
+
+def _release(thread):
+    if thread in _stopping:
+        thread.wait()
+        _stopping.discard(thread)
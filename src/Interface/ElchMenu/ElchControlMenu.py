@@ -1,13 +1,8 @@
 import functools
 
-import matplotlib.font_manager as fm
-import matplotlib.style
-import matplotlib.ticker
 from PySide6.QtCore import Qt, QSignalBlocker, QTimer
 from PySide6.QtWidgets import QWidget, QLabel, QDoubleSpinBox, QVBoxLayout, QPushButton, QDialog, \
     QGridLayout, QFormLayout, QComboBox
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
-from matplotlib.figure import Figure
 
 from src.Drivers.BaseClasses import ControllerFeatures, SensorFeatures, UnitType
 from src.Signals import gui_signals, engine_signals
@@ -278,6 +273,12 @@ class CalDialog(QDialog):
             button2.clicked.connect(self.reject)
             self.setLayout(vbox)
         else:
+            # matplotlib is only imported once a calibration is shown
+            import matplotlib.font_manager as fm
+            import matplotlib.ticker
+            from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+            from matplotlib.figure import Figure
+
             plot = FigureCanvasQTAgg(Figure(figsize=(3, 3)))
 
             ax = plot.figure.subplots()
@@ -1,7 +1,8 @@
 import functools
 
 from PySide6.QtCore import Qt
-from PySide6.QtWidgets import QWidget, QLabel, QComboBox, QPushButton, QButtonGroup, QRadioButton, QVBoxLayout
+from PySide6.QtWidgets import QWidget, QLabel, QComboBox, QPushButton, QButtonGroup, QRadioButton, QVBoxLayout, \
+    QSpinBox
 
 from src.Signals import gui_signals, engine_signals
 from src.Drivers.BaseClasses import UnitType
@@ -17,6 +18,10 @@ class ElchDeviceMenu(QWidget):
         self.device_menus = {key: QComboBox() for key in self.labels}
         self.port_menus = {key: QComboBox() for key in self.labels}
         self.connect_buttons = {key: QPushButton(text='Connect') for key in self.labels}
+        # Modbus controllers daisy-chained on one RS-485 port are told apart by their slave address
+        self.slave_address = QSpinBox()
+        self.slave_address.setRange(1, 247)
+        self.slave_address.setPrefix('Slave address ')
         for key, button in self.connect_buttons.items():
             button.setObjectName(key)
 
@@ -49,6 +54,8 @@ class ElchDeviceMenu(QWidget):
             vbox.addWidget(self.labels[key])
             vbox.addWidget(self.device_menus[key])
             vbox.addWidget(self.port_menus[key])
+            if key == 'Controller':
+                vbox.addWidget(self.slave_address)
             vbox.addWidget(self.connect_buttons[key])
             vbox.addSpacing(20)
 
@@ -83,7 +90,7 @@ class ElchDeviceMenu(QWidget):
 
         if state:
             if key == 'Controller':
-                gui_signals.connect_controller.emit(device, port)
+                gui_signals.connect_controller.emit(device, port, self.slave_address.value())
             elif key == 'Sensor':
                 gui_signals.connect_sensor.emit(device, port)
         else:
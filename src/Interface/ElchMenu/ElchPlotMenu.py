@@ -8,7 +8,7 @@ from src.Signals import gui_signals
 class ElchPlotMenu(QWidget):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        controls = ['Start', 'Clear', 'Export', 'Autoscale', 'Zoom']
+        controls = ['Start', 'Clear', 'Export', 'I/O Report', 'Autoscale', 'Zoom']
         self.buttons = {key: QPushButton(parent=self, text=key) for key in controls}
         for key, button in self.buttons.items():
             button.setObjectName(key)
@@ -36,6 +36,9 @@ class ElchPlotMenu(QWidget):
                 case 'Export':
                     # noinspection PyUnresolvedReferences
                     self.buttons[key].clicked.connect(self.export_data)
+                case 'I/O Report':
+                    # noinspection PyUnresolvedReferences
+                    self.buttons[key].clicked.connect(self.export_io_report)
 
         vbox.addSpacing(20)
         vbox.addWidget(l := QLabel(text='Data sources'))
@@ -61,5 +64,11 @@ class ElchPlotMenu(QWidget):
             self.buttons['Start'].click()
 
     def export_data(self):
-        if (file_path := QFileDialog.getSaveFileName(self, 'Save as...', 'Logs/Log.csv', 'CSV (*.csv)')[0]) != '':
+        if (file_path := QFileDialog.getSaveFileName(self, 'Save as...', 'Logs/Log.csv',
+                                                     'CSV (*.csv);;NumPy archive (*.npz)')[0]) != '':
             gui_signals.export_log.emit(file_path)
+
+    def export_io_report(self):
+        if (file_path := QFileDialog.getSaveFileName(self, 'Save as...', 'Logs/IO_Report.json',
+                                                     'JSON (*.json);;CSV (*.csv)')[0]) != '':
+            gui_signals.export_io_statistics.emit(file_path)
@@ -43,6 +43,7 @@ class ElchNotificationBar(QWidget):
         self.engine_signals.sensor_connected.connect(self.display_sensor_connected)
         self.engine_signals.sensor_disconnected.connect(self.display_sensor_disconnected)
         self.engine_signals.connection_failed.connect(self.display_connection_fail)
+        self.engine_signals.connection_progress.connect(self.display_connection_progress)
         self.engine_signals.ramp_segment_started.connect(self.display_ramp_started)
         self.engine_signals.hold_segment_started.connect(self.display_hold_started)
         self.engine_signals.message.connect(self.display_message)
@@ -96,6 +97,9 @@ class ElchNotificationBar(QWidget):
     def display_connection_fail(self):
         self.display_message('Connection failed!')
 
+    def display_connection_progress(self, furnace_id, role, text):
+        self.display_message(f'{role}: {text}')
+
     def display_ramp_started(self, segment):
         self.display_message(f'Ramp segment {segment} started!')
 
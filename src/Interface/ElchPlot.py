@@ -4,6 +4,7 @@ import matplotlib.ticker
 import numpy as np
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg, NavigationToolbar2QT
 from matplotlib.figure import Figure
+from PySide6.QtCore import QTimer
 
 from src.Drivers.BaseClasses import UnitType
 from src.Signals import engine_signals
@@ -11,8 +12,65 @@ from src.Signals import engine_signals
 colors = {'blue': '#86b3f9', 'green': '#86f8ab', 'pink': '#f488f9', 'yellow': '#faf0b1', 'purple': '#9686f8'}
 
 
+class PlotBuffer:
+    """Growable pair of x and y arrays; capacity doubles when full, so appending is amortized constant time"""
+
+    def __init__(self, capacity=1024):
+        self.x = np.empty(capacity)
+        self.y = np.empty(capacity)
+        self.length = 0
+
+    def append(self, x, y):
+        if self.length == len(self.x):
+            self.x = np.resize(self.x, 2 * len(self.x))
+            self.y = np.resize(self.y, 2 * len(self.y))
+        self.x[self.length] = x
+        try:
+            self.y[self.length] = y
+        except (TypeError, ValueError):
+            self.y[self.length] = np.nan
+        self.length += 1
+
+    def data(self):
+        return self.x[:self.length], self.y[:self.length]
+
+    def clear(self):
+        self.length = 0
+
+
+def minmax_decimate(x, y, buckets):
+    """
+    Reduce a line with monotonic x to the minimum and maximum of each of the given number of equally wide x buckets
+    (e.g. one per pixel column), which looks identical to the full line when drawn at that resolution
+    """
+    if len(x) <= 2 * buckets:
+        return x, y
+    index = ((x - x[0]) / (x[-1] - x[0] or 1) * (buckets - 1)).astype(np.int64)
+    starts = np.flatnonzero(np.append(True, index[1:] != index[:-1]))
+    return np.repeat(x[starts], 2), np.column_stack((np.fmin.reduceat(y, starts), np.fmax.reduceat(y, starts))).ravel()
+
+
+def fit_limits(limits, data_min, data_max, lower_margin, upper_margin, refit=False):
+    """
+    Return limits that contain the data range. The current limits are kept as long as they contain the data,
+    otherwise (or with refit) the limits are fitted to the data with margins as fractions of the data span, so a
+    growing data range only changes the limits every now and then.
+    """
+    if not refit and limits[0] <= data_min and data_max <= limits[1]:
+        return limits
+    span = data_max - data_min or abs(data_max) or 1
+    return data_min - lower_margin * span, data_max + upper_margin * span
+
+
 class ElchPlot(FigureCanvasQTAgg):
-    def __init__(self):
+    """
+    Live plot of the status values.
+    Lines are animated artists: as long as the axis limits do not change, a redraw only restores the cached background
+    and blits the lines on top of it. The full figure, including layout, is only redrawn when autoscaling has to
+    change the limits, which happens rarely since the limits are fitted with some headroom.
+    """
+
+    def __init__(self, frame_rate=5):
         matplotlib.style.use('Styles/plot_style.mplstyle')
         super().__init__(Figure(figsize=(8, 6)))
 
@@ -43,24 +101,95 @@ class ElchPlot(FigureCanvasQTAgg):
         self.axes = {'Power': ax2, 'Sensor PV': ax, 'Controller PV': ax, 'Setpoint': ax}
         self.colors = {'Power': colors['green'], 'Sensor PV': colors['blue'],
                        'Controller PV': colors['pink'], 'Setpoint': colors['yellow']}
-        self.plots = {key: self.axes[key].plot([], color=self.colors[key], marker='')[0] for key in self.axes}
+        self.plots = {key: self.axes[key].plot([], color=self.colors[key], marker='', animated=True)[0]
+                      for key in self.axes}
+        self.buffers = {key: PlotBuffer() for key in self.axes}
 
         self.autoscale = True
+        self.refit = True
         self.figure.tight_layout()
 
+        self.background = None
+        self.mpl_connect('draw_event', self.on_draw)
+        self.mpl_connect('resize_event', lambda event: self.figure.tight_layout())
+
+        # New data points only mark the plot as outdated, redrawing happens at most at the frame rate of this timer
+        self.outdated = False
+        self.redraw_timer = QTimer()
+        self.redraw_timer.timeout.connect(self.redraw)
+        self.set_frame_rate(frame_rate)
+        self.redraw_timer.start()
+
+    def set_frame_rate(self, frame_rate):
+        self.redraw_timer.setInterval(int(1000 / frame_rate))
+
+    def on_draw(self, event):
+        """Cache the background after every full draw and draw the animated lines on top of it"""
+        self.background = self.copy_from_bbox(self.figure.bbox)
+        self.draw_lines()
+
+    def draw_lines(self):
+        for key, plot in self.plots.items():
+            self.axes[key].draw_artist(plot)
+
     def add_data_point(self, status_values, time):
         for key, value in status_values.items():
-            self.plots[key].set_data(np.append(self.plots[key].get_data()[0], time),
-                                     np.append(self.plots[key].get_data()[1], value))
-
-            if self.autoscale:
-                self.axes[key].relim(visible_only=True)
-                self.axes[key].autoscale()
-            self.figure.canvas.draw()
+            self.buffers[key].append(time, value)
+        self.outdated = True
+
+    def redraw(self):
+        if not self.outdated:
+            return
+        self.outdated = False
+
+        for key, plot in self.plots.items():
+            x, y = self.buffers[key].data()
+            if not self.autoscale and len(x):
+                # Only the visible part of a zoomed plot has to be decimated, plus one point on either side
+                x_min, x_max = self.axes[key].get_xlim()
+                start = max(np.searchsorted(x, x_min) - 1, 0)
+                stop = np.searchsorted(x, x_max) + 1
+                x, y = x[start:stop], y[start:stop]
+            plot.set_data(*minmax_decimate(x, y, max(int(self.axes[key].bbox.width), 1)))
+
+        if (self.autoscale and self.rescale()) or self.background is None:
             self.figure.tight_layout()
+            self.figure.canvas.draw()
+        else:
+            self.restore_region(self.background)
+            self.draw_lines()
+            self.blit(self.figure.bbox)
+
+    def rescale(self):
+        """Adapt the axis limits to the data of the visible lines, return True if any limit changed"""
+        changed = False
+        visible = {key: self.plots[key].get_data() for key in self.plots
+                   if self.plots[key].get_visible() and self.buffers[key].length}
+        if visible:
+            x_axis = self.axes['Sensor PV']
+            x_min = min(x[0] for x, y in visible.values())
+            x_max = max(x[-1] for x, y in visible.values())
+            if (limits := fit_limits(x_axis.get_xlim(), x_min, x_max, 0, 0.25, self.refit)) != x_axis.get_xlim():
+                x_axis.set_xlim(limits)
+                changed = True
+
+        for axis in set(self.axes.values()):
+            y_data = [y for key, (x, y) in visible.items() if self.axes[key] is axis and not np.isnan(y).all()]
+            if not y_data:
+                continue
+            y_min = min(np.nanmin(y) for y in y_data)
+            y_max = max(np.nanmax(y) for y in y_data)
+            if (limits := fit_limits(axis.get_ylim(), y_min, y_max, 0.1, 0.1, self.refit)) != axis.get_ylim():
+                axis.set_ylim(limits)
+                changed = True
+
+        self.refit = False
+        return changed
 
     def set_plot_visibility(self, plot, visible):
         self.plots[plot.objectName()].set_visible(visible)
+        self.refit = True
+        self.outdated = True
 
     def start_plotting(self, plotting):
         if plotting:
@@ -73,14 +202,19 @@ class ElchPlot(FigureCanvasQTAgg):
     def clear_plot(self):
         for plot in self.plots.values():
             plot.set_data([], [])
+        for buffer in self.buffers.values():
+            buffer.clear()
+        self.refit = True
         self.figure.canvas.draw()
 
     def set_units(self, unit):
         self.axes['Sensor PV'].set_ylabel(
             {UnitType.TEMPERATURE: 'Temperature (°C)', UnitType.VOLTAGE: 'Voltage (mV)'}[unit],
             fontproperties=fm.FontProperties(fname='Fonts/Roboto-Regular.ttf', size=14))
-        self.figure.canvas.draw()
         self.figure.tight_layout()
+        self.figure.canvas.draw()
 
     def toggle_autoscale(self):
         self.autoscale = not self.autoscale
+        self.refit = self.autoscale
+        self.outdated = True
@@ -8,7 +8,7 @@ class GuiSignals(QObject):
     set_units = Signal(UnitType)
     connect_sensor = Signal(str, str)
     disconnect_sensor = Signal()
-    connect_controller = Signal(str, str)
+    connect_controller = Signal(str, str, int)
     disconnect_controller = Signal()
 
     set_target_setpoint = Signal(float)
@@ -24,7 +24,8 @@ class GuiSignals(QObject):
     start_log = Signal()
     stop_log = Signal()
     clear_log = Signal()
-    export_log = Signal()
+    export_log = Signal(str)
+    set_export_options = Signal(float, str)
 
     start_program = Signal(object)
     skip_program = Signal()
@@ -39,12 +40,27 @@ class GuiSignals(QObject):
     switch_sensor_aiming_beam = Signal(bool)
     set_heater_tc = Signal(str)
     set_sensor_tc = Signal(str)
+    set_polling_period = Signal(str, int)
+
+    # Devices of further furnaces are addressed by furnace id: (furnace id, role, device type, port, slave address)
+    connect_device = Signal(str, str, str, str, int)
+    disconnect_device = Signal(str, str)
+    # Furnace id, name of a Furnace command, tuple of arguments
+    furnace_command = Signal(str, str, object)
 
     emergency_shutdown = Signal()
 
+    # File path (.json or .csv) to write the latency and error statistics of all device calls to
+    export_io_statistics = Signal(str)
+    reset_io_statistics = Signal()
+
 
 class EngineSignals(QObject):
     available_ports = Signal(dict)
+    # Latency, queue and lock wait, error and timeout statistics per device and method, see IOStatistics.report
+    io_statistics_update = Signal(dict)
+    # Hotplug events: ports added (port: description), ports removed
+    ports_changed = Signal(dict, list)
     available_devices = Signal(dict)
 
     controller_connected = Signal(str, str, object)
@@ -52,10 +68,20 @@ class EngineSignals(QObject):
     sensor_connected = Signal(str, str, object)
     sensor_disconnected = Signal()
     connection_failed = Signal(Exception)
+    # Furnace id, role, progress of a connection that is under way
+    connection_progress = Signal(str, str, str)
 
     ramp_segment_started = Signal(int)
     hold_segment_started = Signal(int)
 
+    # The signals of all furnaces are keyed by furnace id, those of the default furnace are also forwarded to the
+    # unkeyed signals above and below
+    device_connected = Signal(str, str, str, str, object)
+    device_disconnected = Signal(str, str)
+    device_status_update = Signal(str, str, dict, float)
+    device_parameters_update = Signal(str, str, object)
+    program_segment_started = Signal(str, str, int)
+
     controller_status_update = Signal(dict, float)
     controller_parameters_update = Signal(dict)
     sensor_status_update = Signal(dict, float)
@@ -65,11 +91,13 @@ class EngineSignals(QObject):
 
     sensor_tc_update = Signal(str)
     heater_tc_update = Signal(str)
+    heater_tc_fault_update = Signal(int)
 
     error = Signal(str)
     message = Signal(str)
 
     com_failed = Signal(str)
+    queue_depth_update = Signal(dict)
     non_imp = Signal(str)
 
 
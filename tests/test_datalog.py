@@ -0,0 +1,77 @@
+import math
+
+import numpy as np
+import pytest
+
+from src.Engine.DataLog import DataLog, TimeSeries
+
+
+def make_log(samples):
+    """A log of the channels A and B from (channel, timestamp, value) samples"""
+    log = DataLog(['A', 'B'])
+    for channel, timestamp, value in samples:
+        log.append(channel, timestamp, value)
+    return log
+
+
+def test_time_series_spans_chunks():
+    series = TimeSeries()
+    count = 2 * TimeSeries.chunk_size + 5
+    for index in range(count):
+        series.append(float(index), index)
+    timestamps, values = series.arrays()
+    assert len(series) == count
+    assert np.array_equal(timestamps, np.arange(count))
+    assert np.array_equal(values, np.arange(count, dtype=np.float32))
+
+
+def test_time_series_invalid_value_is_nan():
+    series = TimeSeries()
+    series.append(0.0, 'Error')
+    assert math.isnan(series.arrays()[1][0])
+
+
+def test_time_series_retention():
+    series = TimeSeries(retention=100)
+    count = 3 * TimeSeries.chunk_size
+    for index in range(count):
+        series.append(float(index), index)
+    timestamps, _ = series.arrays()
+    # Only the window is returned, and chunks older than the window are released
+    assert timestamps[0] == count - 1 - 100
+    assert timestamps[-1] == count - 1
+    assert len(series.chunks) <= 2
+
+
+def test_align_none():
+    log = make_log([('A', 0.2, 1), ('A', 0.7, 2), ('B', 0.5, 10), ('A', 2.1, 3)])
+    times, aligned = log.align(['A', 'B'], fill='none')
+    assert np.array_equal(times, [0.0, 2.0])
+    # The last sample of each bin wins, bins without a sample of a channel are NaN
+    assert np.array_equal(aligned['A'], [2, 3])
+    assert aligned['B'][0] == 10 and math.isnan(aligned['B'][1])
+
+
+def test_align_last():
+    log = make_log([('A', 0.5, 1), ('A', 1.5, 2), ('A', 2.5, 3), ('B', 0.5, 10)])
+    _, aligned = log.align(['A', 'B'], fill='last')
+    assert np.array_equal(aligned['B'], [10, 10, 10])
+
+
+def test_align_nearest():
+    log = make_log([('A', 0.5, 1), ('A', 1.5, 2), ('A', 2.5, 3), ('A', 3.5, 4), ('B', 0.9, 10), ('B', 3.2, 20)])
+    _, aligned = log.align(['A', 'B'], fill='nearest')
+    # Bin 1 (centre 1.5) is closer to the sample at 0.9, bin 2 (centre 2.5) to the one at 3.2
+    assert np.array_equal(aligned['B'], [10, 10, 20, 20])
+
+
+def test_align_bin_width():
+    log = make_log([('A', 0.5, 1), ('A', 4.5, 2), ('B', 5.5, 3)])
+    times, aligned = log.align(['A', 'B'], bin_width=5.0)
+    assert np.array_equal(times, [0.0, 5.0])
+    assert np.array_equal(aligned['A'], [2, np.nan], equal_nan=True)
+
+
+def test_align_unknown_fill():
+    with pytest.raises(ValueError):
+        make_log([]).align(['A'], fill='linear')
@@ -0,0 +1,49 @@
+import pytest
+
+from src.Engine.IOStats import IOStatistics, LatencyHistogram
+
+
+def test_percentile_is_upper_bin_edge():
+    histogram = LatencyHistogram((0.001, 0.002, 0.005))
+    for latency in (0.0005, 0.0015, 0.0015, 0.004):
+        histogram.add(latency)
+    assert histogram.percentile(0.25) == 0.001
+    assert histogram.percentile(0.5) == 0.002
+    assert histogram.percentile(1.0) == 0.004
+    assert histogram.mean == pytest.approx(0.001875)
+
+
+def test_percentile_never_exceeds_maximum():
+    histogram = LatencyHistogram((0.001, 0.01))
+    for latency in (0.0061, 0.0063):
+        histogram.add(latency)
+    assert histogram.percentile(0.5) == 0.0063
+
+
+def test_percentile_beyond_last_edge_is_maximum():
+    histogram = LatencyHistogram((0.001,))
+    histogram.add(0.5)
+    assert histogram.percentile(0.5) == 0.5
+
+
+def test_logarithmic_bins():
+    histogram = LatencyHistogram.logarithmic(1e-5, 1.02, 820)
+    for latency in (0.001, 0.01, 0.1):
+        histogram.add(latency)
+    assert len(histogram.counts) == 820
+    assert 0.01 <= histogram.percentile(0.5) <= 0.01 * 1.02
+
+
+def test_report():
+    statistics = IOStatistics()
+
+    def read():
+        pass
+
+    for latency in (0.003, 0.004):
+        statistics.record(read, latency)
+    statistics.record(read, 0.001, exception=TimeoutError())
+    statistics.record(read, 0.001, exception=NotImplementedError())
+    entry = statistics.report()['Other']['read']
+    assert (entry['Calls'], entry['Errors'], entry['Timeouts']) == (3, 0, 1)
+    assert entry['Latency']['P95'] <= entry['Latency']['Max'] == 4.0
@@ -0,0 +1,93 @@
+import threading
+import time
+
+import minimalmodbus
+import pytest
+import serial
+
+from src.DeviceEmulator import crc16, float_to_words, words_to_float
+from src.Drivers import Modbus
+from src.Drivers.Modbus import ModbusBus, decode_register
+
+
+@pytest.mark.parametrize('value, decimals, signed, expected', [
+    (1234, 0, False, 1234),
+    (1234, 1, False, 123.4),
+    (0xFFFF, 0, False, 0xFFFF),
+    (0xFFFF, 0, True, -1),
+    (0xFF38, 1, True, -20.0),
+])
+def test_decode_register(value, decimals, signed, expected):
+    assert decode_register(value, decimals, signed) == pytest.approx(expected)
+
+
+def test_crc16():
+    # Read one holding register of slave 1 at address 0
+    assert crc16(bytes.fromhex('010300000001')) == bytes.fromhex('840a')
+
+
+@pytest.mark.parametrize('byteorder', [minimalmodbus.BYTEORDER_BIG, minimalmodbus.BYTEORDER_LITTLE,
+                                       minimalmodbus.BYTEORDER_BIG_SWAP, minimalmodbus.BYTEORDER_LITTLE_SWAP])
+def test_float_words(byteorder):
+    assert words_to_float(float_to_words(812.5, byteorder), byteorder) == 812.5
+
+
+def test_float_word_order():
+    assert float_to_words(1.0, minimalmodbus.BYTEORDER_BIG) == [0x3F80, 0x0000]
+    assert float_to_words(1.0, minimalmodbus.BYTEORDER_LITTLE_SWAP) == [0x0000, 0x3F80]
+
+
+@pytest.fixture
+def bus(monkeypatch):
+    # A loopback port instead of a serial adapter
+    monkeypatch.setattr(Modbus.serial, 'Serial', lambda port, **kwargs: serial.serial_for_url('loop://', **kwargs))
+    bus = ModbusBus.open('COM Bus', 9600)
+    yield bus
+    while bus.users:
+        bus.close()
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_bus_is_shared(bus):
+    assert ModbusBus.open('COM Bus', 9600) is bus
+    assert bus.users == 2
+    with pytest.raises(serial.SerialException):
+        ModbusBus.open('COM Bus', 19200)
+    bus.close()
+    bus.close()
+    assert 'COM Bus' not in ModbusBus.buses
+
+
+def test_bus_round_robin(bus):
+    order = []
+
+    def transaction(slave_address):
+        with bus.transaction(slave_address):
+            order.append(slave_address)
+
+    # Slave 1 queues three transactions and slave 2 one while slave 3 holds the bus
+    bus.acquire(3)
+    threads = []
+    for slave_address, count in ((1, 3), (2, 1)):
+        for _ in range(count):
+            threads.append(thread := threading.Thread(target=transaction, args=(slave_address,)))
+            thread.start()
+        wait_for(lambda: bus.waiting.get(slave_address) == count)
+    bus.release(3)
+    for thread in threads:
+        thread.join()
+    # Slave 2 gets its turn after the first transaction of slave 1, not after all of them
+    assert order == [1, 2, 1, 1]
+
+
+def test_bus_timeout_per_slave(bus):
+    with bus.transaction(1, timeout=0.25):
+        assert bus.serial.timeout == 0.25
+    with bus.transaction(2):
+        assert bus.serial.timeout == 0.05
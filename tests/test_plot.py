@@ -0,0 +1,33 @@
+import numpy as np
+# Matplotlib picks the Qt binding that is imported already
+import PySide6.QtCore  # noqa: F401
+
+from src.Interface.ElchPlot import minmax_decimate
+
+
+def test_short_line_is_unchanged():
+    x = np.arange(10.0)
+    y = np.sin(x)
+    assert minmax_decimate(x, y, 5) == (x, y)
+
+
+def test_minmax_per_bucket():
+    x = np.arange(1000.0)
+    y = np.sin(x / 10)
+    dx, dy = minmax_decimate(x, y, 100)
+    assert len(dx) == len(dy) <= 200
+    # Every bucket is drawn as its minimum and maximum at its first x
+    assert np.array_equal(dx[0::2], dx[1::2])
+    index = (x / x[-1] * 99).astype(int)
+    for bucket, start in enumerate(dx[0::2]):
+        values = y[index == index[int(start)]]
+        assert dy[2 * bucket] == values.min() and dy[2 * bucket + 1] == values.max()
+    assert dy.min() == y.min() and dy.max() == y.max()
+
+
+def test_nan_does_not_hide_the_line():
+    x = np.arange(100.0)
+    y = np.ones(100)
+    y[10] = np.nan
+    _, dy = minmax_decimate(x, y, 10)
+    assert not np.isnan(dy).any()
@@ -0,0 +1,65 @@
+import pytest
+
+from src.Drivers.Software_PID import LoopScheduler, SoftwarePID
+
+
+def test_proportional_band():
+    pid = SoftwarePID(pb=100, ti=1e9, td=0)
+    assert pid.calculate_output(450, 500, dt=0.25) == pytest.approx(50, rel=1e-6)
+
+
+def test_output_is_constrained():
+    pid = SoftwarePID(pb=10, ti=1e9, td=0)
+    assert pid.calculate_output(0, 500, dt=0.25) == 100
+    assert pid.calculate_output(500, 0, dt=0.25) == 0
+
+
+def test_integral_scales_with_dt():
+    short = SoftwarePID(pb=100, ti=10, td=0)
+    long = SoftwarePID(pb=100, ti=10, td=0)
+    for _ in range(4):
+        short.calculate_output(490, 500, dt=0.25)
+    long.calculate_output(490, 500, dt=1.0)
+    # The same error over the same time integrates to the same sum, however the time is divided
+    assert short.output_sum == pytest.approx(long.output_sum)
+    assert long.output_sum == pytest.approx(10 / 10 * 1.0)
+
+
+def test_derivative_uses_dt_and_does_not_kick():
+    pid = SoftwarePID(pb=100, ti=1e9, td=1)
+    # No previous value: no derivative on the first calculation
+    assert pid.calculate_output(500, 510, dt=0.5) == pytest.approx(10, rel=1e-6)
+    # 1 K rise in 0.5 s with td 1 s: 2 % less output than the proportional term
+    assert pid.calculate_output(501, 510, dt=0.5) == pytest.approx(9 - 2, rel=1e-6)
+    # Setpoint steps do not enter the derivative
+    assert pid.calculate_output(501, 520, dt=0.5) == pytest.approx(19, rel=1e-6)
+
+
+def test_default_dt_is_interval():
+    pid = SoftwarePID(pb=100, ti=10, td=0, loop_interval=0.5)
+    pid.calculate_output(490, 500)
+    assert pid.output_sum == pytest.approx(0.5)
+
+
+def test_schedule_does_not_drift():
+    scheduler = LoopScheduler(0.1)
+    scheduler.start(now=0.0)
+    assert scheduler.tick(now=0.0) == pytest.approx(0.1)
+    assert scheduler.tick(now=0.05) is None
+    # A late cycle shortens the wait for the next one
+    assert scheduler.tick(now=0.13) == pytest.approx(0.13)
+    assert scheduler.time_to_next(now=0.13) == pytest.approx(0.07)
+    assert scheduler.tick(now=0.2) == pytest.approx(0.07)
+    statistics = scheduler.statistics()
+    assert statistics['Cycles'] == 3 and statistics['Overruns'] == 0
+    assert statistics['Lateness']['Max'] == pytest.approx(30)
+
+
+def test_missed_cycles_are_skipped():
+    scheduler = LoopScheduler(0.1)
+    scheduler.start(now=0.0)
+    scheduler.tick(now=0.0)
+    # Three cycles due by 0.35, two of them were missed
+    assert scheduler.tick(now=0.35) == pytest.approx(0.35)
+    assert scheduler.overruns == 2
+    assert scheduler.time_to_next(now=0.35) == pytest.approx(0.05)